@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Author, Blog, Comment
+from .models import Category, Author, Blog, Comment, Tag
 
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ('name', 'slug', 'count')
@@ -17,6 +17,11 @@ class BlogAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('title',)}
     date_hierarchy = 'published_at'
 
+class TagAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug', 'blog_count')
+    search_fields = ('name',)
+    readonly_fields = ('blog_count',)
+
 class CommentAdmin(admin.ModelAdmin):
     list_display = ('name', 'blog', 'created_at', 'parent')
     list_filter = ('created_at',)
@@ -27,3 +32,4 @@ admin.site.register(Category, CategoryAdmin)
 admin.site.register(Author, AuthorAdmin)
 admin.site.register(Blog, BlogAdmin)
 admin.site.register(Comment, CommentAdmin)
+admin.site.register(Tag, TagAdmin)
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
+
+    def ready(self):
+        # Connect signal receivers
+        from . import signals  # noqa: F401
+        # Time queries on every connection opened from now on
+        from . import metrics  # noqa: F401
@@ -0,0 +1,277 @@
+"""
+Latency, query and memory benchmark of the API endpoints.
+
+Each ``Route`` is requested in-process through the Django test client,
+which goes through the full middleware, URL and view stack but no network.
+A route gets ``warmup`` untimed requests, then ``iterations`` timed ones,
+then ``memory_iterations`` more under ``CaptureQueriesContext`` and
+``tracemalloc``, which slow requests down and so are kept out of the
+timings. ``compare`` checks a run against a stored baseline.
+
+See the ``benchmark_endpoints`` management command.
+"""
+import itertools
+import math
+import statistics
+import time
+import tracemalloc
+from contextlib import ExitStack
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from .models import Blog, Category, Comment, Tag
+
+BENCHMARK_EMAIL = 'benchmark@example.com'
+BENCHMARK_PASSWORD = 'bench-Passw0rd!'
+
+# Latency and memory changes smaller than these are noise, whatever the ratio
+LATENCY_FLOOR_MS = 1.0
+MEMORY_FLOOR_KIB = 64
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+class Route:
+    """
+    One request to benchmark. ``path`` is formatted with the context from
+    ``build_context``. ``data`` is the JSON body, or a callable of
+    ``(context, n)``, ``n`` counting the route's requests, for bodies that
+    must differ each time. ``auth`` requests are made signed in as the
+    benchmark user, and ``setup(client)`` runs untimed before each request.
+    """
+
+    def __init__(self, name, path, method='get', data=None, auth=False, setup=None, status=200):
+        self.name = name
+        self.path = path
+        self.method = method
+        self.data = data
+        self.auth = auth
+        self.setup = setup
+        self.status = status
+
+    def __repr__(self):
+        return f"<Route {self.name}>"
+
+
+def _register_data(context, n):
+    return {
+        'email': f"bench-{context['run']}-{n}@example.com",
+        'password': BENCHMARK_PASSWORD, 'password_confirm': BENCHMARK_PASSWORD,
+    }
+
+
+def _sign_in(client):
+    client.post('/api/auth/login/', {'email': BENCHMARK_EMAIL, 'password': BENCHMARK_PASSWORD})
+
+
+ROUTES = [
+    # Blogs
+    Route('blog-list', '/api/blogs/'),
+    Route('blog-list-signed-in', '/api/blogs/', auth=True),
+    Route('blog-list-category', '/api/blogs/?category={category}'),
+    Route('blog-list-tag', '/api/blogs/?tag={tag}'),
+    Route('blog-featured', '/api/blogs/featured/'),
+    Route('blog-search', '/api/blogs/search/?q={query}'),
+    Route('blog-detail', '/api/blogs/{blog}/'),
+    Route('blog-detail-signed-in', '/api/blogs/{blog}/', auth=True),
+    Route('blog-related', '/api/blogs/{blog}/related/'),
+    Route('home', '/api/home/'),
+    # Categories and tags
+    Route('category-list', '/api/categories/'),
+    Route('category-detail', '/api/categories/{category}/'),
+    Route('category-detail-blogs', '/api/categories/{category}/?include_blogs=true'),
+    Route('tag-list', '/api/tags/'),
+    # Comments
+    Route('comment-list', '/api/blogs/{blog}/comments/'),
+    Route('comment-list-signed-in', '/api/blogs/{blog}/comments/', auth=True),
+    # Writes come last: they retire the cached responses the reads above use
+    Route(
+        'comment-create', '/api/blogs/{blog}/comments/create/', method='post',
+        data={'name': 'Benchmark', 'content': 'Measuring the comment form.'}, auth=True, status=201,
+    ),
+    Route('blog-like', '/api/blogs/{blog}/like/', method='post', auth=True),
+    Route('comment-like', '/api/blogs/comments/{comment}/like/', method='post', auth=True),
+    # Auth
+    Route(
+        'auth-login', '/api/auth/login/', method='post',
+        data={'email': BENCHMARK_EMAIL, 'password': BENCHMARK_PASSWORD},
+    ),
+    Route('auth-user', '/api/auth/user/', auth=True),
+    Route('auth-logout', '/api/auth/logout/', method='post', setup=_sign_in),
+    Route('auth-register', '/api/auth/register/', method='post', data=_register_data, status=201),
+]
+
+
+def select_routes(names=None):
+    """The routes called ``names`` (all of them if empty), in benchmark order"""
+    if not names:
+        return list(ROUTES)
+    unknown = set(names) - {route.name for route in ROUTES}
+    if unknown:
+        raise BenchmarkError(f"Unknown routes: {', '.join(sorted(unknown))}")
+    return [route for route in ROUTES if route.name in names]
+
+
+def benchmark_user():
+    User = get_user_model()
+    user = User.objects.filter(email=BENCHMARK_EMAIL).first()
+    if user is None:
+        user = User.objects.create_user(BENCHMARK_EMAIL, password=BENCHMARK_PASSWORD)
+    return user
+
+
+def build_context(run='0'):
+    """
+    Values for the route paths, picked for the most work: the blog with the
+    most comments, the largest category and the most used tag. ``run``
+    keeps the emails of registered users apart between runs.
+    """
+    blog = Blog.objects.order_by('-comment_count', 'id').first()
+    category = Category.objects.order_by('-count', 'id').first()
+    tag = Tag.objects.order_by('-blog_count', 'id').first()
+    if blog is None or category is None:
+        raise BenchmarkError("No blogs to benchmark; seed some first")
+    comment = (
+        Comment.objects.filter(blog=blog, parent=None).order_by('id').first()
+        or Comment.objects.order_by('id').first()
+    )
+    return {
+        'run': run,
+        'blog': blog.slug,
+        'category': category.slug,
+        'tag': tag.slug if tag else '',
+        'comment': comment.pk if comment else 0,
+        'query': blog.title.split()[0].lower(),
+    }
+
+
+def percentile(values, q):
+    """The ``q``th percentile (0-100) of ``values``, interpolating between ranks"""
+    ordered = sorted(values)
+    if not ordered:
+        raise ValueError("percentile of no values")
+    rank = (len(ordered) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class _Requester:
+    def __init__(self, route, context, user):
+        self.route = route
+        self.context = context
+        self.client = Client()
+        if route.auth:
+            self.client.force_login(user)
+        self.path = route.path.format(**context)
+        self.sequence = itertools.count()
+
+    def prepare(self):
+        """Untimed work before a request; returns the request as a callable"""
+        route = self.route
+        if route.setup:
+            route.setup(self.client)
+        data = route.data
+        if callable(data):
+            data = data(self.context, next(self.sequence))
+        send = getattr(self.client, route.method)
+        if data is None:
+            return lambda: send(self.path)
+        return lambda: send(self.path, data, content_type='application/json')
+
+    def check(self, response):
+        if response.status_code != self.route.status:
+            raise BenchmarkError(
+                f"{self.route.name}: {self.route.method.upper()} {self.path} returned "
+                f"{response.status_code}, expected {self.route.status}"
+            )
+
+
+def measure(route, context, user, iterations=50, warmup=5, memory_iterations=10):
+    """Timings (ms), queries and peak allocation (KiB) per request of ``route``"""
+    requester = _Requester(route, context, user)
+    for _ in range(warmup):
+        requester.check(requester.prepare()())
+
+    timings = []
+    for _ in range(iterations):
+        request = requester.prepare()
+        started = time.perf_counter()
+        response = request()
+        timings.append((time.perf_counter() - started) * 1000)
+        requester.check(response)
+
+    queries, allocated = [], []
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        for _ in range(memory_iterations):
+            request = requester.prepare()
+            with ExitStack() as stack:
+                captured = [
+                    stack.enter_context(CaptureQueriesContext(connection))
+                    for connection in connections.all()
+                ]
+                tracemalloc.reset_peak()
+                baseline, _ = tracemalloc.get_traced_memory()
+                response = request()
+                _, peak = tracemalloc.get_traced_memory()
+            requester.check(response)
+            queries.append(sum(len(capture.captured_queries) for capture in captured))
+            allocated.append((peak - baseline) / 1024)
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+    result = {'requests': len(timings)}
+    if timings:
+        result.update({
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'max_ms': round(max(timings), 3),
+        })
+    if queries:
+        result['queries'] = statistics.median_low(queries)
+        result['peak_kib'] = round(statistics.median(allocated), 1)
+    return result
+
+
+def run(routes, context, user, log=None, **options):
+    """``measure`` every route; returns ``{route name: result}``"""
+    results = {}
+    for route in routes:
+        results[route.name] = measure(route, context, user, **options)
+        if log:
+            log(route.name, results[route.name])
+    return results
+
+
+def compare(baseline, results, threshold=0.2):
+    """
+    Regressions of ``results`` against the ``routes`` of ``baseline``, as
+    messages: p95 latency or peak allocation up by more than ``threshold``
+    (a ratio) and the noise floor, or any extra query. Routes missing from
+    either side are not compared.
+    """
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get('routes', {}).get(name)
+        if not before:
+            continue
+        for key, floor in (('p95_ms', LATENCY_FLOOR_MS), ('peak_kib', MEMORY_FLOOR_KIB)):
+            if key not in result or key not in before:
+                continue
+            old, new = before[key], result[key]
+            if new > old * (1 + threshold) and new - old > floor:
+                change = f" (+{(new - old) / old:.0%})" if old else ''
+                regressions.append(f"{name}: {key} {old} -> {new}{change}")
+        if 'queries' in result and 'queries' in before and result['queries'] > before['queries']:
+            regressions.append(f"{name}: queries {before['queries']} -> {result['queries']}")
+    return regressions
@@ -0,0 +1,84 @@
+from collections import defaultdict
+
+from django.conf import settings
+
+from .models import Comment
+
+
+def get_tree_limits(max_depth=None, max_replies=None, max_nodes=None):
+    """Resolve tree limits, never going above the configured maximums"""
+    limits = []
+    for value, setting in (
+        (max_depth, settings.COMMENT_TREE_MAX_DEPTH),
+        (max_replies, settings.COMMENT_TREE_MAX_REPLIES),
+        (max_nodes, settings.COMMENT_TREE_MAX_NODES),
+    ):
+        limits.append(setting if value is None else max(0, min(int(value), setting)))
+    return limits
+
+
+def build_comment_tree(blog_id, max_depth=None, max_replies=None, max_nodes=None):
+    """
+    Assemble the comment forest of a blog in two queries.
+
+    The first query loads only (id, parent_id) for the whole thread, which is
+    enough to pick the comments that fit within the limits breadth-first:
+    at most ``max_replies`` children per node (top-level comments included),
+    nothing deeper than ``max_depth`` levels below the top level, and no more
+    than ``max_nodes`` comments overall. The second query loads just those
+    rows. Each returned comment carries ``thread_replies`` and
+    ``has_more_replies`` for ``CommentSerializer``.
+
+    Returns ``(top_level_comments, has_more)`` where ``has_more`` tells
+    whether top-level comments were left out.
+    """
+    max_depth, max_replies, max_nodes = get_tree_limits(max_depth, max_replies, max_nodes)
+
+    children = defaultdict(list)
+    for pk, parent_id in (
+        Comment.objects.filter(blog_id=blog_id)
+        .order_by('created_at', 'id')
+        .values_list('id', 'parent_id')
+    ):
+        children[parent_id].append(pk)
+
+    selected = []
+    truncated = set()
+    level = [None]
+    depth = 0
+    budget = max_nodes
+    while level and budget > 0:
+        next_level = []
+        for parent_id in level:
+            kids = children.get(parent_id, ())
+            if not kids:
+                continue
+            if parent_id is not None and depth > max_depth:
+                truncated.add(parent_id)
+                continue
+            take = kids[:min(max_replies, budget)]
+            if len(take) < len(kids):
+                truncated.add(parent_id)
+            budget -= len(take)
+            selected.extend(take)
+            next_level.extend(take)
+        level = next_level
+        depth += 1
+
+    # Whatever the budget cut off still has replies to show
+    for parent_id in level:
+        if children.get(parent_id):
+            truncated.add(parent_id)
+
+    if not selected:
+        return [], None in truncated
+
+    comments = Comment.objects.filter(blog_id=blog_id, id__in=selected).in_bulk()
+    for comment in comments.values():
+        comment.thread_replies = [
+            comments[pk] for pk in children.get(comment.id, ()) if pk in comments
+        ]
+        comment.has_more_replies = comment.id in truncated
+
+    roots = [comments[pk] for pk in children.get(None, ()) if pk in comments]
+    return roots, None in truncated
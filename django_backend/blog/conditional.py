@@ -0,0 +1,88 @@
+"""
+HTTP validators (ETag / Last-Modified) for the read endpoints.
+
+Validators come from the ``version`` and ``updated_at`` of the rows a
+response is built from, including the category and author joined onto each
+blog, whether a ``Blog`` or a ``blog.fast_serializers.ListingRow``. Views
+check them right after their queries, so a conditional GET is answered
+with a 304 before any serializer runs. ETags are weak: counter writes bump
+the version, but view and like increments still held in the write-behind
+buffer (``blog.counters``) show up only once it is flushed.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .fast_serializers import ListingRow
+from .models import Blog
+
+
+def _rows(objects):
+    for obj in objects:
+        yield obj
+        if isinstance(obj, Blog):
+            for field in ('category', 'author'):
+                if Blog._meta.get_field(field).is_cached(obj):
+                    yield getattr(obj, field)
+        elif isinstance(obj, ListingRow):
+            yield from obj.joined_rows()
+        # Comment trees from build_comment_tree
+        yield from _rows(getattr(obj, 'thread_replies', ()))
+
+
+def compute_validators(objects, extra=()):
+    """``(etag, last_modified)`` for a response built from ``objects``"""
+    digest = hashlib.sha1()
+    last_modified = None
+    for obj in _rows(objects):
+        digest.update(
+            f"{obj._meta.label}:{obj.pk}:{obj.version}:{obj.updated_at.isoformat()};".encode()
+        )
+        if last_modified is None or obj.updated_at > last_modified:
+            last_modified = obj.updated_at
+    for part in extra:
+        digest.update(f"{part};".encode())
+    etag = f'W/"{digest.hexdigest()}"'
+    return etag, last_modified and int(last_modified.timestamp())
+
+
+def extend_etag(etag, extra):
+    """``etag`` of a response that also depends on ``extra``"""
+    if not extra:
+        return etag
+    digest = hashlib.sha1(etag.encode())
+    for part in extra:
+        digest.update(f"{part};".encode())
+    return f'W/"{digest.hexdigest()}"'
+
+
+def set_validators(response, etag, last_modified):
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Let an ``APIView`` answer conditional GETs.
+
+    Views call ``self.not_modified(request, objects)`` once their rows are
+    loaded and return its response when there is one; 200 responses then
+    carry the ``ETag`` and ``Last-Modified`` computed from those rows.
+    """
+    validators = None
+
+    def not_modified(self, request, objects, *extra):
+        """A 304 response if the client's copy of ``objects`` is current, else None"""
+        self.validators = compute_validators(objects, extra)
+        etag, last_modified = self.validators
+        return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.validators and response.status_code in (200, 304):
+            set_validators(response, *self.validators)
+        return response
@@ -0,0 +1,88 @@
+"""
+Denormalized row counts (counter caches) and their maintenance.
+
+``Category.count``, ``Blog.comment_count`` and ``Tag.blog_count`` are kept
+in step by the writes that change them, inside the same transaction:
+single saves and deletes through ``blog.signals`` and the bulk paths
+through ``BlogQuerySet``/``CommentQuerySet``. ``reconcile()`` (run by
+``manage.py reconcile_counters``) recounts them with set-based SQL and
+fixes any drift left by raw SQL or older code.
+
+Functions here take model classes instead of importing ``blog.models``, so
+the models can use them.
+"""
+from collections import defaultdict
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+# (model, counter field, counted model, its foreign key to the model)
+COUNTER_CACHES = (
+    ('blog.Category', 'count', 'blog.Blog', 'category'),
+    ('blog.Blog', 'comment_count', 'blog.Comment', 'blog'),
+    ('blog.Tag', 'blog_count', 'blog.BlogTag', 'tag'),
+)
+
+
+def changed_fields(model):
+    # A counter is part of the row's content, so versioned rows get a new version
+    if any(field.name == 'version' for field in model._meta.concrete_fields):
+        return {'version': F('version') + 1, 'updated_at': timezone.now()}
+    return {}
+
+
+def adjust(model, field, deltas):
+    """Add ``deltas`` (pk -> delta) to ``model.field``, one UPDATE per distinct delta"""
+    by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        if pk is not None and delta:
+            by_delta[delta].append(pk)
+    for delta, pks in by_delta.items():
+        model._base_manager.filter(pk__in=pks).update(**{field: F(field) + delta}, **changed_fields(model))
+
+
+def actual_count(child_model, foreign_key):
+    """Subquery counting the ``child_model`` rows that point at the outer row"""
+    counts = (
+        child_model._base_manager.filter(**{foreign_key: OuterRef('pk')}).order_by()
+        .values(foreign_key).annotate(n=Count('pk')).values('n')
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+def recount(queryset, field, child_model, foreign_key):
+    """Fix ``field`` on the rows of ``queryset`` whose count drifted; returns how many"""
+    actual = actual_count(child_model, foreign_key)
+    return queryset.exclude(**{field: actual}).update(
+        **{field: actual_count(child_model, foreign_key)}, **changed_fields(queryset.model)
+    )
+
+
+def recount_in_chunks(model, field, child_model, foreign_key, chunk_size=1000):
+    """``recount`` every row of ``model`` in primary key ranges of ``chunk_size``, one transaction each"""
+    rows = model._base_manager.order_by()
+    last = rows.order_by('-pk').values_list('pk', flat=True).first() or 0
+    total = 0
+    for start in range(0, last + 1, chunk_size):
+        with transaction.atomic():
+            total += recount(
+                rows.filter(pk__gte=start, pk__lt=start + chunk_size), field, child_model, foreign_key
+            )
+    return total
+
+
+def reconcile(chunk_size=1000):
+    """
+    Recount every counter cache in primary key ranges of ``chunk_size``,
+    one short transaction per range. Returns ``{label: rows fixed}``.
+    """
+    fixed = {}
+    for model_label, field, child_label, foreign_key in COUNTER_CACHES:
+        model = apps.get_model(model_label)
+        fixed[f"{model._meta.label}.{field}"] = recount_in_chunks(
+            model, field, apps.get_model(child_label), foreign_key, chunk_size
+        )
+    return fixed
@@ -0,0 +1,142 @@
+"""
+Write-behind buffer for hot counters (view and like counts).
+
+Increments are merged per (model, pk, field) in process memory and written
+out in one transaction once the buffer holds ``COUNTER_FLUSH_THRESHOLD``
+keys, once ``COUNTER_FLUSH_INTERVAL`` seconds have passed since the last
+flush, and when the worker exits. The interval is checked on each
+increment and, in server processes (``blog_project.wsgi``/``asgi``), by a
+background thread, so an idle worker does not hold increments either. Set ``COUNTER_WRITE_BEHIND = False`` to
+write every increment straight away instead. Each write bumps the row's
+``version`` and ``updated_at`` like any other change to its content, so
+HTTP validators (``blog.conditional``) move with the counts.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .counter_cache import changed_fields
+
+logger = logging.getLogger(__name__)
+
+# Keep IN (...) lists well below SQLite's bound variable limit
+FLUSH_CHUNK_SIZE = 500
+
+
+class CounterBuffer:
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = defaultdict(int)
+        self._last_flush = clock()
+        self._background = False
+        self._flusher = None
+
+    def flush_in_background(self):
+        """Also flush every ``COUNTER_FLUSH_INTERVAL`` seconds from a daemon thread"""
+        self._background = True
+
+    def increment(self, model, pk, field, delta=1):
+        """Add ``delta`` to ``model.field`` of row ``pk``"""
+        if not settings.COUNTER_WRITE_BEHIND:
+            self._write({(model, pk, field): delta})
+            return
+
+        with self._lock:
+            self._pending[(model, pk, field)] += delta
+            due = (
+                len(self._pending) >= settings.COUNTER_FLUSH_THRESHOLD or
+                self._clock() - self._last_flush >= settings.COUNTER_FLUSH_INTERVAL
+            )
+            if self._background and (self._flusher is None or not self._flusher.is_alive()):
+                # Started by the first increment of each process, since a
+                # thread started before gunicorn forks does not run in the workers
+                self._flusher = threading.Thread(
+                    target=self._flush_periodically, name='counter-flush', daemon=True
+                )
+                self._flusher.start()
+        if due:
+            self.flush()
+
+    def _flush_periodically(self):
+        while True:
+            with self._lock:
+                wait = self._last_flush + settings.COUNTER_FLUSH_INTERVAL - self._clock()
+            if wait > 0:
+                time.sleep(wait)
+                continue
+            self.flush()
+            # Not kept open between flushes by this thread
+            connections.close_all()
+
+    def pending(self, model, pk, field):
+        """Delta for ``model.field`` of row ``pk`` not yet written to the database"""
+        with self._lock:
+            return self._pending.get((model, pk, field), 0)
+
+    def get_value(self, instance, field):
+        """Persisted value of ``instance.field`` plus pending increments"""
+        return getattr(instance, field) + self.pending(type(instance), instance.pk, field)
+
+    def flush(self):
+        """Write all pending increments in a single transaction"""
+        # Only one flush at a time; a concurrent caller's increments are
+        # picked up by the flush already running or by the next one
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                batch = dict(self._pending)
+                self._pending.clear()
+                self._last_flush = self._clock()
+            if not batch:
+                return
+            try:
+                self._write(batch)
+            except Exception:
+                logger.exception("Failed to flush %d counter increments", len(batch))
+                # Put the increments back so the next flush retries them
+                with self._lock:
+                    for key, delta in batch.items():
+                        self._pending[key] += delta
+        finally:
+            self._flush_lock.release()
+
+    def _write(self, batch):
+        # Rows that received the same delta share one UPDATE ... WHERE id IN (...)
+        groups = defaultdict(list)
+        for (model, pk, field), delta in batch.items():
+            if delta:
+                groups[(model, field, delta)].append(pk)
+
+        with transaction.atomic():
+            for (model, field, delta), pks in groups.items():
+                value = F(field) + delta
+                if delta < 0:
+                    value = Greatest(value, 0)
+                for start in range(0, len(pks), FLUSH_CHUNK_SIZE):
+                    model.objects.filter(pk__in=pks[start:start + FLUSH_CHUNK_SIZE]).update(
+                        **{field: value}, **changed_fields(model)
+                    )
+
+    def clear(self):
+        """Drop pending increments without writing them"""
+        with self._lock:
+            self._pending.clear()
+
+
+counter_buffer = CounterBuffer()
+
+atexit.register(counter_buffer.flush)
+
+
+def increment(model, pk, field, delta=1):
+    counter_buffer.increment(model, pk, field, delta)
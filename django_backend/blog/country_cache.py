@@ -0,0 +1,139 @@
+"""
+In-process cache for REST Countries responses.
+
+Entries are keyed by endpoint, query parameters and the ``fields``
+projection. A fresh entry is served as is. Once it is older than the TTL
+it is still served for ``stale_ttl`` more seconds while a background
+refresh replaces it (stale-while-revalidate). Past that window the request
+refetches synchronously, and if the upstream fails, any entry younger than
+``stale_if_error`` is served instead of an error. At most ``max_entries``
+responses are kept, least recently used first out.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+
+from .outbound import get_client
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_fields(fields):
+    """Canonical form of a ``fields`` parameter so equal projections share a key"""
+    if not fields:
+        return None
+    names = sorted({name.strip() for name in fields.split(',') if name.strip()})
+    return ','.join(names) or None
+
+
+class CountryCache:
+    def __init__(self, fetch, ttl, stale_ttl, stale_if_error, max_entries,
+                 clock=time.monotonic, executor=None):
+        self._fetch = fetch
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.stale_if_error = stale_if_error
+        self.max_entries = max_entries
+        self._clock = clock
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix='country-cache'
+        )
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._refreshing = set()
+
+    def get(self, path, params=None, fields=None):
+        """Return the JSON payload for ``path``, fetching it only when needed"""
+        fields = normalize_fields(fields)
+        key = (path, tuple(sorted((params or {}).items())), fields)
+        now = self._clock()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is not None:
+            data, fetched_at = entry
+            age = now - fetched_at
+            if age < self.ttl:
+                return data
+            if age < self.ttl + self.stale_ttl:
+                self._schedule_refresh(key)
+                return data
+
+        try:
+            return self._load(key)
+        except requests.exceptions.RequestException:
+            if entry is not None and now - entry[1] < self.ttl + self.stale_if_error:
+                logger.warning("Serving stale countries data for %s after upstream error", path)
+                return entry[0]
+            raise
+
+    def _load(self, key):
+        path, params, fields = key
+        query = dict(params)
+        if fields:
+            query['fields'] = fields
+        data = self._fetch(path, query)
+        with self._lock:
+            self._entries[key] = (data, self._clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return data
+
+    def _schedule_refresh(self, key):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        self._executor.submit(self._refresh, key)
+
+    def _refresh(self, key):
+        try:
+            self._load(key)
+        except requests.exceptions.RequestException:
+            # Keep serving the stale entry; the next request retries
+            logger.warning("Background refresh of countries data for %s failed", key[0])
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def fetch_countries(path, params):
+    """Fetch ``path`` from the REST Countries API and decode the JSON body"""
+    response = get_client('countries').get(f"{settings.COUNTRIES_API_BASE}/{path}", params=params)
+    response.raise_for_status()
+    return response.json()
+
+
+_country_cache = None
+_country_cache_lock = threading.Lock()
+
+
+def get_country_cache():
+    """Process-wide cache configured from the COUNTRIES_CACHE_* settings"""
+    global _country_cache
+    with _country_cache_lock:
+        if _country_cache is None:
+            _country_cache = CountryCache(
+                fetch_countries,
+                ttl=settings.COUNTRIES_CACHE_TTL,
+                stale_ttl=settings.COUNTRIES_CACHE_STALE_TTL,
+                stale_if_error=settings.COUNTRIES_CACHE_STALE_IF_ERROR,
+                max_entries=settings.COUNTRIES_CACHE_MAX_ENTRIES,
+            )
+        return _country_cache
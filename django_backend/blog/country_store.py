@@ -0,0 +1,158 @@
+"""
+Local, indexed copy of the REST Countries dataset.
+
+The country views answer from one full snapshot held in memory instead of
+calling the upstream per request. The snapshot is read from
+``COUNTRIES_SNAPSHOT_PATH`` (written by ``manage.py refresh_countries``) and
+reloaded when that file changes. Without a snapshot file the store falls
+back to the cached ``/all`` upstream response.
+"""
+import json
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+
+from .country_cache import get_country_cache, normalize_fields
+
+
+class CountryIndex:
+    """
+    One dataset and its indexes, never changed once built: the store swaps
+    in a new one as a whole, so a reader sees either the old or the new
+    """
+    __slots__ = ('countries', 'by_code', 'by_name', 'by_independence')
+
+    def __init__(self, countries):
+        self.countries = list(countries)
+        self.by_code = {}
+        self.by_name = {}
+        self.by_independence = {True: [], False: []}
+        for country in self.countries:
+            for key in ('cca2', 'cca3', 'ccn3', 'cioc'):
+                code = country.get(key)
+                if code:
+                    self.by_code.setdefault(code.upper(), country)
+            name = country.get('name') or {}
+            for value in (name.get('common'), name.get('official')):
+                if value:
+                    self.by_name.setdefault(value.lower(), []).append(country)
+            independent = country.get('independent')
+            if independent in self.by_independence:
+                self.by_independence[independent].append(country)
+
+
+class CountryStore:
+    def __init__(self, countries=()):
+        self._lock = threading.Lock()
+        self._source = None
+        self._mtime = None
+        self.ingest(countries)
+
+    def ingest(self, countries):
+        """Replace the dataset and rebuild every index"""
+        self._index = CountryIndex(countries)
+
+    def all(self, fields=None):
+        return project(self._index.countries, fields)
+
+    def by_code(self, code, fields=None):
+        """Country with the given cca2/cca3/ccn3/cioc code, or None"""
+        country = self._index.by_code.get(code.upper())
+        if country is None:
+            return None
+        return project([country], fields)[0]
+
+    def by_name(self, name, fields=None):
+        """Countries whose common or official name matches exactly"""
+        return project(self._index.by_name.get(name.lower(), []), fields)
+
+    def by_independence(self, independent, fields=None):
+        return project(self._index.by_independence[bool(independent)], fields)
+
+    def __len__(self):
+        return len(self._index.countries)
+
+    def reset(self):
+        """Forget the dataset so the next sync loads it again"""
+        with self._lock:
+            self.ingest(())
+            self._source = None
+            self._mtime = None
+
+    def sync(self):
+        """Pick up a new snapshot file or upstream payload if there is one"""
+        path = settings.COUNTRIES_SNAPSHOT_PATH
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except (OSError, TypeError):
+            mtime = None
+
+        if mtime is not None:
+            if mtime != self._mtime:
+                with self._lock:
+                    if mtime != self._mtime:
+                        self.ingest(read_snapshot(path))
+                        self._mtime = mtime
+                        self._source = None
+            return self
+
+        # No snapshot on disk: index the cached upstream payload, re-indexing
+        # only when the cache hands back a different (refreshed) object
+        data = get_country_cache().get('all')
+        if data is not self._source:
+            with self._lock:
+                if data is not self._source:
+                    self.ingest(data)
+                    self._source = data
+                    self._mtime = None
+        return self
+
+
+def project(countries, fields):
+    """Keep only the top-level ``fields`` of each country, like the upstream API"""
+    fields = normalize_fields(fields)
+    if not fields:
+        return list(countries)
+    names = fields.split(',')
+    return [{name: country[name] for name in names if name in country} for country in countries]
+
+
+def read_snapshot(path):
+    with open(path, encoding='utf-8') as f:
+        return validate_snapshot(json.load(f))
+
+
+def validate_snapshot(countries):
+    if not isinstance(countries, list) or not countries:
+        raise ValueError("Countries snapshot must be a non-empty list")
+    for country in countries:
+        if not isinstance(country, dict) or not country.get('cca2'):
+            raise ValueError("Every country in the snapshot needs a cca2 code")
+    return countries
+
+
+def write_snapshot(countries, path):
+    """Write the snapshot next to ``path`` and move it into place atomically"""
+    countries = validate_snapshot(countries)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.countries-', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(countries, f, ensure_ascii=False, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(countries)
+
+
+country_store = CountryStore()
+
+
+def get_country_store():
+    return country_store.sync()
@@ -1,14 +1,22 @@
+from django.conf import settings
 from django.urls import path
-from .views import CountryListView, CountryDetailView, CountryIndependentListView
+from .views import (
+    CountryListView, CountryDetailView, CountryIndependentListView,
+    AsyncCountryListView, AsyncCountryDetailView, AsyncCountryIndependentListView
+)
 
-urlpatterns = [
-    path('', CountryListView.as_view(), name='country-list'),
-    path('<str:country_code>/', CountryDetailView.as_view(), name='country-detail'),
-    path('independent/<str:independent>/', CountryIndependentListView.as_view(), name='country-independent'),
-]
-from django.urls import path
-from .views.country_views import CountryIndependentListView
+# Under ASGI the non-blocking views serve the same routes (see blog_project/asgi.py)
+if settings.COUNTRIES_ASYNC_VIEWS:
+    list_view, detail_view, independent_view = (
+        AsyncCountryListView, AsyncCountryDetailView, AsyncCountryIndependentListView
+    )
+else:
+    list_view, detail_view, independent_view = (
+        CountryListView, CountryDetailView, CountryIndependentListView
+    )
 
 urlpatterns = [
-    path('independent/<str:independent>', CountryIndependentListView.as_view(), name='country-independent-list'),
+    path('', list_view.as_view(), name='country-list'),
+    path('independent/<str:independent>/', independent_view.as_view(), name='country-independent'),
+    path('<str:country_code>/', detail_view.as_view(), name='country-detail'),
 ]
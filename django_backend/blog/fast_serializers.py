@@ -0,0 +1,151 @@
+"""
+Read-only fast path for blog listings.
+
+``listing_rows(queryset)`` turns a blog queryset into ``.values()`` rows
+holding exactly the columns ``BlogListSerializer`` reads, with the category
+and author joined in, and ``serialize_blogs(rows, context)`` builds the
+same dicts that serializer would from them. No model instances are made and
+no serializer fields are bound or called, which is most of the time a page
+of a hundred blogs spends outside the database.
+
+Each row is a ``ListingRow``: it has the ``pk``, ``published_at``,
+``version`` and ``updated_at`` that keyset pagination, HTTP validators
+(``blog.conditional``) and ``blog.likes.liked_by`` read from a ``Blog``,
+so views swap one for the other and keep the same cursors and ETags.
+Parity with ``BlogListSerializer`` is checked by the tests; a field added
+there must be added here too.
+"""
+from django.db.models.query import ValuesIterable
+from django.utils import timezone
+
+from .counters import counter_buffer
+from .metrics import timed
+from .models import Author, Blog, Category
+
+BLOG_COLUMNS = (
+    'id', 'title', 'slug', 'excerpt', 'cover_image', 'read_time', 'is_featured',
+    'view_count', 'like_count', 'comment_count', 'published_at', 'tags',
+)
+CATEGORY_COLUMNS = ('id', 'name', 'slug', 'count')
+AUTHOR_COLUMNS = ('id', 'name', 'bio', 'avatar', 'role')
+# Read by blog.conditional for the validators
+VALIDATOR_COLUMNS = ('version', 'updated_at')
+
+COLUMNS = (
+    *BLOG_COLUMNS, *VALIDATOR_COLUMNS,
+    *(f"category__{column}" for column in (*CATEGORY_COLUMNS, *VALIDATOR_COLUMNS)),
+    *(f"author__{column}" for column in (*AUTHOR_COLUMNS, *VALIDATOR_COLUMNS)),
+)
+
+
+class JoinedRow:
+    """The category or author columns of a ``ListingRow``, for validators"""
+    __slots__ = ('_meta', 'pk', 'version', 'updated_at')
+
+    def __init__(self, model, pk, version, updated_at):
+        self._meta = model._meta
+        self.pk = pk
+        self.version = version
+        self.updated_at = updated_at
+
+
+class ListingRow:
+    """A blog as a ``.values()`` row, with the attributes read off a ``Blog``"""
+    __slots__ = ('values',)
+    _meta = Blog._meta
+
+    def __init__(self, values):
+        self.values = values
+
+    @property
+    def pk(self):
+        return self.values['id']
+
+    id = pk
+
+    @property
+    def published_at(self):
+        return self.values['published_at']
+
+    @property
+    def version(self):
+        return self.values['version']
+
+    @property
+    def updated_at(self):
+        return self.values['updated_at']
+
+    def joined_rows(self):
+        values = self.values
+        return (
+            JoinedRow(Category, values['category__id'], values['category__version'],
+                      values['category__updated_at']),
+            JoinedRow(Author, values['author__id'], values['author__version'], values['author__updated_at']),
+        )
+
+
+class ListingRowIterable(ValuesIterable):
+    def __iter__(self):
+        for values in super().__iter__():
+            yield ListingRow(values)
+
+
+def listing_rows(queryset):
+    """``queryset`` of blogs yielding ``ListingRow`` for ``serialize_blogs``"""
+    rows = queryset.values(*COLUMNS)
+    rows._iterable_class = ListingRowIterable
+    return rows
+
+
+def datetime_representation(value):
+    """A datetime as ``serializers.DateTimeField`` writes it"""
+    if value is None:
+        return None
+    value = value.astimezone(timezone.get_current_timezone()).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def serialize_blog(row, liked=()):
+    """``BlogListSerializer(blog).data`` of the blog in ``row``"""
+    values = row.values
+    pk = values['id']
+    return {
+        'id': pk,
+        'title': values['title'],
+        'slug': values['slug'],
+        'excerpt': values['excerpt'],
+        'cover_image': values['cover_image'],
+        'category': {
+            'id': values['category__id'],
+            'name': values['category__name'],
+            'slug': values['category__slug'],
+            'count': values['category__count'],
+        },
+        'author': {
+            'id': values['author__id'],
+            'name': values['author__name'],
+            'bio': values['author__bio'],
+            'avatar': values['author__avatar'],
+            'role': values['author__role'],
+        },
+        'read_time': values['read_time'],
+        'is_featured': values['is_featured'],
+        'view_count': values['view_count'] + counter_buffer.pending(Blog, pk, 'view_count'),
+        'like_count': values['like_count'] + counter_buffer.pending(Blog, pk, 'like_count'),
+        'liked_by_me': pk in liked,
+        'comment_count': values['comment_count'],
+        'published_at': datetime_representation(values['published_at']),
+        'tags': values['tags'],
+    }
+
+
+def serialize_blogs(rows, context=None):
+    """
+    ``BlogListSerializer(blogs, many=True, context=context).data`` of ``rows``;
+    ``context`` is the result of ``blog.likes.liked_by``
+    """
+    liked = (context or {}).get('liked_blogs', ())
+    with timed('serializer'):
+        return [serialize_blog(row, liked) for row in rows]
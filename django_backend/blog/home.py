@@ -0,0 +1,88 @@
+"""
+Precomputed home page: the featured post, the latest posts, trending posts
+and the categories, serialized once and kept in the cache as one snapshot.
+
+The snapshot depends on the ``blogs`` and ``categories`` tags of
+``blog.response_cache``, so any write to a blog or category retires it, and
+``blog.signals`` rebuilds it as soon as that write commits. A request that
+still finds no current snapshot (first start, eviction, expiry) builds it
+itself. ``HOME_SNAPSHOT_TTL`` bounds how stale the buffered view and like
+counts in it get.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .conditional import compute_validators
+from .fast_serializers import listing_rows, serialize_blogs
+from .models import Blog, Category
+from .response_cache import get_cache, lookup, tag_versions
+from .serializers import CategorySerializer
+
+SNAPSHOT_KEY = 'home-snapshot'
+SNAPSHOT_TAGS = ('blogs', 'categories')
+
+BLOG_SECTIONS = ('latest', 'trending')
+
+
+def build_snapshot():
+    """``{'data', 'etag', 'last_modified'}`` of the home page, read from the database"""
+    blogs = listing_rows(Blog.objects.all())
+    featured = blogs.filter(is_featured=True).order_by('-published_at', '-id').first()
+    latest = list(blogs.order_by('-published_at', '-id')[:settings.HOME_LATEST_COUNT])
+    since = timezone.now() - timedelta(days=settings.HOME_TRENDING_DAYS)
+    trending = list(
+        blogs.filter(published_at__gte=since)
+        .order_by('-view_count', '-like_count', '-published_at', '-id')[:settings.HOME_TRENDING_COUNT]
+    )
+    categories = list(Category.objects.all())
+    etag, last_modified = compute_validators([*filter(None, [featured]), *latest, *trending, *categories])
+    return {
+        'data': {
+            'featured': serialize_blogs([featured])[0] if featured else None,
+            'latest': serialize_blogs(latest),
+            'trending': serialize_blogs(trending),
+            'categories': CategorySerializer(categories, many=True).data,
+        },
+        'etag': etag,
+        'last_modified': last_modified,
+    }
+
+
+def refresh_snapshot():
+    """Build the snapshot and store it"""
+    # Versioned before the build, so a write landing meanwhile retires it
+    versions = tag_versions(SNAPSHOT_TAGS)
+    snapshot = build_snapshot()
+    snapshot['versions'] = versions
+    get_cache().set(SNAPSHOT_KEY, snapshot, settings.HOME_SNAPSHOT_TTL)
+    return snapshot
+
+
+def refresh_stale_snapshot():
+    # Several writes committed together schedule one refresh each; build once
+    if lookup(SNAPSHOT_KEY) is None:
+        refresh_snapshot()
+
+
+def get_snapshot():
+    return lookup(SNAPSHOT_KEY) or refresh_snapshot()
+
+
+def blog_ids(data):
+    """Ids of every blog shown in the snapshot's ``data``"""
+    ids = {blog['id'] for section in BLOG_SECTIONS for blog in data[section]}
+    if data['featured']:
+        ids.add(data['featured']['id'])
+    return ids
+
+
+def mark_liked(data, liked):
+    """Copy of ``data`` with ``liked_by_me`` set on the blogs in ``liked``"""
+    mark = lambda blog: {**blog, 'liked_by_me': blog['id'] in liked}
+    return {
+        **data,
+        'featured': data['featured'] and mark(data['featured']),
+        **{section: [mark(blog) for blog in data[section]] for section in BLOG_SECTIONS},
+    }
@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import HomeView
+
+urlpatterns = [
+    path('', HomeView.as_view(), name='home'),
+]
@@ -0,0 +1,93 @@
+"""
+Per-user likes of blogs and comments.
+
+A like is a row in ``BlogLike`` or ``CommentLike``, unique per user and
+target, so liking twice is a no-op and a toggle knows which way to go.
+``like_count`` changes only when a row was really added or removed, by one
+``F()`` increment through the counter buffer after the like is written.
+
+``liked_by(user, blogs, comments)`` answers "did I like these?" for a whole
+page with a single query; serializers read the result from their context
+(``liked_blogs`` / ``liked_comments``) for the ``liked_by_me`` field.
+"""
+from django.db import transaction
+from django.db.models import Value
+
+from . import counters
+from .models import Blog, BlogLike, Comment, CommentLike
+
+# Liked model -> (like model, its foreign key to the liked model, context key)
+LIKES = {
+    Blog: (BlogLike, 'blog', 'liked_blogs'),
+    Comment: (CommentLike, 'comment', 'liked_comments'),
+}
+
+
+def set_liked(user, target, liked):
+    """Record whether ``user`` likes ``target``; returns True if that changed anything"""
+    like_model, field, _ = LIKES[type(target)]
+    with transaction.atomic():
+        if liked:
+            _, changed = like_model.objects.get_or_create(user=user, **{field: target})
+        else:
+            changed = like_model.objects.filter(user=user, **{field: target}).delete()[0] > 0
+    # Only once the row change went through without an error
+    if changed:
+        counters.increment(type(target), target.pk, 'like_count', 1 if liked else -1)
+    return changed
+
+
+def toggle_like(user, target):
+    """Like ``target`` if ``user`` has not yet, else unlike it; returns whether it is liked now"""
+    like_model, field, _ = LIKES[type(target)]
+    with transaction.atomic():
+        liked = not like_model.objects.filter(user=user, **{field: target}).delete()[0]
+        if liked:
+            like_model.objects.create(user=user, **{field: target})
+    counters.increment(type(target), target.pk, 'like_count', 1 if liked else -1)
+    return liked
+
+
+def like_count(target):
+    """``like_count`` of ``target`` including increments not yet flushed"""
+    value = type(target).objects.values_list('like_count', flat=True).get(pk=target.pk)
+    return value + counters.counter_buffer.pending(type(target), target.pk, 'like_count')
+
+
+def _ids(objects):
+    for obj in objects:
+        yield obj.pk
+        # Comment trees from build_comment_tree
+        yield from _ids(getattr(obj, 'thread_replies', ()))
+
+
+def liked_by(user, blogs=(), comments=()):
+    """
+    Serializer context with the ids of the given blogs and comments (and
+    their loaded replies) that ``user`` liked, fetched in one query.
+    """
+    return liked_ids(user, blog_ids=list(_ids(blogs)), comment_ids=list(_ids(comments)))
+
+
+def liked_ids(user, blog_ids=(), comment_ids=()):
+    """``liked_by()`` for ids rather than model instances"""
+    liked = {context_key: set() for _, _, context_key in LIKES.values()}
+    if not user or not user.is_authenticated:
+        return liked
+    queries = []
+    for model, ids in ((Blog, blog_ids), (Comment, comment_ids)):
+        like_model, field, context_key = LIKES[model]
+        if ids:
+            queries.append(
+                like_model.objects.filter(user=user, **{f"{field}__in": ids}).order_by()
+                .annotate(kind=Value(context_key)).values_list('kind', f"{field}_id")
+            )
+    if queries:
+        for context_key, pk in queries[0].union(*queries[1:], all=True):
+            liked[context_key].add(pk)
+    return liked
+
+
+def validators(liked):
+    """ETag parts for a response showing ``liked``: the liked ids, in order"""
+    return [f"{key}={','.join(map(str, sorted(ids)))}" for key, ids in sorted(liked.items()) if ids]
@@ -0,0 +1,69 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+
+from blog.country_cache import get_country_cache
+from blog.country_store import country_store
+from blog.stub_upstream import StubCountriesUpstream
+from blog.views import AsyncCountryListView, CountryListView
+
+SAMPLE_COUNTRIES = [
+    {"name": {"common": f"Country {i}"}, "cca2": f"C{i}", "cca3": f"C{i:03d}",
+     "independent": i % 4 != 0, "region": "Stub"}
+    for i in range(250)
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire a cold burst of concurrent /api/countries/ requests at the sync (thread "
+        "per request) and async (coalesced) views against a local stub upstream"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help="Concurrent requests per run")
+        parser.add_argument('--threads', type=int, default=32, help="Worker threads for the sync run")
+        parser.add_argument('--latency', type=float, default=0.2, help="Stub upstream latency in seconds")
+
+    def handle(self, *args, **options):
+        total = options['requests']
+        factory = RequestFactory()
+
+        with StubCountriesUpstream(SAMPLE_COUNTRIES, delay=options['latency']) as upstream, \
+                override_settings(COUNTRIES_API_BASE=upstream.url, COUNTRIES_SNAPSHOT_PATH=None):
+            sync_view = CountryListView.as_view()
+            async_view = AsyncCountryListView.as_view()
+
+            def sync_call(_):
+                response = sync_view(factory.get('/api/countries/', {'fields': 'cca2'}))
+                response.render()
+                return response.status_code
+
+            async def async_burst():
+                requests = [
+                    async_view(factory.get('/api/countries/', {'fields': 'cca2'}))
+                    for _ in range(total)
+                ]
+                return [response.status_code for response in await asyncio.gather(*requests)]
+
+            def sync_burst():
+                with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+                    return list(pool.map(sync_call, range(total)))
+
+            results = []
+            for label, burst in (('sync', sync_burst), ('async', lambda: asyncio.run(async_burst()))):
+                get_country_cache().clear()
+                country_store.reset()
+                upstream.hits.clear()
+                started = time.perf_counter()
+                statuses = burst()
+                elapsed = time.perf_counter() - started
+                results.append((label, elapsed, len(upstream.hits), statuses.count(200)))
+
+        self.stdout.write(f"{total} concurrent requests, upstream latency {options['latency']:.3f}s")
+        self.stdout.write(f"{'mode':<6} {'wall (s)':>9} {'req/s':>9} {'upstream':>9} {'ok':>6}")
+        for label, elapsed, hits, ok in results:
+            self.stdout.write(f"{label:<6} {elapsed:>9.3f} {total / elapsed:>9.0f} {hits:>9} {ok:>6}")
@@ -0,0 +1,153 @@
+import json
+import platform
+import uuid
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment, teardown_databases,
+    teardown_test_environment,
+)
+from django.utils import timezone
+
+from blog import benchmark, synthetic
+from blog.models import Blog, Comment
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a separate benchmark database and measure p50/p95/p99 latency, queries and "
+        "allocated memory per request of the blog, category, comment and auth endpoints"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--blogs', type=int, default=2000, help="Blogs to seed")
+        parser.add_argument('--comments', type=int, default=20000, help="Comments to seed")
+        parser.add_argument('--categories', type=int, default=8, help="Categories to seed")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed of the synthetic data")
+        parser.add_argument('--iterations', type=int, default=50, help="Timed requests per route")
+        parser.add_argument('--warmup', type=int, default=5, help="Untimed requests per route first")
+        parser.add_argument(
+            '--memory-iterations', type=int, default=10,
+            help="Requests per route traced for queries and allocations"
+        )
+        parser.add_argument(
+            '--routes', nargs='+', metavar='NAME',
+            help=f"Only these routes: {', '.join(route.name for route in benchmark.ROUTES)}"
+        )
+        parser.add_argument(
+            '--database', metavar='PATH',
+            help="SQLite file for the benchmark data (default: in memory); with --keep, "
+                 "seeded once and reused by later runs"
+        )
+        parser.add_argument('--keep', action='store_true', help="Keep the --database file afterwards")
+        parser.add_argument(
+            '--no-response-cache', action='store_true',
+            help="Disable the response cache, measuring every request's full render"
+        )
+        parser.add_argument(
+            '--baseline', default=str(Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'),
+            help="JSON baseline to compare with (and to write with --save-baseline)"
+        )
+        parser.add_argument('--save-baseline', action='store_true', help="Write this run as the baseline")
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help="Regression when p95 or peak memory grows by more than this ratio (0.2 = 20%%)"
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError("--iterations must be at least 1")
+        try:
+            routes = benchmark.select_routes(options['routes'])
+        except benchmark.BenchmarkError as error:
+            raise CommandError(error)
+
+        database = options['database']
+        primary = connections['default'].settings_dict
+        if database:
+            if Path(database).resolve() == Path(primary['NAME']).resolve():
+                raise CommandError("--database must not be the configured database")
+            primary['TEST'] = {**primary.get('TEST', {}), 'NAME': database}
+        keep = bool(database and options['keep'])
+
+        verbosity = options['verbosity']
+        setup_test_environment(debug=False)
+        old_config = setup_databases(verbosity=max(verbosity - 1, 0), interactive=False, keepdb=keep)
+        try:
+            cache_settings = {'RESPONSE_CACHE_ENABLED': False} if options['no_response_cache'] else {}
+            with override_settings(**cache_settings):
+                meta, results = self.run_benchmark(routes, options)
+        finally:
+            teardown_databases(old_config, verbosity=max(verbosity - 1, 0), keepdb=keep)
+            teardown_test_environment()
+
+        self.report(meta, results, options)
+
+    def run_benchmark(self, routes, options):
+        if Blog.objects.exists():
+            self.stdout.write(f"Reusing {Blog.objects.count()} blogs in {options['database']}")
+        else:
+            synthetic.seed(
+                blogs=options['blogs'], comments=options['comments'],
+                categories=options['categories'], seed=options['seed'],
+                log=lambda message: self.stdout.write(f"Seeded {message}"),
+            )
+        meta = {
+            'blogs': Blog.objects.count(),
+            'comments': Comment.objects.count(),
+            'seed': options['seed'],
+            'iterations': options['iterations'],
+            'response_cache': not options['no_response_cache'],
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'created_at': timezone.now().isoformat(),
+        }
+        context = benchmark.build_context(run=uuid.uuid4().hex[:8])
+        user = benchmark.benchmark_user()
+
+        self.stdout.write(
+            f"{'route':<24} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'peak KiB':>9}"
+        )
+
+        def log(name, result):
+            self.stdout.write(
+                f"{name:<24} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+                f"{result.get('queries', '-'):>8} {result.get('peak_kib', '-'):>9}"
+            )
+
+        try:
+            results = benchmark.run(
+                routes, context, user, log=log, iterations=options['iterations'],
+                warmup=options['warmup'], memory_iterations=options['memory_iterations'],
+            )
+        except benchmark.BenchmarkError as error:
+            raise CommandError(error)
+        return meta, results
+
+    def report(self, meta, results, options):
+        path = Path(options['baseline'])
+        if options['save_baseline']:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps({'meta': meta, 'routes': results}, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {path}"))
+            return
+        if not path.exists():
+            self.stdout.write(f"No baseline at {path}; run with --save-baseline to record one")
+            return
+
+        baseline = json.loads(path.read_text())
+        for key in ('blogs', 'comments', 'response_cache'):
+            if baseline.get('meta', {}).get(key) != meta[key]:
+                self.stderr.write(self.style.WARNING(
+                    f"Baseline {key} was {baseline.get('meta', {}).get(key)}, this run {meta[key]}"
+                ))
+        regressions = benchmark.compare(baseline, results, threshold=options['threshold'])
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(self.style.ERROR(regression))
+            raise CommandError(f"{len(regressions)} regressions against {path}")
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {path}"))
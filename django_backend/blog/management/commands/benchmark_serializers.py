@@ -0,0 +1,73 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from blog.fast_serializers import listing_rows, serialize_blogs
+from blog.models import Blog
+from blog.renderers import FastJSONRenderer
+from blog.serializers import BlogListSerializer
+
+
+def drf_page(size):
+    blogs = list(Blog.objects.for_listing().order_by('-published_at', '-id')[:size])
+    return blogs, lambda: BlogListSerializer(blogs, many=True).data, JSONRenderer()
+
+
+def fast_page(size):
+    rows = list(listing_rows(Blog.objects.order_by('-published_at', '-id'))[:size])
+    return rows, lambda: serialize_blogs(rows), FastJSONRenderer()
+
+
+class Command(BaseCommand):
+    help = (
+        "Time fetching, serializing and rendering one page of blogs through BlogListSerializer "
+        "and JSONRenderer against the .values() fast path and orjson, on the configured database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=100, help="Blogs per page")
+        parser.add_argument('--rounds', type=int, default=200, help="Timed pages per path")
+
+    def handle(self, *args, **options):
+        size, rounds = options['page_size'], options['rounds']
+        if size < 1 or rounds < 1:
+            raise CommandError("--page-size and --rounds must be at least 1")
+        if not Blog.objects.exists():
+            raise CommandError("No blogs to serialize; insert some with seed_synthetic")
+
+        results, outputs = [], []
+        for label, page in (('drf', drf_page), ('fast', fast_page)):
+            timings = {'fetch': [], 'serialize': [], 'render': []}
+            for _ in range(rounds + 1):
+                started = time.perf_counter()
+                rows, serialize, renderer = page(size)
+                fetched = time.perf_counter()
+                data = serialize()
+                serialized = time.perf_counter()
+                rendered = renderer.render(data)
+                finished = time.perf_counter()
+                # The first round warms up caches and connections
+                if _:
+                    timings['fetch'].append(fetched - started)
+                    timings['serialize'].append(serialized - fetched)
+                    timings['render'].append(finished - serialized)
+            outputs.append(rendered)
+            results.append((label, len(rows), {phase: statistics.median(times) for phase, times in timings.items()}))
+
+        if json.loads(outputs[0]) != json.loads(outputs[1]):
+            raise CommandError("The fast path rendered different JSON than BlogListSerializer")
+
+        self.stdout.write(f"{results[0][1]} blogs per page, median of {rounds} pages (ms)")
+        self.stdout.write(f"{'path':<5} {'fetch':>8} {'serialize':>10} {'render':>8} {'total':>8} {'pages/s':>8}")
+        totals = []
+        for label, _, medians in results:
+            total = sum(medians.values())
+            totals.append(total)
+            self.stdout.write(
+                f"{label:<5} {medians['fetch'] * 1000:>8.2f} {medians['serialize'] * 1000:>10.2f} "
+                f"{medians['render'] * 1000:>8.2f} {total * 1000:>8.2f} {1 / total:>8.0f}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Fast path: {totals[0] / totals[1]:.1f}x the pages per second"))
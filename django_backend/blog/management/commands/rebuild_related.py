@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.related import rebuild_related
+
+
+class Command(BaseCommand):
+    help = "Recompute the precomputed related posts of every blog"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help="Processes scoring the corpus (default: one per CPU, 1 to stay in process)"
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=256,
+            help="Blogs scored per task"
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+        started = time.perf_counter()
+        count = rebuild_related(workers=options['workers'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored related posts for {count} blogs in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from blog import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the blog full-text search index from the blog table"
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            raise CommandError("Full-text search needs the SQLite backend")
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            search.create_index(cursor)
+            count = search.rebuild_index(cursor)
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} blogs"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Tag
+from blog.tags import rebuild_tag_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the normalized tag index and tag counts from Blog.tags"
+
+    def handle(self, *args, **options):
+        rebuild_tag_index()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {Tag.objects.filter(blog_count__gt=0).count()} tags in use"
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.counter_cache import reconcile
+
+
+class Command(BaseCommand):
+    help = "Recount the denormalized counters (category, comment and tag counts) and fix any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help="Rows recounted per transaction"
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+        for counter, fixed in reconcile(chunk_size=options['chunk_size']).items():
+            self.stdout.write(f"{counter}: fixed {fixed} rows")
+        self.stdout.write(self.style.SUCCESS("Counters reconciled"))
@@ -0,0 +1,40 @@
+import json
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.country_cache import fetch_countries
+from blog.country_store import validate_snapshot, write_snapshot
+
+
+class Command(BaseCommand):
+    help = "Download the full REST Countries dataset and atomically replace the local snapshot"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            help="Read the dataset from this JSON file instead of the upstream API",
+        )
+        parser.add_argument(
+            '--output',
+            default=None,
+            help="Where to write the snapshot (defaults to COUNTRIES_SNAPSHOT_PATH)",
+        )
+
+    def handle(self, *args, **options):
+        output = options['output'] or settings.COUNTRIES_SNAPSHOT_PATH
+        if not output:
+            raise CommandError("COUNTRIES_SNAPSHOT_PATH is not set and no --output was given")
+
+        try:
+            if options['file']:
+                with open(options['file'], encoding='utf-8') as f:
+                    countries = json.load(f)
+            else:
+                countries = fetch_countries('all', {})
+            count = write_snapshot(validate_snapshot(countries), output)
+        except (OSError, ValueError, requests.exceptions.RequestException) as e:
+            raise CommandError(f"Countries snapshot not refreshed: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} countries to {output}"))
@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog import synthetic
+from blog.related import rebuild_related
+
+
+class Command(BaseCommand):
+    help = (
+        "Insert deterministic synthetic users, blogs, tags, comment threads and likes for load "
+        "testing, in batches with bounded memory"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--blogs', type=int, default=100_000, help="Blogs to insert")
+        parser.add_argument('--comments', type=int, default=1_000_000, help="Comments to insert")
+        parser.add_argument('--users', type=int, default=10_000, help="Users to insert")
+        parser.add_argument('--blog-likes', type=int, default=500_000, help="Blog likes to insert")
+        parser.add_argument('--comment-likes', type=int, default=1_000_000, help="Comment likes to insert")
+        parser.add_argument('--categories', type=int, default=12, help="Categories to insert")
+        parser.add_argument('--authors', type=int, default=200, help="Authors to insert")
+        parser.add_argument('--tags', type=int, default=200, help="Distinct tags the blogs draw from")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed; the same seed inserts the same rows")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per bulk insert")
+        parser.add_argument(
+            '--related', action='store_true',
+            help="Also rebuild the related posts (slow at large volumes)"
+        )
+
+    def handle(self, *args, **options):
+        for option in ('blogs', 'comments', 'users', 'blog_likes', 'comment_likes', 'tags'):
+            if options[option] < 0:
+                raise CommandError(f"--{option.replace('_', '-')} must not be negative")
+        for option in ('categories', 'authors', 'batch_size'):
+            if options[option] < 1:
+                raise CommandError(f"--{option.replace('_', '-')} must be at least 1")
+        if options['blogs'] and not options['tags']:
+            raise CommandError("--tags must be at least 1 when inserting blogs")
+
+        started = time.perf_counter()
+
+        def log(message):
+            self.stdout.write(f"[{time.perf_counter() - started:7.1f}s] {message}")
+
+        try:
+            counts = synthetic.seed(
+                blogs=options['blogs'], comments=options['comments'], users=options['users'],
+                blog_likes=options['blog_likes'], comment_likes=options['comment_likes'],
+                categories=options['categories'], authors=options['authors'], tags=options['tags'],
+                seed=options['seed'], batch_size=options['batch_size'], log=log,
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        if options['related']:
+            rebuild_related()
+            log("related posts rebuilt")
+
+        rows = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Inserted {rows} rows in {time.perf_counter() - started:.1f}s "
+            f"(password of every user: {synthetic.SYNTHETIC_PASSWORD})"
+        ))
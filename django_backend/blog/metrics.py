@@ -0,0 +1,237 @@
+"""
+Per-request timings and per-route latency histograms.
+
+``RequestMetricsMiddleware`` (``blog.middleware``) opens a ``Timings`` for
+each request. While it is open, every database query run through Django
+is counted and timed by a wrapper installed on each new connection, and
+code marked with ``timed(phase)`` adds its duration to that phase:
+``serializer`` (``TimedSerializerMixin``), ``render`` (DRF content
+rendering) and ``outbound`` (``blog.outbound``). Nested spans of one
+phase count once. Outside a request all of this is a single context
+variable lookup.
+
+The timings go out as a ``Server-Timing`` header (``SERVER_TIMING_ENABLED``)
+and, with ``METRICS_ENABLED``, into ``registry``, which ``/api/_metrics``
+serves in the Prometheus text format. The registry lives in process
+memory, so with several workers each scrape sees the worker that answered
+it; the ``pid`` label keeps their series apart.
+"""
+import contextvars
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+
+PHASES = ('db', 'serializer', 'render', 'outbound')
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+class Timings:
+    """Durations (seconds) per phase and the query count of one request"""
+    __slots__ = ('started', 'durations', 'queries', 'active')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = defaultdict(float)
+        self.queries = 0
+        self.active = set()
+
+    def add(self, phase, seconds):
+        self.durations[phase] += seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self, total):
+        """``Server-Timing`` header value, durations in milliseconds"""
+        entries = [f'db;dur={self.durations["db"] * 1000:.2f};desc="{self.queries} queries"']
+        entries += [
+            f"{phase};dur={self.durations[phase] * 1000:.2f}"
+            for phase in PHASES[1:] if phase in self.durations
+        ]
+        entries.append(f"total;dur={total * 1000:.2f}")
+        return ', '.join(entries)
+
+
+def start():
+    """Open the timings of the current request; pass the token to ``finish``"""
+    timings = Timings()
+    return timings, _current.set(timings)
+
+
+def finish(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+class timed:
+    """Context manager adding its duration to ``phase`` of the current request"""
+    __slots__ = ('phase', 'timings', 'started')
+
+    def __init__(self, phase):
+        self.phase = phase
+
+    def __enter__(self):
+        timings = _current.get()
+        if timings is None or self.phase in timings.active:
+            # No request, or nested in a span of the same phase that counts it
+            self.timings = None
+            return self
+        timings.active.add(self.phase)
+        self.timings = timings
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        timings = self.timings
+        if timings is not None:
+            timings.add(self.phase, time.perf_counter() - self.started)
+            timings.active.discard(self.phase)
+
+
+class TimedSerializerMixin:
+    """Count the serializer's ``to_representation`` as the ``serializer`` phase"""
+
+    def to_representation(self, instance):
+        with timed('serializer'):
+            return super().to_representation(instance)
+
+
+def _record_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add('db', time.perf_counter() - started)
+        timings.queries += 1
+
+
+def _install_query_wrapper(sender, connection, **kwargs):
+    # Fired again whenever the wrapper object reconnects
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+connection_created.connect(_install_query_wrapper, dispatch_uid='blog.metrics.query_wrapper')
+
+
+class RouteStats:
+    __slots__ = ('buckets', 'sum', 'count', 'statuses', 'queries', 'phases')
+
+    def __init__(self, bounds):
+        self.buckets = [0] * len(bounds)
+        self.sum = 0.0
+        self.count = 0
+        self.statuses = defaultdict(int)
+        self.queries = 0
+        self.phases = defaultdict(float)
+
+
+class Registry:
+    """Latency histograms, status counts, query counts and phase times per (method, route)"""
+
+    def __init__(self, bounds=None):
+        self._bounds = tuple(bounds) if bounds else None
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    @property
+    def bounds(self):
+        return self._bounds or tuple(settings.METRICS_BUCKETS)
+
+    def observe(self, method, route, status, duration, timings):
+        bounds = self.bounds
+        with self._lock:
+            stats = self._routes.get((method, route))
+            if stats is None:
+                stats = self._routes[method, route] = RouteStats(bounds)
+            for index, bound in enumerate(bounds):
+                if duration <= bound:
+                    stats.buckets[index] += 1
+                    break
+            stats.sum += duration
+            stats.count += 1
+            stats.statuses[status] += 1
+            stats.queries += timings.queries
+            for phase, seconds in timings.durations.items():
+                stats.phases[phase] += seconds
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+    def exposition(self):
+        """Everything recorded, in the Prometheus text format"""
+        pid = os.getpid()
+        bounds = self.bounds
+        with self._lock:
+            routes = sorted(
+                (key, stats.buckets[:], stats.sum, stats.count, dict(stats.statuses), stats.queries,
+                 dict(stats.phases))
+                for key, stats in self._routes.items()
+            )
+        histogram, requests, queries, phases = [], [], [], []
+        for (method, route), buckets, total, count, statuses, query_count, phase_seconds in routes:
+            labels = f'pid="{pid}",method="{_escape(method)}",route="{_escape(route)}"'
+            cumulative = 0
+            for bound, observed in zip(bounds, buckets):
+                cumulative += observed
+                histogram.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            histogram.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            histogram.append(f"http_request_duration_seconds_sum{{{labels}}} {total}")
+            histogram.append(f"http_request_duration_seconds_count{{{labels}}} {count}")
+            for status, n in sorted(statuses.items()):
+                requests.append(f'http_requests_total{{{labels},status="{status}"}} {n}')
+            queries.append(f"http_request_db_queries_total{{{labels}}} {query_count}")
+            for phase, seconds in sorted(phase_seconds.items()):
+                phases.append(f'http_request_phase_seconds_total{{{labels},phase="{phase}"}} {seconds}')
+        lines = [
+            "# HELP http_request_duration_seconds Time from the request reaching Django to its response",
+            "# TYPE http_request_duration_seconds histogram",
+            *histogram,
+            "# HELP http_requests_total Responses sent, by status code",
+            "# TYPE http_requests_total counter",
+            *requests,
+            "# HELP http_request_db_queries_total Database queries run by requests",
+            "# TYPE http_request_db_queries_total counter",
+            *queries,
+            "# HELP http_request_phase_seconds_total Time requests spent in each phase",
+            "# TYPE http_request_phase_seconds_total counter",
+            *phases,
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
+
+
+def _reset_on_setting_change(setting, **kwargs):
+    # Recorded buckets only fit the bounds they were recorded with
+    if setting == 'METRICS_BUCKETS':
+        registry.reset()
+
+
+setting_changed.connect(_reset_on_setting_change, dispatch_uid='blog.metrics.reset')
+
+
+def metrics_view(request):
+    """``GET /api/_metrics``: the registry for Prometheus; 404 unless ``METRICS_ENABLED``"""
+    if not settings.METRICS_ENABLED:
+        raise Http404("Metrics are disabled")
+    return HttpResponse(registry.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,164 @@
+import itertools
+import logging
+import time
+from datetime import datetime, timezone
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.decorators import sync_and_async_middleware
+
+from . import metrics, profiling
+
+logger = logging.getLogger(__name__)
+
+
+@sync_and_async_middleware
+class RequestMetricsMiddleware:
+    """
+    Time each request by phase (see ``blog.metrics``), answer with a
+    ``Server-Timing`` header and record the request in the per-route
+    histograms. Goes first in ``MIDDLEWARE`` so the total covers the whole
+    stack; removes itself when both ``SERVER_TIMING_ENABLED`` and
+    ``METRICS_ENABLED`` are off.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING_ENABLED and not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings, token = metrics.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.finish(token)
+        return self.record(request, response, timings)
+
+    async def __acall__(self, request):
+        timings, token = metrics.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.finish(token)
+        return self.record(request, response, timings)
+
+    def record(self, request, response, timings):
+        total = timings.elapsed()
+        if settings.SERVER_TIMING_ENABLED:
+            response['Server-Timing'] = timings.server_timing(total)
+        if settings.METRICS_ENABLED:
+            match = request.resolver_match
+            # Only routes as patterns, so unknown URLs cannot add series
+            route = match.route if match else 'unmatched'
+            metrics.registry.observe(request.method, route, response.status_code, total, timings)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses render right after this, still inside __call__
+        timings = metrics.current()
+        if timings is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                timings.add('render', time.perf_counter() - started)
+
+            response.add_post_render_callback(rendered)
+        return response
+
+
+@sync_and_async_middleware
+class ProfilerMiddleware:
+    """
+    Profile the requests staff ask for (``X-Profile`` header or ``_profile``
+    parameter) and every ``PROFILE_SAMPLE_EVERY``-th request, and store the
+    profiles (see ``blog.profiling``). The response names the stored
+    profile in ``X-Profile-Id``. Goes after ``AuthenticationMiddleware``;
+    removes itself when ``PROFILING_ENABLED`` is off. Under ASGI a profile
+    covers what runs on the event loop thread, not sync views run in a
+    thread of their own.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self._requests = itertools.count(1)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        name = profiling.requested_profiler(request)
+        if name and not profiling.is_staff_request(request):
+            name = None
+        name, trigger = self.pick(name)
+        if name is None:
+            return self.get_response(request)
+
+        profiler = profiling.make_profiler(name)
+        started = time.perf_counter()
+        with profiler:
+            response = self.get_response(request)
+        return self.store(request, response, profiler, name, trigger, profiling.elapsed_ms(started))
+
+    async def __acall__(self, request):
+        name = profiling.requested_profiler(request)
+        # Only a request asking for a profile pays for the (database) check
+        if name and not await sync_to_async(profiling.is_staff_request)(request):
+            name = None
+        name, trigger = self.pick(name)
+        if name is None:
+            return await self.get_response(request)
+
+        profiler = profiling.make_profiler(name)
+        started = time.perf_counter()
+        with profiler:
+            response = await self.get_response(request)
+        return await sync_to_async(self.store)(
+            request, response, profiler, name, trigger, profiling.elapsed_ms(started)
+        )
+
+    def pick(self, name):
+        """``(profiler, trigger)`` given the one staff asked for, if any"""
+        if name:
+            return name, 'request'
+        every = settings.PROFILE_SAMPLE_EVERY
+        if every and next(self._requests) % every == 0:
+            return 'sample', 'sampled'
+        return None, None
+
+    def store(self, request, response, profiler, name, trigger, duration):
+        match = request.resolver_match
+        timings = metrics.current()
+        meta = {
+            'id': profiling.new_profile_id(),
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'method': request.method,
+            'path': request.get_full_path(),
+            'route': match.route if match else 'unmatched',
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'cache': response.get('X-Cache'),
+            'duration_ms': duration,
+            'profiler': name,
+            'trigger': trigger,
+            'interval': settings.PROFILE_SAMPLE_INTERVAL if name == 'sample' else None,
+            'queries': timings.queries if timings else None,
+            'phases_ms': {
+                phase: round(seconds * 1000, 2) for phase, seconds in timings.durations.items()
+            } if timings else {},
+        }
+        try:
+            profiling.save(profiler, meta)
+        except OSError:
+            logger.exception("Failed to store the profile of %s %s", request.method, meta['path'])
+            return response
+        response['X-Profile-Id'] = meta['id']
+        return response
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+# The DDL as it stood when this migration was written, kept here rather than
+# imported from blog.search so later changes there don't rewrite history
+
+CREATE_INDEX = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS blog_search USING fts5("
+    "title, excerpt, content, tags, tokenize='porter unicode61 remove_diacritics 2')"
+)
+
+POPULATE_INDEX = (
+    "INSERT INTO blog_search (rowid, title, excerpt, content, tags) "
+    "SELECT b.id, b.title, b.excerpt, b.content, "
+    "COALESCE((SELECT group_concat(t.value, ' ') FROM json_each(b.tags) AS t), '') "
+    "FROM blog_blog AS b"
+)
+
+DROP_INDEX = "DROP TABLE IF EXISTS blog_search"
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(CREATE_INDEX)
+        cursor.execute(POPULATE_INDEX)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(DROP_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def index_existing_tags(apps, schema_editor):
+    Blog = apps.get_model('blog', 'Blog')
+    Tag = apps.get_model('blog', 'Tag')
+    BlogTag = apps.get_model('blog', 'BlogTag')
+
+    tags = {}
+    links = []
+    for blog_id, names in Blog.objects.values_list('id', 'tags').iterator():
+        seen = set()
+        for name in names or ():
+            name = str(name).strip()
+            slug = slugify(name)[:100]
+            if not slug or slug in seen:
+                continue
+            seen.add(slug)
+            tag = tags.get(slug)
+            if tag is None:
+                tag = tags[slug] = Tag.objects.create(slug=slug, name=name[:100])
+            tag.blog_count += 1
+            links.append(BlogTag(blog_id=blog_id, tag=tag))
+    BlogTag.objects.bulk_create(links, batch_size=1000)
+    Tag.objects.bulk_update(tags.values(), ['blog_count'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_blog_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(max_length=100, unique=True)),
+                ('blog_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-blog_count', 'name'], name='blog_tag_count_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='BlogTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('blog', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='blog.blog')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blog_links', to='blog.tag')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tag', 'blog'), name='blog_blogtag_unique')],
+            },
+        ),
+        migrations.RunPython(index_existing_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_tag_index'),
+    ]
+
+    # The table only: fill it with `manage.py rebuild_related`. Until then
+    # the related-posts endpoint tops up from the blog's category
+    operations = [
+        migrations.CreateModel(
+            name='RelatedBlog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('blog', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_links', to='blog.blog')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_by', to='blog.blog')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('blog', 'rank'), name='blog_relatedblog_rank_unique')],
+            },
+        ),
+    ]
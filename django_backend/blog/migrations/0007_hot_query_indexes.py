@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:21
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_published_at(apps, schema_editor):
+    Blog = apps.get_model('blog', 'Blog')
+    BlogTag = apps.get_model('blog', 'BlogTag')
+    BlogTag.objects.update(published_at=Subquery(
+        Blog.objects.filter(pk=OuterRef('blog_id')).values('published_at')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_likes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogtag',
+            name='published_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(copy_published_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['published_at'], name='blog_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['category', 'published_at'], name='blog_category_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['is_featured', 'published_at'], name='blog_featured_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blogtag',
+            index=models.Index(fields=['tag', 'published_at', 'blog'], name='blogtag_tag_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['blog', 'created_at'], name='comment_blog_created_idx'),
+        ),
+    ]
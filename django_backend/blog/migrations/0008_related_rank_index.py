@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='relatedblog',
+            index=models.Index(fields=['rank', 'blog', 'score'], name='relatedblog_rank_idx'),
+        ),
+    ]
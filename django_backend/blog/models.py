@@ -1,9 +1,33 @@
-from django.db import models
+from collections import Counter
+
+from django.conf import settings
+from django.db import models, router, transaction
 from django.contrib.auth.models import User
 from django.utils.text import slugify
 from django.utils import timezone
 
-class Category(models.Model):
+from . import counter_cache
+
+class VersionedModel(models.Model):
+    """Row with a modification time and a version bumped on every save, for HTTP validators"""
+    updated_at = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=1, editable=False)
+    
+    class Meta:
+        abstract = True
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            self.version += 1
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'updated_at', 'version'}
+        # post_save receivers (counter caches, indexes) join the same transaction
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+class Category(VersionedModel):
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True)
     count = models.IntegerField(default=0)
@@ -19,7 +43,7 @@ class Category(models.Model):
     class Meta:
         verbose_name_plural = "Categories"
 
-class Author(models.Model):
+class Author(VersionedModel):
     name = models.CharField(max_length=100)
     bio = models.TextField(blank=True, null=True)
     avatar = models.URLField(blank=True, null=True)
@@ -28,7 +52,62 @@ class Author(models.Model):
     def __str__(self):
         return self.name
 
-class Blog(models.Model):
+class CountedQuerySet(models.QuerySet):
+    """
+    QuerySet of rows counted in a counter cache on their parent row.
+    
+    ``counted_in`` names the foreign key to the parent and the parent's
+    counter field. Bulk inserts and updates that re-parent rows adjust the
+    counter in the same transaction; saves and deletes go through
+    ``blog.signals``.
+    """
+    counted_in = None
+    
+    def _counter(self):
+        foreign_key, field = self.counted_in
+        return self.model._meta.get_field(foreign_key).related_model, foreign_key, field
+    
+    def bulk_create(self, objs, *args, **kwargs):
+        parent, foreign_key, field = self._counter()
+        objs = list(objs)
+        with transaction.atomic(using=self.db):
+            created = super().bulk_create(objs, *args, **kwargs)
+            attname = f"{foreign_key}_id"
+            if kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts'):
+                # Which rows went in is unknown, so count the parents again
+                parents = parent._base_manager.filter(pk__in={getattr(obj, attname) for obj in objs})
+                counter_cache.recount(parents, field, self.model, foreign_key)
+            else:
+                counter_cache.adjust(parent, field, Counter(getattr(obj, attname) for obj in created))
+        return created
+    
+    def update(self, **kwargs):
+        parent, foreign_key, field = self._counter()
+        if foreign_key not in kwargs and f"{foreign_key}_id" not in kwargs:
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            before = set(self.order_by().values_list(f"{foreign_key}_id", flat=True).distinct())
+            updated = super().update(**kwargs)
+            new = kwargs.get(foreign_key, kwargs.get(f"{foreign_key}_id"))
+            new = getattr(new, 'pk', new)
+            parents = parent._base_manager.all()
+            if new is None or isinstance(new, int):
+                parents = parents.filter(pk__in=before | {new})
+            counter_cache.recount(parents, field, self.model, foreign_key)
+        return updated
+
+class BlogQuerySet(CountedQuerySet):
+    counted_in = ('category', 'count')
+    
+    def for_listing(self):
+        """Rows for list endpoints: join category and author, skip the body"""
+        return self.select_related('category', 'author').defer('content')
+    
+    def for_detail(self):
+        """Rows for detail endpoints: join category and author"""
+        return self.select_related('category', 'author')
+
+class Blog(VersionedModel):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     excerpt = models.TextField()
@@ -44,15 +123,81 @@ class Blog(models.Model):
     published_at = models.DateTimeField(default=timezone.now)
     tags = models.JSONField(default=list)
     
+    objects = BlogQuerySet.as_manager()
+    
     def __str__(self):
         return self.title
     
+    class Meta:
+        # Listings page newest first on (published_at, id); SQLite appends
+        # the id to every index entry and scans them in either direction
+        indexes = [
+            models.Index(fields=['published_at'], name='blog_published_idx'),
+            models.Index(fields=['category', 'published_at'], name='blog_category_published_idx'),
+            models.Index(fields=['is_featured', 'published_at'], name='blog_featured_published_idx'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored category so writes can tell when it changes
+        instance._loaded_category_id = instance.__dict__.get('category_id')
+        return instance
+    
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
         super().save(*args, **kwargs)
+        self._loaded_category_id = self.category_id
+
+class Tag(models.Model):
+    """Normalized tag, kept in step with ``Blog.tags`` by ``blog.tags``"""
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100, unique=True)
+    blog_count = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return self.name
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['-blog_count', 'name'], name='blog_tag_count_idx'),
+        ]
 
-class Comment(models.Model):
+class BlogTag(models.Model):
+    blog = models.ForeignKey(Blog, on_delete=models.CASCADE, related_name='tag_links')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='blog_links')
+    # Copy of blog.published_at, so a tag's posts page newest first from one index
+    published_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tag', 'blog'], name='blog_blogtag_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['tag', 'published_at', 'blog'], name='blogtag_tag_published_idx'),
+        ]
+
+class RelatedBlog(models.Model):
+    """One of the precomputed nearest neighbours of a blog, see ``blog.related``"""
+    blog = models.ForeignKey(Blog, on_delete=models.CASCADE, related_name='related_links')
+    related = models.ForeignKey(Blog, on_delete=models.CASCADE, related_name='related_by')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['blog', 'rank'], name='blog_relatedblog_rank_unique'),
+        ]
+        indexes = [
+            # The last-ranked score of every list, read on each blog save
+            models.Index(fields=['rank', 'blog', 'score'], name='relatedblog_rank_idx'),
+        ]
+
+class CommentQuerySet(CountedQuerySet):
+    counted_in = ('blog', 'comment_count')
+
+class Comment(VersionedModel):
     blog = models.ForeignKey(Blog, on_delete=models.CASCADE, related_name='comments')
     name = models.CharField(max_length=100)
     avatar = models.URLField(blank=True, null=True)
@@ -61,5 +206,48 @@ class Comment(models.Model):
     parent = models.ForeignKey('self', on_delete=models.CASCADE, related_name='replies', null=True, blank=True)
     created_at = models.DateTimeField(default=timezone.now)
     
+    objects = CommentQuerySet.as_manager()
+    
     def __str__(self):
         return f"Comment by {self.name} on {self.blog.title}"
+    
+    class Meta:
+        indexes = [
+            # A blog's whole thread in (created_at, id) order, see blog.comment_tree
+            models.Index(fields=['blog', 'created_at'], name='comment_blog_created_idx'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored blog so writes can tell when it changes
+        instance._loaded_blog_id = instance.__dict__.get('blog_id')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_blog_id = self.blog_id
+
+
+class BlogLike(models.Model):
+    """A user's like of a blog, see ``blog.likes``"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='blog_likes')
+    blog = models.ForeignKey(Blog, on_delete=models.CASCADE, related_name='likes')
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        constraints = [
+            # Also serves the per-page "liked by me" lookup (user, blog IN ...)
+            models.UniqueConstraint(fields=['user', 'blog'], name='blog_bloglike_unique'),
+        ]
+
+class CommentLike(models.Model):
+    """A user's like of a comment, see ``blog.likes``"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='comment_likes')
+    comment = models.ForeignKey(Comment, on_delete=models.CASCADE, related_name='likes')
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'comment'], name='blog_commentlike_unique'),
+        ]
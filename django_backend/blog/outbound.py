@@ -0,0 +1,236 @@
+"""
+Shared client for outbound HTTP calls made by proxy views.
+
+One ``OutboundClient`` exists per upstream. It keeps a pooled keep-alive
+``requests.Session``, bounds every call by an overall deadline, retries
+connection errors, timeouts and 502/503/504 responses a few times with
+jittered exponential backoff, and trips a circuit breaker after repeated
+failures so callers fail fast until the upstream recovers. Other request
+errors are raised straight away but count as failures too. Per-upstream
+latency and error counters are available from ``upstream_stats()``.
+
+Every error raised is a ``requests.exceptions.RequestException``, so
+callers handle it the same way as a plain ``requests`` failure.
+"""
+import random
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from requests.adapters import HTTPAdapter
+
+from .metrics import timed
+
+RETRY_STATUSES = frozenset({502, 503, 504})
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """The upstream failed repeatedly; the call was not attempted"""
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """No time left in the call's deadline for another attempt"""
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold, reset_timeout, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self):
+        """Whether a call may go out now; half-open lets one trial call through"""
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+            self._trial_running = False
+
+
+class UpstreamStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.rejected = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def record(self, latency, error=False):
+        with self._lock:
+            self.requests += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+            if error:
+                self.errors += 1
+
+    def add(self, field):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'retries': self.retries,
+                'rejected': self.rejected,
+                'latency_avg': self.latency_total / self.requests if self.requests else 0.0,
+                'latency_max': self.latency_max,
+            }
+
+
+class OutboundClient:
+    def __init__(self, name, deadline=5.0, connect_timeout=2.0, max_retries=2,
+                 backoff=0.1, pool_size=10, failure_threshold=5, reset_timeout=30.0,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.name = name
+        self.deadline = deadline
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._clock = clock
+        self._sleep = sleep
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout, clock=clock)
+        self.stats = UpstreamStats()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, url, params=None, deadline=None):
+        """GET ``url`` within ``deadline`` seconds and return the response"""
+        # Retries and backoff included: the request waits for all of it
+        with timed('outbound'):
+            return self._get(url, params, deadline)
+
+    def _get(self, url, params, deadline):
+        if not self.breaker.allow():
+            self.stats.add('rejected')
+            raise CircuitOpenError(f"Circuit open for upstream {self.name}")
+
+        expires = self._clock() + (deadline or self.deadline)
+        attempt = 0
+        while True:
+            remaining = expires - self._clock()
+            if remaining <= 0:
+                self.breaker.record_failure()
+                raise DeadlineExceeded(f"Deadline exceeded calling upstream {self.name}")
+
+            started = self._clock()
+            try:
+                response = self.session.get(
+                    url, params=params,
+                    timeout=(min(self.connect_timeout, remaining), remaining),
+                )
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self.stats.record(self._clock() - started, error=True)
+                error, response = e, None
+            except requests.exceptions.RequestException:
+                # Not worth retrying (bad URL, redirect loop, broken body), but
+                # still a failure, and it ends a half-open trial
+                self.stats.record(self._clock() - started, error=True)
+                self.breaker.record_failure()
+                raise
+            else:
+                failed = response.status_code in RETRY_STATUSES
+                self.stats.record(self._clock() - started, error=failed)
+                if not failed:
+                    self.breaker.record_success()
+                    return response
+                error = None
+
+            if attempt >= self.max_retries:
+                self.breaker.record_failure()
+                if error is not None:
+                    raise error
+                return response
+
+            # Full jitter, but never sleep past the deadline
+            pause = random.uniform(0, self.backoff * 2 ** attempt)
+            pause = min(pause, max(0.0, expires - self._clock()))
+            if pause:
+                self._sleep(pause)
+            attempt += 1
+            self.stats.add('retries')
+
+    def close(self):
+        self.session.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name):
+    """Process-wide client for the upstream ``name``, configured from OUTBOUND_HTTP"""
+    with _clients_lock:
+        client = _clients.get(name)
+        if client is None:
+            options = dict(settings.OUTBOUND_HTTP.get('default', {}))
+            options.update(settings.OUTBOUND_HTTP.get(name, {}))
+            client = _clients[name] = OutboundClient(name, **options)
+        return client
+
+
+def reset_clients():
+    """Close and forget every client so the next call picks up fresh settings"""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+@receiver(setting_changed)
+def _reset_clients_on_setting_change(setting, **kwargs):
+    if setting == 'OUTBOUND_HTTP':
+        reset_clients()
+
+
+def upstream_stats():
+    """Latency and error counters for every upstream called so far"""
+    with _clients_lock:
+        clients = list(_clients.values())
+    return {client.name: dict(client.stats.as_dict(), circuit=client.breaker.state) for client in clients}
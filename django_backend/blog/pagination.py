@@ -0,0 +1,137 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class BlogKeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over (published_at, id), newest first.
+
+    The cursor is an opaque token holding the position of the row at the
+    edge of the current page, so every page is a bounded index range scan
+    instead of an OFFSET scan.
+    """
+    page_size = api_settings.PAGE_SIZE or 10
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    # Columns holding (published_at, id) to order and filter on. A view can
+    # point them at a joined copy with a better index, such as the tag
+    # index's (tag, published_at, blog).
+    ordering_fields = ('published_at', 'id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+
+        published_field, id_field = self.ordering_fields
+        queryset = queryset.order_by()
+        if self.cursor is None:
+            reverse = False
+        else:
+            published_at, pk, reverse = self.cursor
+            lookup = 'gt' if reverse else 'lt'
+            queryset = queryset.filter(
+                Q(**{f"{published_field}__{lookup}": published_at}) |
+                Q(**{published_field: published_at, f"{id_field}__{lookup}": pk})
+            )
+
+        if reverse:
+            queryset = queryset.order_by(published_field, id_field)
+        else:
+            queryset = queryset.order_by(f"-{published_field}", f"-{id_field}")
+
+        # Fetch one extra row to find out whether there is a further page
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_previous = has_more
+            self.has_next = True
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            published_at = parse_datetime(data['p'])
+            pk = int(data['i'])
+            reverse = bool(data.get('r', False))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if published_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return published_at, pk, reverse
+
+    def encode_cursor(self, obj, reverse):
+        data = {'p': obj.published_at.isoformat(), 'i': obj.pk}
+        if reverse:
+            data['r'] = 1
+        token = base64.urlsafe_b64encode(
+            json.dumps(data, separators=(',', ':')).encode('ascii')
+        ).decode('ascii').rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # Walked past the end: go back to the first page
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_links(self):
+        return OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ])
+
+    def get_paginated_response(self, data):
+        payload = self.get_links()
+        payload['results'] = data
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,16 @@
+from django.urls import path
+from .views import (
+    ProfileListView,
+    ProfileDetailView,
+    ProfileCollapsedView,
+    ProfileStatsView,
+    RouteCollapsedView
+)
+
+urlpatterns = [
+    path('', ProfileListView.as_view(), name='profile-list'),
+    path('collapsed/', RouteCollapsedView.as_view(), name='profile-aggregate'),
+    path('<str:profile_id>/', ProfileDetailView.as_view(), name='profile-detail'),
+    path('<str:profile_id>/collapsed/', ProfileCollapsedView.as_view(), name='profile-collapsed'),
+    path('<str:profile_id>/pstats/', ProfileStatsView.as_view(), name='profile-pstats'),
+]
@@ -0,0 +1,222 @@
+"""
+On-demand profiles of single requests, stored for later download.
+
+``ProfilerMiddleware`` (``blog.middleware``) profiles a request when a staff
+user asks for it with an ``X-Profile`` header or a ``_profile`` query
+parameter, and every ``PROFILE_SAMPLE_EVERY``-th request of each process
+whoever sent it. The value picks the profiler:
+
+- ``sample`` (the default): a thread reads the request thread's stack every
+  ``PROFILE_SAMPLE_INTERVAL`` seconds and counts each distinct stack. The
+  result is in the collapsed format ``flamegraph.pl`` and speedscope read,
+  and adds up across requests. A request shorter than the interval may
+  come back with no samples.
+- ``cprofile``: deterministic ``cProfile`` stats, exact call counts but a
+  slower request; stored as a ``.prof`` file for ``pstats`` or snakeviz.
+
+Both cover the view, the serializers and the rendering. Each profile is a
+JSON file in ``PROFILE_DIR`` with the route, status, duration and phase
+timings of the request (``.prof`` next to it for cProfile); the oldest are
+deleted past ``PROFILE_MAX_STORED``. ``/api/_profiles/`` lists, downloads
+and aggregates them for staff.
+"""
+import cProfile
+import json
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+from django.conf import settings
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.settings import api_settings
+
+PROFILERS = ('sample', 'cprofile')
+
+_PROFILE_ID = re.compile(r'^[0-9]{8}T[0-9]{12}-[0-9a-f]{8}$')
+
+
+class StackSampler:
+    """Count the stacks a thread runs below the frame that entered the sampler"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self._target = threading.get_ident()
+        # Frames from here up are the server and middleware; only count below
+        self._root = sys._getframe(1)
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self._root = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            names = []
+            while frame is not None and frame is not self._root:
+                names.append(frame_name(frame))
+                frame = frame.f_back
+            if frame is None:
+                # The request thread has left the sampled block
+                continue
+            self.samples += 1
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def collapsed(self):
+        return dict(self.stacks)
+
+
+class CProfiler:
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.samples = None
+
+    def __enter__(self):
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profile.disable()
+
+    def collapsed(self):
+        # cProfile keeps caller/callee pairs, not stacks
+        return {}
+
+
+def frame_name(frame):
+    return f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_qualname}"
+
+
+def requested_profiler(request):
+    """The profiler the request asks for, or None; see ``is_staff_request``"""
+    value = request.META.get('HTTP_X_PROFILE') or request.GET.get('_profile')
+    if not value or value.lower() in ('0', 'false', 'off'):
+        return None
+    return value.lower() if value.lower() in PROFILERS else 'sample'
+
+
+def is_staff_request(request):
+    """
+    Whether a request comes from staff, by its session or, before the view
+    gets to check them, by the credentials it carries for DRF
+    """
+    if request.user.is_staff:
+        return True
+    if 'HTTP_AUTHORIZATION' not in request.META:
+        return False
+    for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        if issubclass(authentication, SessionAuthentication):
+            continue
+        try:
+            result = authentication().authenticate(request)
+        except AuthenticationFailed:
+            return False
+        if result is not None:
+            return result[0].is_staff
+    return False
+
+
+def make_profiler(name):
+    if name == 'cprofile':
+        return CProfiler()
+    return StackSampler(settings.PROFILE_SAMPLE_INTERVAL)
+
+
+def new_profile_id():
+    # Sorts by creation time
+    return f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+
+
+def is_profile_id(value):
+    return bool(_PROFILE_ID.match(value))
+
+
+def save(profiler, meta):
+    """Write a profile and its metadata to ``PROFILE_DIR``; returns the metadata"""
+    directory = settings.PROFILE_DIR
+    directory.mkdir(parents=True, exist_ok=True)
+    profile_id = meta['id']
+    meta = {**meta, 'samples': profiler.samples, 'stacks': profiler.collapsed()}
+    if isinstance(profiler, CProfiler):
+        profiler.profile.dump_stats(directory / f"{profile_id}.prof")
+    # Write then rename, so a listing never reads half a file
+    partial = directory / f"{profile_id}.json.tmp"
+    partial.write_text(json.dumps(meta))
+    partial.replace(directory / f"{profile_id}.json")
+    prune(settings.PROFILE_MAX_STORED)
+    return meta
+
+
+def prune(keep):
+    """Delete all but the newest ``keep`` profiles"""
+    for path in sorted(settings.PROFILE_DIR.glob('*.json'), reverse=True)[keep:]:
+        path.unlink(missing_ok=True)
+        path.with_suffix('.prof').unlink(missing_ok=True)
+
+
+def load(profile_id):
+    """A stored profile with its stacks, or None"""
+    if not is_profile_id(profile_id):
+        return None
+    try:
+        return json.loads((settings.PROFILE_DIR / f"{profile_id}.json").read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def pstats_path(profile_id):
+    """Path of a profile's cProfile stats, or None"""
+    if not is_profile_id(profile_id):
+        return None
+    path = settings.PROFILE_DIR / f"{profile_id}.prof"
+    return path if path.exists() else None
+
+
+def stored(route=None):
+    """Stored profiles, newest first, optionally only those of one route pattern"""
+    if not settings.PROFILE_DIR.is_dir():
+        return
+    for path in sorted(settings.PROFILE_DIR.glob('*.json'), reverse=True):
+        profile = load(path.stem)
+        if profile is not None and (route is None or profile['route'] == route):
+            yield profile
+
+
+def summary(profile):
+    """A profile's metadata without its stacks"""
+    return {key: value for key, value in profile.items() if key != 'stacks'}
+
+
+def aggregate(profiles):
+    """Sum the sampled stacks of several profiles"""
+    total = Counter()
+    for profile in profiles:
+        total.update(profile['stacks'])
+    return total
+
+
+def collapsed_text(stacks):
+    """Stacks as ``frame;frame;frame count`` lines, heaviest first"""
+    return ''.join(
+        f"{stack} {count}\n"
+        for stack, count in sorted(stacks.items(), key=lambda item: (-item[1], item[0]))
+    )
+
+
+def elapsed_ms(started):
+    return round((time.perf_counter() - started) * 1000, 2)
@@ -0,0 +1,183 @@
+"""
+Precomputed related posts.
+
+Each blog keeps its ``RELATED_BLOGS_TOP_K`` most similar blogs as
+``RelatedBlog`` rows, ranked by ``blog.similarity`` (TF-IDF over the text
+plus tag overlap), so the related-posts endpoint is a single indexed lookup.
+
+Saving a blog re-scores just that blog against an in-process index of the
+corpus and patches its own neighbours plus the lists it enters or drops
+out of. That runs once the save has committed (see ``blog.signals``), so
+scoring, and building the index on a cold or expired worker, never hold
+the database write lock. ``manage.py rebuild_related`` recomputes
+everything, scoring the corpus in a process pool; migrations leave the
+table empty for it to fill.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+
+from . import similarity
+from .models import Blog, RelatedBlog
+
+# Keep IN (...) lists well below SQLite's bound variable limit
+CHUNK_SIZE = 500
+
+_index = None
+_index_built = None
+_index_lock = threading.Lock()
+
+
+def load_documents():
+    rows = Blog.objects.values_list('id', 'title', 'excerpt', 'content', 'tags').order_by('id')
+    for row in rows.iterator(chunk_size=1000):
+        yield similarity.Document(*row)
+
+
+def build_index():
+    return similarity.SimilarityIndex(load_documents(), tag_weight=settings.RELATED_BLOGS_TAG_WEIGHT)
+
+
+def get_index():
+    """
+    The process-local similarity index, rebuilt once it is older than
+    ``RELATED_BLOGS_INDEX_TTL`` so writes made by other workers show up
+    """
+    global _index, _index_built
+    with _index_lock:
+        if _index is None or time.monotonic() - _index_built >= settings.RELATED_BLOGS_INDEX_TTL:
+            _index = build_index()
+            _index_built = time.monotonic()
+        return _index
+
+
+def reset_index():
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def update_blog_related(pk):
+    """Re-score blog ``pk`` as stored and patch every neighbour list it affects"""
+    k = settings.RELATED_BLOGS_TOP_K
+    row = Blog.objects.filter(pk=pk).values_list('id', 'title', 'excerpt', 'content', 'tags').first()
+    if row is None:
+        # Deleted before its update ran
+        return
+    doc = similarity.Document(*row)
+    index = get_index()
+    with _index_lock:
+        ids, scores = index.score(doc)
+        index.replace(doc)
+    scored = dict(zip(ids.tolist(), scores.tolist()))
+
+    # Only the patch itself takes the write lock
+    with transaction.atomic():
+        # The k-th score of a full list is what a newcomer has to beat; only
+        # blogs it scored against at all can take it in
+        candidates = [blog_id for blog_id, score in scored.items() if score > 0]
+        thresholds = _thresholds(candidates, k)
+        linking = set(RelatedBlog.objects.filter(related_id=pk).values_list('blog_id', flat=True))
+        affected = linking | {
+            blog_id for blog_id in candidates if scored[blog_id] > thresholds.get(blog_id, 0)
+        }
+        own = [related_id for related_id, _ in similarity.top_k(ids, scores, 2 * k)]
+        # The index may still hold blogs another worker has deleted
+        existing = _existing_ids(affected.union(own))
+        affected &= existing
+
+        lists = {blog_id: [] for blog_id in affected}
+        for blog_id, related_id, score in _current_rows(affected):
+            if related_id != pk:
+                lists[blog_id].append((related_id, score))
+        for blog_id, neighbours in lists.items():
+            if scored.get(blog_id, 0) > 0:
+                neighbours.append((pk, scored[blog_id]))
+            lists[blog_id] = sorted(neighbours, key=lambda pair: (-pair[1], pair[0]))[:k]
+        lists[pk] = [(related_id, scored[related_id]) for related_id in own if related_id in existing][:k]
+
+        _write_lists(lists)
+
+
+def remove_blog_related(blog_id):
+    with _index_lock:
+        if _index is not None:
+            _index.discard(blog_id)
+
+
+def rebuild_related(workers=None, chunk_size=256):
+    """
+    Recompute the neighbours of every blog; returns the number of blogs
+    that got at least one. ``workers`` > 1 scores chunks in a process pool.
+    """
+    global _index, _index_built
+    k = settings.RELATED_BLOGS_TOP_K
+    index = build_index()
+    chunks = [range(start, min(start + chunk_size, index.size)) for start in range(0, index.size, chunk_size)]
+    workers = os.cpu_count() if workers is None else workers
+
+    lists = {}
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(chunks)),
+            initializer=similarity.init_worker, initargs=(index, k)
+        ) as pool:
+            for results in pool.map(similarity.score_worker_chunk, chunks):
+                lists.update(results)
+    else:
+        for chunk in chunks:
+            lists.update(similarity.neighbours_chunk(index, chunk, k))
+
+    with transaction.atomic():
+        RelatedBlog.objects.all().delete()
+        RelatedBlog.objects.bulk_create(_rows(lists), batch_size=1000)
+
+    with _index_lock:
+        _index, _index_built = index, time.monotonic()
+    return sum(1 for neighbours in lists.values() if neighbours)
+
+
+def _existing_ids(ids):
+    ids = list(ids)
+    existing = set()
+    for start in range(0, len(ids), CHUNK_SIZE):
+        existing.update(Blog.objects.filter(id__in=ids[start:start + CHUNK_SIZE]).values_list('id', flat=True))
+    return existing
+
+
+def _thresholds(blog_ids, k):
+    """``{blog_id: score}`` of the last of ``k`` neighbours, for the blogs whose list is full"""
+    thresholds = {}
+    for start in range(0, len(blog_ids), CHUNK_SIZE):
+        thresholds.update(RelatedBlog.objects.filter(
+            blog_id__in=blog_ids[start:start + CHUNK_SIZE], rank=k - 1
+        ).values_list('blog_id', 'score'))
+    return thresholds
+
+
+def _current_rows(blog_ids):
+    blog_ids = list(blog_ids)
+    for start in range(0, len(blog_ids), CHUNK_SIZE):
+        yield from RelatedBlog.objects.filter(blog_id__in=blog_ids[start:start + CHUNK_SIZE]).values_list(
+            'blog_id', 'related_id', 'score'
+        )
+
+
+def _write_lists(lists):
+    blog_ids = list(lists)
+    for start in range(0, len(blog_ids), CHUNK_SIZE):
+        RelatedBlog.objects.filter(blog_id__in=blog_ids[start:start + CHUNK_SIZE]).delete()
+    RelatedBlog.objects.bulk_create(_rows(lists), batch_size=1000)
+
+
+def _rows(lists):
+    return [
+        RelatedBlog(blog_id=blog_id, related_id=related_id, score=score, rank=rank)
+        for blog_id, neighbours in lists.items()
+        for rank, (related_id, score) in enumerate(neighbours)
+    ]
+
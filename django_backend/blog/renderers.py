@@ -0,0 +1,27 @@
+"""
+JSON rendering through orjson.
+
+``FastJSONRenderer`` writes the same bytes as DRF's ``JSONRenderer`` for
+compact output, several times faster. Types orjson does not know (dates,
+decimals, lazy strings) go through DRF's encoder as before; indented output
+(the browsable API, ``Accept: application/json; indent=4``) is left to
+``JSONRenderer``. Floats are written in the shortest form that reads back
+the same, which may differ in spelling (``1e-7``) from ``json``'s.
+"""
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class FastJSONRenderer(JSONRenderer):
+    _encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (data is None or self.ensure_ascii or not self.compact or
+                self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        rendered = orjson.dumps(data, default=self._encoder.default, option=OPTIONS)
+        # Like JSONRenderer, keep the output a strict JavaScript subset
+        return rendered.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
@@ -0,0 +1,226 @@
+"""
+Server-side cache of rendered GET responses for the public read endpoints.
+
+Entries are keyed by absolute URL, ``Accept`` header and auth class, and
+hold the rendered bytes. Each entry records the version of every tag it
+depends on: collections such as ``blogs`` or ``categories`` and objects
+such as ``blog:12``. Writes bump the versions of the tags they touch
+(see ``blog.signals``), which retires exactly the entries built from the
+old data. Concurrent misses on one key are coalesced: one request renders
+while the others wait for its entry. Entries keep the response's ETag and
+Last-Modified, so conditional requests that hit the cache get their 304
+without a query.
+
+Responses of signed-in users that show their own likes are not cached.
+Counters held in the write-behind buffer (views, likes) do not invalidate
+anything; ``RESPONSE_CACHE_TTL`` bounds how stale they get. Point
+``RESPONSE_CACHE_ALIAS`` at a cache shared by all workers so an
+invalidation in one process reaches the others.
+"""
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+KEY_PREFIX = 'response-cache'
+
+# How often a request waiting on another one's render checks for its entry
+POLL_INTERVAL = 0.01
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def auth_class(request):
+    """Which kind of credentials the request carries"""
+    if 'HTTP_AUTHORIZATION' in request.META:
+        return 'basic'
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return 'session'
+    return 'anonymous'
+
+
+def cache_key(request):
+    # Pagination links are absolute, so the host is part of the key
+    raw = '\n'.join([
+        request.build_absolute_uri(), request.META.get('HTTP_ACCEPT', ''), auth_class(request)
+    ])
+    return f"{KEY_PREFIX}:page:{hashlib.sha256(raw.encode()).hexdigest()}"
+
+
+def _tag_key(tag):
+    return f"{KEY_PREFIX}:tag:{tag}"
+
+
+def invalidate(*tags):
+    """Retire every cached response that depends on one of ``tags``"""
+    _bump(tags)
+    # Bump again once the write is visible, dropping entries that a reader
+    # rendered from the old rows before the transaction committed
+    transaction.on_commit(lambda: _bump(tags))
+
+
+def _bump(tags):
+    get_cache().set_many({_tag_key(tag): uuid.uuid4().hex for tag in tags}, timeout=None)
+
+
+def tag_versions(tags):
+    """
+    Current version of each tag, creating the missing ones.
+
+    A tag always has a random version once an entry depends on it, so a
+    version evicted from the cache never matches an entry again.
+    """
+    cache = get_cache()
+    keys = {_tag_key(tag): tag for tag in tags}
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        for key in missing:
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+        # Another process may have won the add
+        found.update(cache.get_many(missing))
+    return {keys[key]: version for key, version in found.items()}
+
+
+def lookup(key):
+    """The entry stored under ``key`` if none of its tags changed since"""
+    entry = get_cache().get(key)
+    if entry is None:
+        return None
+    keys = [_tag_key(tag) for tag in entry['versions']]
+    current = get_cache().get_many(keys)
+    for tag, version in entry['versions'].items():
+        if current.get(_tag_key(tag)) != version:
+            return None
+    return entry
+
+
+def store(key, response, versions, tags=(), meta=None):
+    versions = dict(versions)
+    versions.update(tag_versions([tag for tag in tags if tag not in versions]))
+    get_cache().set(key, {
+        'content': response.content,
+        'status': response.status_code,
+        'content_type': response['Content-Type'],
+        'vary': response.get('Vary'),
+        'etag': response.get('ETag'),
+        'last_modified': response.get('Last-Modified'),
+        'versions': versions,
+        'meta': meta or {},
+    }, settings.RESPONSE_CACHE_TTL)
+
+
+def to_response(entry):
+    response = HttpResponse(entry['content'], status=entry['status'], content_type=entry['content_type'])
+    for header, name in (('Vary', 'vary'), ('ETag', 'etag'), ('Last-Modified', 'last_modified')):
+        if entry[name]:
+            response[header] = entry[name]
+    return response
+
+
+def get_or_render(key, render, tags=()):
+    """
+    Return ``(entry, response)``: a valid cached entry and None, or None and
+    the response ``render()`` produced.
+
+    ``render()`` returns ``(response, tags, meta)`` with a rendered
+    response; 200 responses are stored. ``tags`` are versioned before the
+    render so a write that lands while it runs retires its entry.
+    """
+    entry = lookup(key)
+    if entry is not None:
+        return entry, None
+
+    cache = get_cache()
+    lock_key = f"{key}:lock"
+    locked = cache.add(lock_key, 1, settings.RESPONSE_CACHE_LOCK_TIMEOUT)
+    if not locked:
+        # Someone else is rendering this page: wait for their entry, but
+        # render ourselves if they fail or take longer than the lock lasts
+        deadline = time.monotonic() + settings.RESPONSE_CACHE_LOCK_TIMEOUT
+        while time.monotonic() < deadline and cache.get(lock_key) is not None:
+            time.sleep(POLL_INTERVAL)
+        entry = lookup(key)
+        if entry is not None:
+            return entry, None
+
+    try:
+        versions = tag_versions(tags)
+        response, response_tags, meta = render()
+        if response.status_code == 200:
+            store(key, response, versions, response_tags, meta)
+        return None, response
+    finally:
+        if locked:
+            cache.delete(lock_key)
+
+
+def blog_tags(blogs):
+    """Object tags for serialized blogs and the category and author nested in them"""
+    tags = set()
+    for blog in blogs:
+        tags.add(f"blog:{blog['id']}")
+        if blog.get('category'):
+            tags.add(f"category:{blog['category']['id']}")
+        if blog.get('author'):
+            tags.add(f"author:{blog['author']['id']}")
+    return sorted(tags)
+
+
+class CachedResponseMixin:
+    """
+    Serve GET requests of an ``APIView`` from the response cache.
+
+    ``cache_tags`` names the collections the response depends on;
+    ``get_cache_tags(data)`` adds the objects found in the response data.
+    ``get_cache_meta(data)`` is kept with the entry and handed to
+    ``cache_hit()`` for side effects a cached response must still have.
+    Views whose responses differ per user (``liked_by_me``) set
+    ``per_user``; requests carrying credentials then skip the cache.
+    """
+    cache_tags = ()
+    per_user = False
+
+    def get_cache_tags(self, data):
+        return []
+
+    def get_cache_meta(self, data):
+        return {}
+
+    def cache_hit(self, request, meta, *args, **kwargs):
+        pass
+
+    def dispatch(self, request, *args, **kwargs):
+        if (request.method != 'GET' or not settings.RESPONSE_CACHE_ENABLED or
+                (self.per_user and auth_class(request) != 'anonymous')):
+            return super().dispatch(request, *args, **kwargs)
+
+        def render():
+            response = super(CachedResponseMixin, self).dispatch(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response, (), None
+            response.render()
+            return response, self.get_cache_tags(response.data), self.get_cache_meta(response.data)
+
+        entry, response = get_or_render(cache_key(request), render, self.cache_tags)
+        if entry is None:
+            response['X-Cache'] = 'MISS'
+            return response
+        self.cache_hit(request, entry['meta'], *args, **kwargs)
+        # Revalidate against the stored validators without touching the database
+        response = get_conditional_response(
+            request,
+            etag=entry['etag'],
+            last_modified=entry['last_modified'] and parse_http_date_safe(entry['last_modified']),
+            response=to_response(entry),
+        )
+        response['X-Cache'] = 'HIT'
+        return response
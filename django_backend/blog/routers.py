@@ -0,0 +1,72 @@
+"""
+Database routing for a primary plus a read replica.
+
+Enabled by ``DATABASE_ROUTERS`` when a ``replica`` database is configured
+(see ``DJANGO_DB_REPLICA_PATH`` in the settings). The replica is a copy of
+the primary file kept up to date outside Django (e.g. Litestream or
+``sqlite3 .backup``), so it is never migrated or written to.
+"""
+import contextvars
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Set once the current request (or thread of work) has written, so its own
+# reads see those writes instead of a replica that may lag behind
+_wrote = contextvars.ContextVar('wrote_to_primary', default=False)
+
+# Statements that change rows. Asking the router for a write alias is not a
+# write (save() and the session backend ask before deciding anything), nor
+# are BEGIN, SAVEPOINT and PRAGMA.
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+def _reset(**kwargs):
+    _wrote.set(False)
+
+
+def _record_write(execute, sql, params, many, context):
+    result = execute(sql, params, many, context)
+    if not _wrote.get() and sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+        _wrote.set(True)
+    return result
+
+
+def _watch_primary():
+    # Wrappers stay on the thread's connection object across reconnects
+    connection = connections[DEFAULT_DB_ALIAS]
+    if _record_write not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_write)
+
+
+request_started.connect(_reset, dispatch_uid='blog.routers.reset')
+
+
+class ReadReplicaRouter:
+    """
+    Send reads of ``REPLICA_READ_APPS`` to ``DATABASE_REPLICA_ALIAS`` and
+    everything else to the primary.
+
+    Reads stay on the primary inside a transaction and for the rest of a
+    request once it has run an INSERT, UPDATE or DELETE there.
+    """
+
+    def db_for_read(self, model, **hints):
+        _watch_primary()
+        if model._meta.app_label not in settings.REPLICA_READ_APPS or _wrote.get():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return settings.DATABASE_REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _watch_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same rows
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
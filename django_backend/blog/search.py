@@ -0,0 +1,162 @@
+"""
+Full-text search over blogs with an SQLite FTS5 index.
+
+``blog_search`` holds one row per blog (rowid = blog id) with the title,
+excerpt, content and tags. Signals in ``blog.signals`` keep it in step with
+``Blog`` writes and ``manage.py rebuild_search_index`` rebuilds it from
+scratch. Results are ranked with BM25, title matches weighing most.
+On other database backends search falls back to ``icontains`` filters.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+
+from .models import Blog
+
+SEARCH_TABLE = 'blog_search'
+
+# BM25 column weights: title, excerpt, content, tags
+COLUMN_WEIGHTS = (10.0, 4.0, 1.0, 6.0)
+
+SNIPPET_TOKENS = 24
+
+# Control characters mark matches inside snippets until the text is escaped
+MATCH_START, MATCH_END = '\x02', '\x03'
+
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def is_supported():
+    return connection.vendor == 'sqlite'
+
+
+def create_index(cursor):
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        "title, excerpt, content, tags, tokenize='porter unicode61 remove_diacritics 2')"
+    )
+
+
+def drop_index(cursor):
+    cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+def tags_text(tags):
+    return ' '.join(str(tag) for tag in tags or ())
+
+
+def index_blog(blog):
+    """Insert or replace the index row of ``blog``"""
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [blog.pk])
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, title, excerpt, content, tags) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            [blog.pk, blog.title, blog.excerpt, blog.content, tags_text(blog.tags)]
+        )
+
+
+def remove_blog(blog_id):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [blog_id])
+
+
+def rebuild_index(cursor=None):
+    """Repopulate the whole index from ``blog_blog`` in one statement; returns the row count"""
+    if cursor is None:
+        with connection.cursor() as cursor:
+            return rebuild_index(cursor)
+    cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+    cursor.execute(
+        f"INSERT INTO {SEARCH_TABLE} (rowid, title, excerpt, content, tags) "
+        "SELECT b.id, b.title, b.excerpt, b.content, "
+        "COALESCE((SELECT group_concat(t.value, ' ') FROM json_each(b.tags) AS t), '') "
+        "FROM blog_blog AS b"
+    )
+    # Merge the index b-trees so queries touch as few segments as possible
+    cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+    cursor.execute(f"SELECT count(*) FROM {SEARCH_TABLE}")
+    return cursor.fetchone()[0]
+
+
+def build_match_query(text):
+    """
+    Turn free text into a safe FTS5 query.
+
+    Each word becomes a quoted term (so FTS5 operators in user input are
+    inert), all terms must match, and the last one also matches as a prefix.
+    Returns None when the text has no searchable words.
+    """
+    terms = TERM_RE.findall(text or '')
+    if not terms:
+        return None
+    quoted = ['"%s"' % term for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def search_blogs(text, limit, offset=0):
+    """
+    Return ``(blogs, has_more)`` for one page of results, best match first.
+
+    Each blog carries ``search_score`` (higher is better) and ``search_snippet``
+    with matches wrapped in ``<mark>`` tags.
+    """
+    match = build_match_query(text)
+    if match is None:
+        return [], False
+
+    if not is_supported():
+        return _search_fallback(text, limit, offset)
+
+    weights = ', '.join(str(weight) for weight in COLUMN_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, bm25({SEARCH_TABLE}, {weights}) AS score, "
+            f"snippet({SEARCH_TABLE}, -1, char(2), char(3), '…', {SNIPPET_TOKENS}) "
+            f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s "
+            "ORDER BY score, rowid LIMIT %s OFFSET %s",
+            [match, limit + 1, offset]
+        )
+        rows = cursor.fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    blogs = Blog.objects.for_listing().in_bulk([row[0] for row in rows])
+    results = []
+    for pk, score, snippet in rows:
+        blog = blogs.get(pk)
+        if blog is None:
+            continue
+        # bm25() is lower for better matches; flip it for the API
+        blog.search_score = round(-score, 6)
+        blog.search_snippet = highlight(snippet)
+        results.append(blog)
+    return results, has_more
+
+
+def highlight(snippet):
+    """HTML-escape a snippet, then wrap its matches in ``<mark>``"""
+    return escape(snippet).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
+
+
+def _search_fallback(text, limit, offset):
+    condition = Q()
+    for term in TERM_RE.findall(text):
+        condition &= (
+            Q(title__icontains=term) | Q(excerpt__icontains=term) | Q(content__icontains=term)
+        )
+    blogs = list(
+        Blog.objects.for_listing().filter(condition)
+        .order_by('-published_at', '-id')[offset:offset + limit + 1]
+    )
+    for blog in blogs:
+        blog.search_score = None
+        blog.search_snippet = escape(blog.excerpt)
+    return blogs[:limit], len(blogs) > limit
@@ -1,20 +1,58 @@
 from rest_framework import serializers
-from .models import Category, Author, Blog, Comment
+from . import likes
+from .comment_tree import build_comment_tree
+from .counters import counter_buffer
+from .metrics import TimedSerializerMixin
+from .models import Category, Author, Blog, Comment, Tag
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class PendingCountersMixin:
+    """Report counters including increments still held in the write-behind buffer"""
+    counter_fields = ()
+    
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        for field in self.counter_fields:
+            if field in data:
+                data[field] += counter_buffer.pending(type(instance), instance.pk, field)
+        return data
+
+
+class LikedByMeMixin(serializers.Serializer):
+    """
+    ``liked_by_me`` read from the ids in the serializer context under
+    ``liked_context`` (see ``blog.likes.liked_by``); False without them.
+    """
+    liked_context = None
+    liked_by_me = serializers.SerializerMethodField()
+    
+    def get_liked_by_me(self, obj):
+        return obj.pk in self.context.get(self.liked_context, ())
+
+
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name', 'slug', 'count']
 
 
-class AuthorSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    count = serializers.IntegerField(source='blog_count', read_only=True)
+    
+    class Meta:
+        model = Tag
+        fields = ['id', 'name', 'slug', 'count']
+
+
+class AuthorSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Author
         fields = ['id', 'name', 'bio', 'avatar', 'role']
 
 
-class BlogListSerializer(serializers.ModelSerializer):
+class BlogListSerializer(TimedSerializerMixin, PendingCountersMixin, LikedByMeMixin, serializers.ModelSerializer):
+    counter_fields = ('view_count', 'like_count')
+    liked_context = 'liked_blogs'
     category = CategorySerializer(read_only=True)
     author = AuthorSerializer(read_only=True)
     
@@ -23,24 +61,45 @@ class BlogListSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'title', 'slug', 'excerpt', 'cover_image', 
             'category', 'author', 'read_time', 'is_featured',
-            'view_count', 'like_count', 'comment_count', 'published_at', 'tags'
+            'view_count', 'like_count', 'liked_by_me', 'comment_count', 'published_at', 'tags'
         ]
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class BlogSearchResultSerializer(BlogListSerializer):
+    score = serializers.FloatField(source='search_score', read_only=True)
+    snippet = serializers.CharField(source='search_snippet', read_only=True)
+    
+    class Meta(BlogListSerializer.Meta):
+        fields = BlogListSerializer.Meta.fields + ['score', 'snippet']
+
+
+class CommentSerializer(TimedSerializerMixin, PendingCountersMixin, LikedByMeMixin, serializers.ModelSerializer):
+    counter_fields = ('like_count',)
+    liked_context = 'liked_comments'
     replies = serializers.SerializerMethodField()
+    has_more_replies = serializers.SerializerMethodField()
     
     class Meta:
         model = Comment
-        fields = ['id', 'name', 'avatar', 'content', 'like_count', 'created_at', 'parent', 'replies']
+        fields = [
+            'id', 'name', 'avatar', 'content', 'like_count', 'liked_by_me', 'created_at', 'parent',
+            'replies', 'has_more_replies'
+        ]
     
     def get_replies(self, obj):
-        if not hasattr(obj, 'replies'):
+        # Replies are attached in memory by build_comment_tree
+        replies = getattr(obj, 'thread_replies', None)
+        if not replies:
             return []
-        return CommentSerializer(obj.replies.all(), many=True).data
+        return CommentSerializer(replies, many=True, context=self.context).data
+    
+    def get_has_more_replies(self, obj):
+        return getattr(obj, 'has_more_replies', False)
 
 
-class BlogDetailSerializer(serializers.ModelSerializer):
+class BlogDetailSerializer(TimedSerializerMixin, PendingCountersMixin, LikedByMeMixin, serializers.ModelSerializer):
+    counter_fields = ('view_count', 'like_count')
+    liked_context = 'liked_blogs'
     category = CategorySerializer(read_only=True)
     author = AuthorSerializer(read_only=True)
     comments = serializers.SerializerMethodField()
@@ -50,14 +109,18 @@ class BlogDetailSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'title', 'slug', 'excerpt', 'content', 'cover_image', 
             'category', 'author', 'read_time', 'is_featured',
-            'view_count', 'like_count', 'comment_count', 'published_at', 'tags',
+            'view_count', 'like_count', 'liked_by_me', 'comment_count', 'published_at', 'tags',
             'comments'
         ]
     
     def get_comments(self, obj):
-        # Only get top-level comments (no parent)
-        comments = obj.comments.filter(parent=None)
-        return CommentSerializer(comments, many=True).data
+        # Top-level comments with their replies, assembled in memory
+        comments, _ = build_comment_tree(obj.id)
+        context = self.context
+        request = context.get('request')
+        if request is not None and 'liked_comments' not in context:
+            context = {**context, **likes.liked_by(request.user, comments=comments)}
+        return CommentSerializer(comments, many=True, context=context).data
 
 
 class CommentCreateSerializer(serializers.ModelSerializer):
@@ -76,12 +139,5 @@ class BlogCreateUpdateSerializer(serializers.ModelSerializer):
         ]
     
     def create(self, validated_data):
-        blog = Blog.objects.create(**validated_data)
-        
-        # Update category count
-        category = validated_data.get('category')
-        if category:
-            category.count += 1
-            category.save()
-        
-        return blog
\ No newline at end of file
+        # Category.count follows through the counter cache signals
+        return Blog.objects.create(**validated_data)
\ No newline at end of file
@@ -0,0 +1,130 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import counter_cache, home, related, response_cache, search, tags
+from .models import Author, Blog, Category, Comment
+
+
+@receiver(post_save, sender=Blog)
+def index_saved_blog(sender, instance, raw=False, **kwargs):
+    # Fixtures (raw saves) are indexed by rebuild_search_index
+    if not raw:
+        search.index_blog(instance)
+
+
+@receiver(post_save, sender=Blog)
+def sync_saved_blog_tags(sender, instance, raw=False, **kwargs):
+    if not raw:
+        tags.sync_blog_tags(instance)
+
+
+@receiver(post_save, sender=Blog)
+def update_saved_blog_related(sender, instance, raw=False, **kwargs):
+    # Fixtures (raw saves) are picked up by rebuild_related. Scored after
+    # the commit, outside the write lock; a failure leaves lists that
+    # rebuild_related repairs, not a failed save
+    if not raw:
+        blog_id = instance.pk
+        transaction.on_commit(lambda: related.update_blog_related(blog_id), robust=True)
+
+
+@receiver(pre_delete, sender=Blog)
+def release_deleted_blog_tags(sender, instance, **kwargs):
+    tags.unlink_blog_tags(instance)
+
+
+@receiver(post_delete, sender=Blog)
+def unindex_deleted_blog(sender, instance, **kwargs):
+    search.remove_blog(instance.pk)
+
+
+@receiver(post_delete, sender=Blog)
+def forget_deleted_blog_related(sender, instance, **kwargs):
+    # Its RelatedBlog rows go with the cascade; drop it from the local index
+    related.remove_blog_related(instance.pk)
+
+
+def _moved(instance, foreign_key):
+    """Counter deltas for the parents ``instance`` left and joined in this save"""
+    old = getattr(instance, f"_loaded_{foreign_key}_id", None)
+    new = getattr(instance, f"{foreign_key}_id")
+    return {old: -1, new: 1} if old != new else {}
+
+
+def _deleted_from(origin, model):
+    return isinstance(origin, model) or (isinstance(origin, QuerySet) and origin.model is model)
+
+
+# Counter caches: the receivers run inside the transaction of the save or
+# delete (see VersionedModel.save), so a count never disagrees with its rows
+
+@receiver(post_save, sender=Blog)
+def count_saved_blog(sender, instance, created, raw=False, **kwargs):
+    # Fixtures (raw saves) carry their counts; reconcile_counters fixes drift
+    if not raw:
+        deltas = {instance.category_id: 1} if created else _moved(instance, 'category')
+        counter_cache.adjust(Category, 'count', deltas)
+
+
+@receiver(post_delete, sender=Blog)
+def uncount_deleted_blog(sender, instance, origin=None, **kwargs):
+    # Blogs deleted along with their category leave no count to keep
+    if not _deleted_from(origin, Category):
+        counter_cache.adjust(Category, 'count', {instance.category_id: -1})
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        deltas = {instance.blog_id: 1} if created else _moved(instance, 'blog')
+        counter_cache.adjust(Blog, 'comment_count', deltas)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_deleted_comment(sender, instance, origin=None, **kwargs):
+    # Only deletes of comments themselves (and the replies cascading from
+    # them) count; comments cascading from a deleted blog or author go with it
+    if _deleted_from(origin, Comment):
+        counter_cache.adjust(Blog, 'comment_count', {instance.blog_id: -1})
+
+
+@receiver(post_save, sender=Blog)
+@receiver(post_delete, sender=Blog)
+def invalidate_blog_responses(sender, instance, **kwargs):
+    # Both the old and the new category show this blog in their counts
+    categories = {instance.category_id, getattr(instance, '_loaded_category_id', None)} - {None}
+    response_cache.invalidate(
+        'blogs', 'categories', f"blog:{instance.pk}",
+        *(f"category:{category_id}" for category_id in categories)
+    )
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_responses(sender, instance, **kwargs):
+    response_cache.invalidate('categories', f"category:{instance.pk}")
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def invalidate_author_responses(sender, instance, **kwargs):
+    response_cache.invalidate(f"author:{instance.pk}")
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_responses(sender, instance, **kwargs):
+    # Comments only show up in their blog's comment count
+    response_cache.invalidate(f"blog:{instance.blog_id}")
+
+
+# After the response cache receivers, whose on-commit bump retires the snapshot
+@receiver(post_save, sender=Blog)
+@receiver(post_delete, sender=Blog)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def refresh_home_snapshot(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(home.refresh_stale_snapshot, robust=True)
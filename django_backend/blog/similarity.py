@@ -0,0 +1,273 @@
+"""
+Content similarity between blogs: TF-IDF cosine over the text plus Jaccard
+overlap of the tags.
+
+Pure NumPy, no Django, so full rebuilds can score chunks of the corpus in
+worker processes. Vectors are kept sparse as posting lists (term -> blogs)
+and one blog is scored against the whole corpus with a couple of
+``np.bincount`` calls over the postings of its own terms.
+"""
+import math
+import re
+from collections import Counter
+
+import numpy as np
+
+TOKEN_RE = re.compile(r'[^\W_]{2,}', re.UNICODE)
+
+STOP_WORDS = frozenset("""
+    an as at be by do he if in is it me my no of on or so to up us we
+    about after again all also and any are because been before being but can
+    could did does doing down during each few for from further had has have
+    having her here hers him his how into its itself just more most not now off
+    once only other our ours out over own same she should some such than that
+    the their theirs them then there these they this those through too under
+    until very was were what when where which while who whom why will with
+    would you your yours
+""".split())
+
+# Repeat each field's tokens so words in the title and tags count for more
+FIELD_WEIGHTS = (('title', 3), ('excerpt', 2), ('content', 1), ('tags', 3))
+
+# Terms found in more than this share of blogs say little and make the
+# longest posting lists, so they are left out of the index
+MAX_DOCUMENT_FREQUENCY = 0.5
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall((text or '').lower()) if token not in STOP_WORDS]
+
+
+def tag_keys(tags):
+    return frozenset(str(tag).strip().lower() for tag in tags or () if str(tag).strip())
+
+
+class Document:
+    """Term counts and tag set of one blog"""
+    __slots__ = ('id', 'terms', 'tags')
+
+    def __init__(self, id, title='', excerpt='', content='', tags=()):
+        self.id = id
+        self.tags = tag_keys(tags)
+        fields = {'title': title, 'excerpt': excerpt, 'content': content, 'tags': ' '.join(self.tags)}
+        terms = Counter()
+        for field, weight in FIELD_WEIGHTS:
+            for token in tokenize(fields[field]):
+                terms[token] += weight
+        self.terms = terms
+
+
+class SimilarityIndex:
+    """
+    Sparse TF-IDF and tag postings for a fixed corpus of documents.
+
+    ``score(document)`` returns ``(ids, scores)`` of every blog with a
+    positive similarity to ``document``; ``neighbours(position, k)`` does the
+    same for a blog already in the index and keeps the best ``k``.
+    Documents can be replaced or discarded after the build; a replaced blog
+    is then scored from a small overflow list until the next rebuild.
+    """
+
+    def __init__(self, documents, tag_weight=0.3):
+        self.tag_weight = tag_weight
+        documents = list(documents)
+        self.ids = np.array([doc.id for doc in documents], dtype=np.int64)
+        self.positions = {doc.id: position for position, doc in enumerate(documents)}
+        self.alive = np.ones(len(documents), dtype=bool)
+        self.extra = {}
+        size = len(documents)
+
+        df = Counter()
+        for doc in documents:
+            df.update(doc.terms.keys())
+        max_df = max(2, MAX_DOCUMENT_FREQUENCY * size)
+        self.common_terms = frozenset(term for term, count in df.items() if count > max_df)
+        self.vocabulary = {term: column for column, term in enumerate(
+            sorted(term for term in df if term not in self.common_terms)
+        )}
+        self.size = size
+        self.idf = np.log((1 + size) / (1 + np.array(
+            [df[term] for term in self.vocabulary], dtype=np.float64
+        ))) + 1
+
+        self.tag_vocabulary = {}
+        for doc in documents:
+            for tag in doc.tags:
+                self.tag_vocabulary.setdefault(tag, len(self.tag_vocabulary))
+
+        rows, columns, counts = [], [], []
+        tag_rows, tag_columns = [], []
+        vocabulary, tag_vocabulary = self.vocabulary, self.tag_vocabulary
+        for position, doc in enumerate(documents):
+            known = [(vocabulary[term], count) for term, count in doc.terms.items() if term in vocabulary]
+            rows.extend([position] * len(known))
+            columns.extend(column for column, _ in known)
+            counts.extend(count for _, count in known)
+            tag_rows.extend([position] * len(doc.tags))
+            tag_columns.extend(tag_vocabulary[tag] for tag in doc.tags)
+
+        rows = np.array(rows, dtype=np.int32)
+        columns = np.array(columns, dtype=np.int32)
+        weights = (1 + np.log(np.array(counts, dtype=np.float64))) * self.idf[columns]
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=size))
+        weights /= norms[rows]
+        tag_rows = np.array(tag_rows, dtype=np.int32)
+        tag_columns = np.array(tag_columns, dtype=np.int32)
+        self.tag_sizes = np.bincount(tag_rows, minlength=size).astype(np.float64)
+
+        # Row-major copy to read one blog's vector, column-major postings to score
+        self.doc_indptr, self.doc_columns, self.doc_weights = _compress(rows, columns, weights, size)
+        self.term_indptr, self.term_docs, self.term_weights = _compress(
+            columns, rows, weights, len(vocabulary)
+        )
+        self.doc_tag_indptr, self.doc_tags, _ = _compress(tag_rows, tag_columns, None, size)
+        self.tag_indptr, self.tag_docs, _ = _compress(
+            tag_columns, tag_rows, None, len(tag_vocabulary)
+        )
+
+    def __len__(self):
+        return int(self.alive.sum()) + len(self.extra)
+
+    def _idf(self, df):
+        return math.log((1 + self.size) / (1 + df)) + 1
+
+    def weigh(self, doc):
+        """L2-normalised TF-IDF weight of every term of ``doc``"""
+        weights = {}
+        for term, count in doc.terms.items():
+            if term in self.common_terms:
+                continue
+            column = self.vocabulary.get(term)
+            idf = self.idf[column] if column is not None else self._idf(0)
+            weights[term] = (1 + math.log(count)) * idf
+        norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+        return {term: weight / norm for term, weight in weights.items()} if norm else weights
+
+    def vectorize(self, doc):
+        """Columns of the indexed terms of ``doc`` and their weights"""
+        # Unknown terms match nothing indexed but still count towards the norm
+        known = [(self.vocabulary[term], weight) for term, weight in self.weigh(doc).items()
+                 if term in self.vocabulary]
+        columns = np.array([column for column, _ in known], dtype=np.int32)
+        weights = np.array([weight for _, weight in known], dtype=np.float64)
+        return columns, weights
+
+    def tag_columns(self, doc):
+        return np.array(
+            [self.tag_vocabulary[tag] for tag in doc.tags if tag in self.tag_vocabulary],
+            dtype=np.int32
+        )
+
+    def _scores(self, columns, weights, tag_columns, tag_count):
+        """Similarity of one vector to every indexed position"""
+        entries = _gather(self.term_indptr, columns)
+        text = np.bincount(
+            self.term_docs[entries],
+            weights=self.term_weights[entries] * np.repeat(weights, _lengths(self.term_indptr, columns)),
+            minlength=self.size
+        )
+        if not self.tag_weight or not tag_count:
+            return (1 - self.tag_weight) * text
+        shared = np.bincount(self.tag_docs[_gather(self.tag_indptr, tag_columns)], minlength=self.size)
+        union = self.tag_sizes + tag_count - shared
+        jaccard = np.divide(shared, union, out=np.zeros(self.size), where=union > 0)
+        return (1 - self.tag_weight) * text + self.tag_weight * jaccard
+
+    def _score_extra(self, doc):
+        """Similarity of ``doc`` to the documents replaced since the build"""
+        ids, scores = [], []
+        vector = self.weigh(doc)
+        for other_id, (other, other_vector) in self.extra.items():
+            if other_id == doc.id:
+                continue
+            text = sum(vector.get(term, 0.0) * weight for term, weight in other_vector.items())
+            union = len(doc.tags | other.tags)
+            jaccard = len(doc.tags & other.tags) / union if union else 0.0
+            score = (1 - self.tag_weight) * text + self.tag_weight * jaccard
+            if score > 0:
+                ids.append(other_id)
+                scores.append(score)
+        return np.array(ids, dtype=np.int64), np.array(scores, dtype=np.float64)
+
+    def score(self, doc):
+        """``(ids, scores)`` of every other blog similar to ``doc``, unordered"""
+        columns, weights = self.vectorize(doc)
+        scores = self._scores(columns, weights, self.tag_columns(doc), len(doc.tags))
+        position = self.positions.get(doc.id)
+        if position is not None:
+            scores[position] = 0
+        keep = (scores > 0) & self.alive
+        ids, scores = self.ids[keep], scores[keep]
+        if self.extra:
+            extra_ids, extra_scores = self._score_extra(doc)
+            ids = np.concatenate([ids, extra_ids])
+            scores = np.concatenate([scores, extra_scores])
+        return ids, scores
+
+    def neighbours(self, position, k):
+        """Best ``k`` ``(id, score)`` pairs for the blog at ``position``, best first"""
+        start, end = self.doc_indptr[position], self.doc_indptr[position + 1]
+        tag_start, tag_end = self.doc_tag_indptr[position], self.doc_tag_indptr[position + 1]
+        scores = self._scores(
+            self.doc_columns[start:end], self.doc_weights[start:end],
+            self.doc_tags[tag_start:tag_end], self.tag_sizes[position]
+        )
+        scores[position] = 0
+        return top_k(self.ids, scores, k)
+
+    def replace(self, doc):
+        """Score ``doc`` in place of its indexed version from now on"""
+        self.discard(doc.id)
+        self.extra[doc.id] = (doc, self.weigh(doc))
+
+    def discard(self, doc_id):
+        position = self.positions.get(doc_id)
+        if position is not None:
+            self.alive[position] = False
+        self.extra.pop(doc_id, None)
+
+
+def top_k(ids, scores, k):
+    """The ``k`` highest positive scores as ``(id, score)`` pairs, ties by id"""
+    candidates = np.flatnonzero(scores > 0)
+    if len(candidates) > k:
+        candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+    order = np.lexsort((ids[candidates], -scores[candidates]))
+    return [(int(ids[i]), float(scores[i])) for i in candidates[order]]
+
+
+def neighbours_chunk(index, positions, k):
+    return [(int(index.ids[position]), index.neighbours(position, k)) for position in positions]
+
+
+# Worker process state for parallel rebuilds: the index is sent once per worker
+_worker_index = None
+_worker_k = None
+
+
+def init_worker(index, k):
+    global _worker_index, _worker_k
+    _worker_index, _worker_k = index, k
+
+
+def score_worker_chunk(positions):
+    return neighbours_chunk(_worker_index, positions, _worker_k)
+
+
+def _compress(rows, columns, values, size):
+    """Sort coordinate entries by row into ``(indptr, columns, values)``"""
+    order = np.argsort(rows, kind='stable')
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=size), out=indptr[1:])
+    return indptr, columns[order], None if values is None else values[order]
+
+
+def _lengths(indptr, rows):
+    return indptr[rows + 1] - indptr[rows]
+
+
+def _gather(indptr, rows):
+    """Entry offsets of all the given rows of a compressed matrix, row by row"""
+    lengths = _lengths(indptr, rows)
+    ends = np.cumsum(lengths)
+    return np.repeat(indptr[rows] - ends + lengths, lengths) + np.arange(ends[-1] if len(ends) else 0)
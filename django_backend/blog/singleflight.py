@@ -0,0 +1,32 @@
+import asyncio
+import weakref
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent async calls that share a key.
+
+    While a call for ``key`` is in flight, later callers await the same
+    result instead of starting their own. Futures belong to an event loop, so
+    calls are only coalesced within the loop they run on.
+    """
+
+    def __init__(self):
+        self._flights = weakref.WeakKeyDictionary()
+
+    async def do(self, key, fn):
+        """Await ``fn()``, or the already running call for ``key``"""
+        flights = self._flights.setdefault(asyncio.get_running_loop(), {})
+        future = flights.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            flights[key] = future
+            future.add_done_callback(lambda f: flights.pop(key, None) if flights.get(key) is f else None)
+        # Shield so one cancelled caller does not cancel the call for everyone
+        return await asyncio.shield(future)
+
+    def in_flight(self):
+        try:
+            return len(self._flights.get(asyncio.get_running_loop(), {}))
+        except RuntimeError:
+            return 0
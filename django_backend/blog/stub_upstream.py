@@ -0,0 +1,86 @@
+"""
+Stand-in for the REST Countries API, for tests and benchmarks.
+
+Runs a threaded HTTP server on a free local port. ``delay`` simulates
+upstream latency, ``failing``/``fail_next`` make it answer 503, and every
+request path is recorded in ``hits``.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class StubCountriesUpstream:
+    """Local HTTP server speaking the subset of the REST Countries API we proxy"""
+
+    def __init__(self, countries=(), delay=0):
+        self.hits = []
+        self.client_ports = set()
+        self.failing = False
+        self.fail_next = 0
+        self.delay = delay
+        self.countries = list(countries)
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, so connection pooling can be observed
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                query = parse_qs(url.query)
+                upstream.hits.append(self.path)
+                upstream.client_ports.add(self.client_address[1])
+                if upstream.delay:
+                    time.sleep(upstream.delay)
+                if upstream.failing or upstream.fail_next > 0:
+                    upstream.fail_next -= 1
+                    return self.reply(503, {"message": "unavailable"})
+                countries = upstream.countries
+                if url.path == '/all':
+                    body = countries
+                elif url.path == '/independent':
+                    wanted = query.get('status', ['true'])[0] == 'true'
+                    body = [c for c in countries if c['independent'] == wanted]
+                elif url.path.startswith('/alpha/'):
+                    code = url.path.rsplit('/', 1)[1].upper()
+                    body = [c for c in countries if code in (c['cca2'], c['cca3'])]
+                    if not body:
+                        return self.reply(404, {"message": "Not Found"})
+                else:
+                    return self.reply(404, {"message": "Not Found"})
+                if 'fields' in query:
+                    names = query['fields'][0].split(',')
+                    body = [{k: v for k, v in c.items() if k in names} for c in body]
+                self.reply(200, body)
+
+            def reply(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                try:
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up waiting (deadline exceeded)
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True
+        )
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,291 @@
+"""
+Deterministic synthetic content for benchmarks and load tests.
+
+Rows are produced by generators and written with batched ``bulk_create``,
+one transaction per table, so memory stays bounded by ``batch_size`` at any
+volume. Primary keys are assigned here, after the current maximum, so
+comment replies and likes can point at rows without reading them back.
+The same ``seed`` and volumes always produce the same rows.
+
+Bulk inserts skip the per-row signals: ``Category.count`` and
+``Blog.comment_count`` follow through ``CountedQuerySet``, like counts are
+recounted afterwards, and the tag and search indexes are rebuilt at the end.
+
+Synthetic users all have the password ``SYNTHETIC_PASSWORD``, hashed once.
+"""
+import itertools
+import random
+from array import array
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.text import slugify
+
+from . import counter_cache, response_cache, search
+from .models import Author, Blog, BlogLike, Category, Comment, CommentLike
+from .tags import rebuild_tag_index
+
+WORDS = """
+    alpine autumn balcony bazaar beach bicycle breakfast bridge cafe canal canyon
+    castle cathedral cherry city coast coffee cottage culture curry desert dinner
+    espresso festival fjord forest garden glacier harbor hike island jungle kayak
+    lagoon lake lantern library lighthouse market meadow monastery mountain museum
+    noodle ocean orchard palace pastry pier plaza railway ramen reef river ruins
+    safari savanna scooter sunrise sunset street sushi temple terrace trail tram
+    valley village vineyard volcano waterfall winery budget camera coding design
+    gadget laptop startup remote habit morning recipe garden market weekend guide
+""".split()
+
+FIRST_NAMES = """
+    Ana Ben Chen Dana Eli Fatima Gus Hana Ivan Jada Kai Lena Mateo Nora Omar Priya
+    Quinn Rosa Sam Tara Uma Viktor Wen Yara Zoe
+""".split()
+
+CATEGORY_NAMES = [
+    "Travel", "Food", "Technology", "Lifestyle", "Business", "Culture", "Outdoors", "Photography",
+    "Design", "Health", "Science", "History",
+]
+
+TAG_NAMES = [
+    "Japan", "Italy", "Mexico", "Iceland", "Peru", "Vietnam", "Morocco", "Norway", "Street Food",
+    "Hidden Gems", "Budget", "Luxury", "Hiking", "Beaches", "Museums", "Coffee", "Wine", "Remote Work",
+    "Gadgets", "Photography", "Solo Travel", "Family", "Road Trip", "Rail", "Festivals", "Winter",
+]
+
+COVER_IMAGE = "https://images.unsplash.com/photo-1540959733332-eab4deabeeaf?w=900&q=60"
+SYNTHETIC_PASSWORD = 'synthetic-Passw0rd'
+
+# Comments with no parent; the rest reply to an earlier comment of the same blog
+TOP_LEVEL_SHARE = 0.4
+FEATURED_SHARE = 0.01
+# Blogs are published, and users join, over this many days before now
+SPAN_DAYS = 3 * 365
+# Bodies are assembled from this many distinct sentences, which is much
+# cheaper than drawing every word
+SENTENCE_POOL = 4096
+# Higher skews likes further toward the first (most popular) blogs and comments
+POPULARITY_SKEW = 3
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choices(WORDS, k=words)).capitalize() + '.'
+
+
+def sentence_pool(rng, size=SENTENCE_POOL):
+    return [sentence(rng, rng.randint(6, 16)) for _ in range(size)]
+
+
+def tag_names(rng, count):
+    """``count`` distinct tag names: ``TAG_NAMES`` first, then word pairs"""
+    if count > len(TAG_NAMES) + len(set(WORDS)) ** 2:
+        raise ValueError(f"At most {len(TAG_NAMES) + len(set(WORDS)) ** 2} distinct tags")
+    names = TAG_NAMES[:count]
+    seen = {slugify(name) for name in names}
+    while len(names) < count:
+        name = f"{rng.choice(WORDS)} {rng.choice(WORDS)}".title()
+        if slugify(name) not in seen:
+            seen.add(slugify(name))
+            names.append(name)
+    return names
+
+
+def _next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+def _insert(model, rows, batch_size):
+    """bulk_create ``rows`` (any iterable) ``batch_size`` at a time; returns the count"""
+    count = 0
+    with transaction.atomic():
+        while batch := list(itertools.islice(rows, batch_size)):
+            model.objects.bulk_create(batch)
+            count += len(batch)
+    return count
+
+
+def generate_categories(rng, count):
+    first = _next_id(Category)
+    for offset in range(count):
+        name = CATEGORY_NAMES[offset % len(CATEGORY_NAMES)]
+        if offset >= len(CATEGORY_NAMES):
+            name = f"{name} {offset // len(CATEGORY_NAMES) + 1}"
+        yield Category(id=first + offset, name=name, slug=f"{slugify(name)}-{first + offset}")
+
+
+def generate_authors(rng, count):
+    first = _next_id(Author)
+    for offset in range(count):
+        yield Author(
+            id=first + offset, name=f"{rng.choice(FIRST_NAMES)} {rng.choice(WORDS).title()}",
+            bio=sentence(rng, 12), role=rng.choice(["Writer", "Editor", "Contributor"]),
+        )
+
+
+def generate_users(rng, count, password, now):
+    User = get_user_model()
+    first = _next_id(User)
+    for offset in range(count):
+        pk = first + offset
+        yield User(
+            id=pk, email=f"user{pk}@example.com", password=password,
+            first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(WORDS).title(),
+            date_joined=now - timedelta(seconds=rng.randrange(SPAN_DAYS * 86400)),
+        )
+
+
+def generate_blogs(rng, count, category_ids, author_ids, tags, sentences, now):
+    first = _next_id(Blog)
+    for offset in range(count):
+        pk = first + offset
+        title = sentence(rng, rng.randint(4, 9))[:-1]
+        yield Blog(
+            id=pk,
+            title=title[:200],
+            slug=f"{slugify(title)[:40]}-{pk}",
+            excerpt=' '.join(rng.choices(sentences, k=2)),
+            content='\n\n'.join(
+                ' '.join(rng.choices(sentences, k=rng.randint(3, 6))) for _ in range(rng.randint(3, 8))
+            ),
+            cover_image=COVER_IMAGE,
+            category_id=rng.choice(category_ids),
+            author_id=rng.choice(author_ids),
+            read_time=rng.randint(2, 15),
+            # The first always, so there is a featured post at any volume
+            is_featured=offset == 0 or rng.random() < FEATURED_SHARE,
+            view_count=int(rng.paretovariate(1.2) * 50),
+            published_at=now - timedelta(seconds=rng.randrange(SPAN_DAYS * 86400)),
+            tags=rng.sample(tags, rng.randint(1, 4)),
+        )
+
+
+def generate_comments(rng, count, first_blog, published, sentences):
+    """
+    ``count`` comments spread over the blogs from ``first_blog`` on, whose
+    publication times (POSIX seconds) are ``published``, with a long tail:
+    most blogs get a few, some get hundreds. Each blog's comments form a
+    tree of replies to earlier comments.
+    """
+    first = pk = _next_id(Comment)
+    average = count / max(len(published), 1)
+    for index, timestamp in enumerate(published):
+        remaining = count - (pk - first)
+        if remaining <= 0:
+            return
+        thread = min(remaining, int(rng.paretovariate(1.5) * average / 3))
+        ids = []
+        created_at = datetime.fromtimestamp(timestamp, dt_timezone.utc)
+        for _ in range(thread):
+            created_at += timedelta(seconds=rng.randrange(1, 6 * 3600))
+            parent_id = rng.choice(ids) if ids and rng.random() > TOP_LEVEL_SHARE else None
+            yield Comment(
+                id=pk, blog_id=first_blog + index, parent_id=parent_id, created_at=created_at,
+                name=f"{rng.choice(FIRST_NAMES)} {rng.choice(WORDS)[0].upper()}.",
+                content=' '.join(rng.choices(sentences, k=rng.randint(1, 3))),
+            )
+            ids.append(pk)
+            pk += 1
+    # Whatever the tail left over goes to random blogs as top-level comments
+    while pk - first < count and published:
+        index = rng.randrange(len(published))
+        yield Comment(
+            id=pk, blog_id=first_blog + index,
+            created_at=datetime.fromtimestamp(published[index], dt_timezone.utc) + timedelta(days=1),
+            name=rng.choice(FIRST_NAMES), content=rng.choice(sentences),
+        )
+        pk += 1
+
+
+def generate_likes(rng, like_model, field, count, user_ids, target_ids, now):
+    """
+    ``count`` likes by ``user_ids`` of ``target_ids`` (sequences, e.g.
+    ranges), at most one per user and target. Every user likes about as
+    many targets; the lower target ids are the popular ones.
+    """
+    users, targets = len(user_ids), len(target_ids)
+    for index, user_id in enumerate(user_ids):
+        # This user's share of count, so the shares add up to exactly count
+        quota = count * (index + 1) // users - count * index // users
+        if quota * 2 > targets:
+            liked = sorted(rng.sample(target_ids, quota))
+        else:
+            liked = set()
+            while len(liked) < quota:
+                liked.add(target_ids[int(targets * rng.random() ** POPULARITY_SKEW)])
+            liked = sorted(liked)
+        for target_id in liked:
+            yield like_model(**{
+                'user_id': user_id, f"{field}_id": target_id,
+                'created_at': now - timedelta(seconds=rng.randrange(SPAN_DAYS * 86400)),
+            })
+
+
+def seed(blogs=1000, comments=10000, users=0, blog_likes=0, comment_likes=0, categories=8,
+         authors=20, tags=50, seed=0, batch_size=5000, log=None):
+    """
+    Insert synthetic content and rebuild the indexes it needs.
+
+    Returns ``{table: rows inserted}``. ``log(message)`` is called as each
+    step finishes.
+    """
+    if blog_likes > users * blogs or comment_likes > users * comments:
+        raise ValueError("More likes than there are users times blogs or comments to like")
+    rng = random.Random(seed)
+    log = log or (lambda message: None)
+    # Dates are drawn as offsets back from one "now", so the data always looks current
+    now = timezone.now().replace(microsecond=0)
+    sentences = sentence_pool(rng)
+    counts = {}
+
+    counts['categories'] = _insert(Category, generate_categories(rng, categories), batch_size)
+    counts['authors'] = _insert(Author, generate_authors(rng, authors), batch_size)
+    category_ids = list(Category.objects.order_by('pk').values_list('pk', flat=True))
+    author_ids = list(Author.objects.order_by('pk').values_list('pk', flat=True))
+    log(f"{counts['categories']} categories, {counts['authors']} authors")
+
+    User = get_user_model()
+    first_user = _next_id(User)
+    if users:
+        password = make_password(SYNTHETIC_PASSWORD)
+        counts['users'] = _insert(User, generate_users(rng, users, password, now), batch_size)
+        log(f"{counts['users']} users")
+
+    first_blog = _next_id(Blog)
+    new_blogs = generate_blogs(rng, blogs, category_ids, author_ids, tag_names(rng, tags), sentences, now)
+    counts['blogs'] = _insert(Blog, new_blogs, batch_size)
+    log(f"{counts['blogs']} blogs")
+
+    first_comment = _next_id(Comment)
+    # 8 bytes per blog, where a list of datetimes would take over a hundred
+    published = array('d', (
+        published_at.timestamp() for published_at in
+        Blog.objects.filter(pk__gte=first_blog).order_by('pk')
+        .values_list('published_at', flat=True).iterator(chunk_size=batch_size)
+    ))
+    new_comments = generate_comments(rng, comments, first_blog, published, sentences)
+    counts['comments'] = _insert(Comment, new_comments, batch_size)
+    del published
+    log(f"{counts['comments']} comments")
+
+    user_ids = range(first_user, first_user + users)
+    for like_model, field, count, target_ids in (
+        (BlogLike, 'blog', blog_likes, range(first_blog, first_blog + counts['blogs'])),
+        (CommentLike, 'comment', comment_likes, range(first_comment, first_comment + counts['comments'])),
+    ):
+        if count:
+            rows = generate_likes(rng, like_model, field, count, user_ids, target_ids, now)
+            counts[f"{field}_likes"] = _insert(like_model, rows, batch_size)
+            target = like_model._meta.get_field(field).related_model
+            counter_cache.recount_in_chunks(target, 'like_count', like_model, field, batch_size)
+            log(f"{count} {field} likes")
+
+    rebuild_tag_index(batch_size=batch_size)
+    log("tag index rebuilt")
+    if search.is_supported():
+        search.rebuild_index()
+        log("search index rebuilt")
+    response_cache.invalidate('blogs', 'categories')
+    return counts
@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import TagListView
+
+urlpatterns = [
+    path('', TagListView.as_view(), name='tag-list'),
+]
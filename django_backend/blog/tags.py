@@ -0,0 +1,106 @@
+"""
+Tag index kept in step with the ``Blog.tags`` JSON list.
+
+``Blog.tags`` stays the source of truth for the API. Every save mirrors it
+into ``Tag``/``BlogTag`` rows so tag filters and tag counts are answered
+from indexed tables instead of decoding the JSON of every blog.
+"""
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.text import slugify
+
+from .models import Blog, BlogTag, Tag
+
+
+def normalize_tags(tags):
+    """Map slug -> display name, first spelling wins and blank tags are dropped"""
+    normalized = {}
+    for name in tags or ():
+        name = str(name).strip()
+        slug = slugify(name)[:100]
+        if slug and slug not in normalized:
+            normalized[slug] = name[:100]
+    return normalized
+
+
+def get_or_create_tags(normalized):
+    """Tag rows for every slug in ``normalized``, creating the missing ones"""
+    tags = Tag.objects.in_bulk(list(normalized), field_name='slug')
+    missing = [Tag(slug=slug, name=name) for slug, name in normalized.items() if slug not in tags]
+    if missing:
+        # Another writer may create the same tag concurrently
+        Tag.objects.bulk_create(missing, ignore_conflicts=True)
+        tags = Tag.objects.in_bulk(list(normalized), field_name='slug')
+    return tags
+
+
+def sync_blog_tags(blog):
+    """Make the index rows of ``blog`` match ``blog.tags``"""
+    wanted = normalize_tags(blog.tags)
+    with transaction.atomic():
+        current = dict(
+            BlogTag.objects.filter(blog=blog).values_list('tag__slug', 'tag_id')
+        )
+        added = [slug for slug in wanted if slug not in current]
+        removed = [tag_id for slug, tag_id in current.items() if slug not in wanted]
+
+        if added:
+            tags = get_or_create_tags({slug: wanted[slug] for slug in added})
+            BlogTag.objects.bulk_create([
+                BlogTag(blog=blog, tag=tags[slug], published_at=blog.published_at) for slug in added
+            ])
+            Tag.objects.filter(id__in=[tags[slug].id for slug in added]).update(
+                blog_count=F('blog_count') + 1
+            )
+        if removed:
+            BlogTag.objects.filter(blog=blog, tag_id__in=removed).delete()
+            Tag.objects.filter(id__in=removed).update(blog_count=F('blog_count') - 1)
+        if len(current) > len(removed):
+            BlogTag.objects.filter(blog=blog).exclude(published_at=blog.published_at).update(
+                published_at=blog.published_at
+            )
+
+
+def unlink_blog_tags(blog):
+    """Release the tag counts held by ``blog`` before it is deleted"""
+    Tag.objects.filter(blog_links__blog=blog).update(blog_count=F('blog_count') - 1)
+
+
+def rebuild_tag_index(batch_size=1000):
+    """Rebuild every index row and count from ``Blog.tags``"""
+    with transaction.atomic():
+        BlogTag.objects.all().delete()
+        rows = Blog.objects.values_list('id', 'published_at', 'tags').order_by('id').iterator(
+            chunk_size=batch_size
+        )
+        batch = []
+        for blog_id, published_at, tags in rows:
+            batch.append((blog_id, published_at, normalize_tags(tags)))
+            if len(batch) >= batch_size:
+                _link_batch(batch)
+                batch = []
+        if batch:
+            _link_batch(batch)
+        _recount_tags()
+
+
+def _link_batch(batch):
+    names = {}
+    for _, _, normalized in batch:
+        for slug, name in normalized.items():
+            names.setdefault(slug, name)
+    tags = get_or_create_tags(names)
+    BlogTag.objects.bulk_create([
+        BlogTag(blog_id=blog_id, tag=tags[slug], published_at=published_at)
+        for blog_id, published_at, normalized in batch
+        for slug in normalized
+    ])
+
+
+def _recount_tags():
+    counts = (
+        BlogTag.objects.filter(tag=OuterRef('pk')).order_by()
+        .values('tag').annotate(n=Count('id')).values('n')
+    )
+    Tag.objects.update(blog_count=Coalesce(Subquery(counts), 0))
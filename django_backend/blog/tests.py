@@ -1,3 +1,1900 @@
-from django.test import TestCase
+import asyncio
+import base64
+import json
+import os
+import pstats
+import subprocess
+import sys
+import tempfile
+import textwrap
+import threading
+import time
+import zoneinfo
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import requests
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.renderers import JSONRenderer
+
+from blog_project.startup import migrate_if_needed, pending_migrations, process_memory
+
+from . import benchmark, fast_serializers, likes, metrics, profiling, synthetic
+from .comment_tree import build_comment_tree
+from .conditional import compute_validators
+from .counters import CounterBuffer, counter_buffer
+from .country_cache import CountryCache, fetch_countries, get_country_cache
+from .country_store import CountryStore, country_store, get_country_store, write_snapshot
+from .metrics import registry
+from .models import (
+    Author, Blog, BlogLike, BlogTag, Category, Comment, CommentLike, RelatedBlog, Tag
+)
+from .related import rebuild_related, reset_index
+from .response_cache import get_cache as get_response_cache, get_or_render
+from .renderers import FastJSONRenderer
+from .serializers import BlogCreateUpdateSerializer, BlogListSerializer
+from .search import build_match_query, search_blogs
+from .similarity import Document, SimilarityIndex
+from .tags import normalize_tags, rebuild_tag_index
+from .views import AsyncCountryDetailView, AsyncCountryListView
+from .outbound import CircuitBreaker, CircuitOpenError, OutboundClient
+from .singleflight import SingleFlight
+from .stub_upstream import StubCountriesUpstream
+
+
+def make_blog(category, author, index, **kwargs):
+    fields = {
+        'title': f"Post {index}",
+        'slug': f"post-{index}",
+        'excerpt': f"Excerpt {index}",
+        'content': f"Content {index}",
+        'cover_image': "https://example.com/cover.jpg",
+        'published_at': timezone.now(),
+    }
+    fields.update(kwargs)
+    return Blog.objects.create(category=category, author=author, **fields)
+
+
+class BlogTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # The related-posts index of an earlier test's (rolled back) blogs
+        reset_index()
+        cls.category = Category.objects.create(name="Travel", slug="travel")
+        cls.other_category = Category.objects.create(name="Food", slug="food")
+        cls.author = Author.objects.create(name="Jane Smith", role="Writer")
+
+    def setUp(self):
+        # Increments buffered by one test must not show up in the next
+        counter_buffer.clear()
+        self.addCleanup(counter_buffer.clear)
+        reset_index()
+        get_response_cache().clear()
+
+
+class KeysetPaginationTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        base = timezone.now()
+        cls.blogs = []
+        for i in range(25):
+            # Pairs of posts share a timestamp so the id tiebreaker matters
+            category = cls.category if i % 5 else cls.other_category
+            cls.blogs.append(make_blog(
+                category, cls.author, i, published_at=base - timedelta(minutes=i // 2)
+            ))
+        cls.expected = [
+            b.id for b in sorted(cls.blogs, key=lambda b: (b.published_at, b.id), reverse=True)
+        ]
+
+    def walk(self, url, direction='next'):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            pages.append([item['id'] for item in data['results']])
+            url = data[direction]
+        return pages
+
+    def test_forward_walk_is_stable_and_complete(self):
+        pages = self.walk('/api/blogs/?page_size=7')
+        self.assertEqual([len(p) for p in pages], [7, 7, 7, 4])
+        self.assertEqual(sum(pages, []), self.expected)
+
+    def test_backward_walk_returns_same_pages(self):
+        forward = self.walk('/api/blogs/?page_size=7')
+        last = self.client.get('/api/blogs/?page_size=7').json()
+        while last['next']:
+            last = self.client.get(last['next']).json()
+        self.assertIsNotNone(last['previous'])
+        backward = self.walk(last['previous'], direction='previous')
+        self.assertEqual(backward, list(reversed(forward[:-1])))
+
+    def test_first_page_has_no_previous_link(self):
+        response = self.client.get('/api/blogs/')
+        self.assertIsNone(response.data['previous'])
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_page_size_is_bounded(self):
+        response = self.client.get('/api/blogs/?page_size=100000')
+        self.assertEqual(len(response.data['results']), 25)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get('/api/blogs/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_category_filter_is_paginated(self):
+        pages = self.walk('/api/blogs/?category=travel&page_size=6')
+        expected = [pk for pk in self.expected if Blog.objects.get(pk=pk).category_id == self.category.id]
+        self.assertEqual(sum(pages, []), expected)
+
+    def test_category_detail_includes_one_page_of_blogs(self):
+        response = self.client.get('/api/categories/food/?include_blogs=true&page_size=3')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['slug'], 'food')
+        self.assertEqual(len(response.data['blogs']), 3)
+        self.assertIsNotNone(response.data['next'])
+        rest = self.client.get(response.data['next'])
+        self.assertEqual(len(rest.data['blogs']), 2)
+        self.assertIsNone(rest.data['next'])
+
+
+@override_settings(COUNTER_FLUSH_INTERVAL=3600)
+class QueryBudgetTests(BlogTestCase):
+    """Each endpoint runs a fixed number of queries however many rows it returns"""
+
+    budgets = {
+        '/api/blogs/': 1,
+        '/api/blogs/?category=travel': 2,
+        '/api/blogs/featured/': 1,
+        '/api/blogs/post-0/': 1,
+        '/api/blogs/post-0/related/': 1,
+        '/api/blogs/post-0/comments/': 3,
+        '/api/categories/': 1,
+        '/api/categories/travel/': 1,
+        '/api/categories/travel/?include_blogs=true': 2,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        other_author = Author.objects.create(name="John Doe")
+        # Related posts are scored once the saves commit
+        with cls.captureOnCommitCallbacks(execute=True):
+            for i in range(12):
+                make_blog(
+                    cls.category if i % 3 else cls.other_category,
+                    other_author if i % 2 else cls.author,
+                    i, is_featured=(i == 4), tags=["Alps"]
+                )
+        blog = Blog.objects.get(slug='post-0')
+        for i in range(5):
+            top = Comment.objects.create(blog=blog, name=f"Reader {i}", content="Nice")
+            Comment.objects.create(blog=blog, name="Reply", content="Agreed", parent=top)
+
+    def test_endpoints_stay_within_query_budget(self):
+        for url, budget in self.budgets.items():
+            with self.subTest(url=url):
+                with self.assertNumQueries(budget):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_listing_does_not_load_content(self):
+        blog = Blog.objects.for_listing().first()
+        self.assertIn('content', blog.get_deferred_fields())
+
+
+class CommentTreeTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.blog = make_blog(cls.category, cls.author, 0)
+        cls.first = cls.comment(None, "first")
+        cls.second = cls.comment(None, "second")
+        cls.replies = [cls.comment(cls.first, f"reply {i}") for i in range(4)]
+        cls.nested = cls.comment(cls.replies[0], "nested")
+        cls.deepest = cls.comment(cls.nested, "deepest")
+
+    @classmethod
+    def comment(cls, parent, content):
+        return Comment.objects.create(blog=cls.blog, name="Reader", content=content, parent=parent)
+
+    def test_full_tree_in_two_queries(self):
+        with self.assertNumQueries(2):
+            roots, has_more = build_comment_tree(self.blog.id)
+        self.assertFalse(has_more)
+        self.assertEqual([c.id for c in roots], [self.first.id, self.second.id])
+        self.assertEqual([c.id for c in roots[0].thread_replies], [r.id for r in self.replies])
+        self.assertEqual(roots[0].thread_replies[0].thread_replies[0].thread_replies[0].id, self.deepest.id)
+
+    def test_breadth_limit_marks_more_replies(self):
+        roots, has_more = build_comment_tree(self.blog.id, max_replies=1)
+        self.assertTrue(has_more)
+        self.assertEqual([c.id for c in roots], [self.first.id])
+        self.assertTrue(roots[0].has_more_replies)
+        self.assertEqual(len(roots[0].thread_replies), 1)
+
+    def test_depth_limit_marks_more_replies(self):
+        roots, _ = build_comment_tree(self.blog.id, max_depth=2)
+        nested = roots[0].thread_replies[0].thread_replies[0]
+        self.assertEqual(nested.id, self.nested.id)
+        self.assertEqual(nested.thread_replies, [])
+        self.assertTrue(nested.has_more_replies)
+        self.assertFalse(roots[0].has_more_replies)
+
+    def test_node_budget_prefers_upper_levels(self):
+        roots, _ = build_comment_tree(self.blog.id, max_nodes=4)
+        self.assertEqual(len(roots), 2)
+        self.assertEqual(len(roots[0].thread_replies), 2)
+        self.assertTrue(roots[0].has_more_replies)
+
+    @override_settings(COMMENT_TREE_MAX_REPLIES=2)
+    def test_requested_limits_cannot_exceed_settings(self):
+        roots, _ = build_comment_tree(self.blog.id, max_replies=100)
+        self.assertEqual(len(roots[0].thread_replies), 2)
+
+    def test_comment_list_endpoint(self):
+        response = self.client.get(f'/api/blogs/{self.blog.slug}/comments/?depth=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Has-More-Comments'], 'false')
+        first = response.data[0]
+        self.assertEqual(len(first['replies']), 4)
+        self.assertEqual(first['replies'][0]['replies'], [])
+        self.assertTrue(first['replies'][0]['has_more_replies'])
+
+    def test_comment_list_rejects_bad_limits(self):
+        response = self.client.get(f'/api/blogs/{self.blog.slug}/comments/?depth=deep')
+        self.assertEqual(response.status_code, 400)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@override_settings(COUNTER_WRITE_BEHIND=True, COUNTER_FLUSH_INTERVAL=3600, COUNTER_FLUSH_THRESHOLD=3)
+class CounterBufferTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.blogs = [make_blog(cls.category, cls.author, i) for i in range(3)]
+
+    def setUp(self):
+        super().setUp()
+        self.clock = FakeClock()
+        self.buffer = CounterBuffer(clock=self.clock)
+
+    def view_counts(self):
+        return list(Blog.objects.order_by('id').values_list('view_count', flat=True))
+
+    def test_increments_are_merged_until_flush(self):
+        blog = self.blogs[0]
+        with self.assertNumQueries(0):
+            for _ in range(5):
+                self.buffer.increment(Blog, blog.id, 'view_count')
+        self.assertEqual(self.buffer.pending(Blog, blog.id, 'view_count'), 5)
+        self.assertEqual(self.buffer.get_value(blog, 'view_count'), 5)
+        self.assertEqual(self.view_counts(), [0, 0, 0])
+
+        self.buffer.flush()
+        self.assertEqual(self.view_counts(), [5, 0, 0])
+        self.assertEqual(self.buffer.pending(Blog, blog.id, 'view_count'), 0)
+
+    def test_rows_with_equal_deltas_share_one_update(self):
+        for blog in self.blogs[:2]:
+            self.buffer.increment(Blog, blog.id, 'view_count')
+        # Savepoint, one UPDATE for both rows, release
+        with self.assertNumQueries(3):
+            self.buffer.flush()
+        self.assertEqual(self.view_counts(), [1, 1, 0])
+
+    def test_flushes_on_size_threshold(self):
+        for blog in self.blogs:
+            self.buffer.increment(Blog, blog.id, 'view_count')
+        self.assertEqual(self.view_counts(), [1, 1, 1])
+
+    def test_flushes_on_time_threshold(self):
+        self.buffer.increment(Blog, self.blogs[0].id, 'view_count')
+        self.clock.now = 3601
+        self.buffer.increment(Blog, self.blogs[0].id, 'view_count')
+        self.assertEqual(self.view_counts(), [2, 0, 0])
+
+    @override_settings(COUNTER_FLUSH_INTERVAL=0.05)
+    def test_idle_buffer_is_flushed_in_the_background(self):
+        buffer = CounterBuffer()
+        written = threading.Event()
+        # The thread's own connection would not see this test's rows
+        buffer._write = lambda batch: written.set()
+        buffer.flush_in_background()
+        buffer.increment(Blog, self.blogs[0].id, 'view_count')
+        # No further increment comes to trigger it
+        self.assertTrue(written.wait(5))
+        self.assertEqual(buffer.pending(Blog, self.blogs[0].id, 'view_count'), 0)
+
+    def test_decrements_stop_at_zero(self):
+        self.buffer.increment(Blog, self.blogs[0].id, 'like_count', -2)
+        self.buffer.flush()
+        self.assertEqual(Blog.objects.get(pk=self.blogs[0].pk).like_count, 0)
+
+    @override_settings(COUNTER_WRITE_BEHIND=False)
+    def test_synchronous_fallback(self):
+        self.buffer.increment(Blog, self.blogs[0].id, 'view_count')
+        self.assertEqual(self.view_counts(), [1, 0, 0])
+        self.assertEqual(self.buffer.pending(Blog, self.blogs[0].id, 'view_count'), 0)
+
+    def test_detail_view_reports_pending_views(self):
+        slug = self.blogs[0].slug
+        counter_buffer.increment(Blog, self.blogs[0].id, 'view_count')
+        response = self.client.get(f'/api/blogs/{slug}/')
+        self.assertEqual(response.data['view_count'], 2)
+        # Served from the response cache, but still counted
+        self.assertEqual(self.client.get(f'/api/blogs/{slug}/')['X-Cache'], 'HIT')
+        counter_buffer.flush()
+        self.assertEqual(self.view_counts()[0], 3)
+
+
+COUNTRIES = [
+    {"name": {"common": "Germany"}, "cca2": "DE", "cca3": "DEU", "independent": True, "region": "Europe"},
+    {"name": {"common": "France"}, "cca2": "FR", "cca3": "FRA", "independent": True, "region": "Europe"},
+    {"name": {"common": "Greenland"}, "cca2": "GL", "cca3": "GRL", "independent": False, "region": "Americas"},
+]
+
+
+class ImmediateExecutor:
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+NO_BACKOFF = {'default': {'backoff': 0, 'max_retries': 1}}
+
+
+class CountryCacheTests(TestCase):
+    def setUp(self):
+        self.upstream = self.enterContext(StubCountriesUpstream(COUNTRIES))
+        self.enterContext(override_settings(
+            COUNTRIES_API_BASE=self.upstream.url, OUTBOUND_HTTP=NO_BACKOFF
+        ))
+        self.clock = FakeClock()
+
+    def make_cache(self, **kwargs):
+        options = dict(ttl=10, stale_ttl=20, stale_if_error=100, max_entries=10)
+        options.update(kwargs)
+        return CountryCache(fetch_countries, clock=self.clock, executor=ImmediateExecutor(), **options)
+
+    def test_fresh_entries_are_served_from_cache(self):
+        cache = self.make_cache()
+        self.assertEqual(cache.get('all'), COUNTRIES)
+        self.assertEqual(cache.get('all'), COUNTRIES)
+        self.assertEqual(len(self.upstream.hits), 1)
+
+    def test_equal_field_projections_share_an_entry(self):
+        cache = self.make_cache()
+        first = cache.get('all', fields='cca2, name')
+        second = cache.get('all', fields='name,cca2')
+        self.assertEqual(first, second)
+        self.assertEqual(first[0], {"name": {"common": "Germany"}, "cca2": "DE"})
+        self.assertEqual(len(self.upstream.hits), 1)
+
+    def test_stale_entry_is_served_while_revalidating(self):
+        cache = self.make_cache()
+        cache.get('all')
+        self.upstream.countries = COUNTRIES[:1]
+        self.clock.now = 15
+        # The stale payload is returned and a refresh replaces it
+        self.assertEqual(cache.get('all'), COUNTRIES)
+        self.assertEqual(len(self.upstream.hits), 2)
+        self.assertEqual(cache.get('all'), COUNTRIES[:1])
+
+    def test_expired_entry_is_refetched(self):
+        cache = self.make_cache()
+        cache.get('all')
+        self.upstream.countries = COUNTRIES[:1]
+        self.clock.now = 31
+        self.assertEqual(cache.get('all'), COUNTRIES[:1])
+
+    def test_stale_entry_is_served_when_upstream_fails(self):
+        cache = self.make_cache()
+        cache.get('all')
+        self.upstream.failing = True
+        self.clock.now = 50
+        self.assertEqual(cache.get('all'), COUNTRIES)
+        self.clock.now = 200
+        with self.assertRaises(requests.exceptions.HTTPError):
+            cache.get('all')
+
+    def test_entries_are_bounded(self):
+        cache = self.make_cache(max_entries=2)
+        cache.get('alpha/de')
+        cache.get('alpha/fr')
+        cache.get('alpha/de')
+        cache.get('alpha/gl')
+        self.assertEqual(len(cache), 2)
+        cache.get('alpha/de')
+        cache.get('alpha/fr')
+        self.assertEqual(len(self.upstream.hits), 4)
+
+    def test_views_fall_back_to_cached_upstream_without_snapshot(self):
+        get_country_cache().clear()
+        self.addCleanup(get_country_cache().clear)
+        with override_settings(COUNTRIES_SNAPSHOT_PATH=None):
+            for _ in range(2):
+                response = self.client.get('/api/countries/independent/false/?fields=cca2')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), [{"cca2": "GL"}])
+            self.assertEqual(self.client.get('/api/countries/de/').json()[0]['cca3'], 'DEU')
+        self.assertEqual(self.upstream.hits, ['/all'])
+
+
+class CountryStoreTests(TestCase):
+    def setUp(self):
+        self.tmpdir = self.enterContext(tempfile.TemporaryDirectory())
+        self.snapshot = os.path.join(self.tmpdir, 'countries.json')
+        self.enterContext(override_settings(COUNTRIES_SNAPSHOT_PATH=self.snapshot))
+        write_snapshot(COUNTRIES, self.snapshot)
+
+    def test_indexes(self):
+        store = CountryStore(COUNTRIES)
+        self.assertEqual(store.by_code('de')['name']['common'], 'Germany')
+        self.assertEqual(store.by_code('FRA')['cca2'], 'FR')
+        self.assertIsNone(store.by_code('ZZ'))
+        self.assertEqual(store.by_name('germany', fields='cca3'), [{'cca3': 'DEU'}])
+        self.assertEqual([c['cca2'] for c in store.by_independence(True)], ['DE', 'FR'])
+        self.assertEqual(store.all(fields='cca2,region')[2], {'cca2': 'GL', 'region': 'Americas'})
+
+    def test_ingest_swaps_the_whole_index(self):
+        store = CountryStore(COUNTRIES)
+        index = store._index
+        store.ingest(COUNTRIES[:1])
+        # A reader still holding the old index sees it whole
+        self.assertEqual(len(index.countries), 3)
+        self.assertEqual(index.by_code['GL']['cca3'], 'GRL')
+        self.assertIsNone(store.by_code('GL'))
+        self.assertEqual(len(store), 1)
+
+    def test_views_are_served_from_the_snapshot(self):
+        # No upstream is reachable here: COUNTRIES_API_BASE still points at the real API
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/countries/?fields=cca2')
+        self.assertEqual(response.json(), [{'cca2': 'DE'}, {'cca2': 'FR'}, {'cca2': 'GL'}])
+        self.assertEqual(self.client.get('/api/countries/gl/?fields=independent').json(), [{'independent': False}])
+        self.assertEqual(self.client.get('/api/countries/zz/').status_code, 404)
+        independent = self.client.get('/api/countries/independent/true/').json()
+        self.assertEqual([c['cca3'] for c in independent], ['DEU', 'FRA'])
+
+    def test_store_reloads_a_replaced_snapshot(self):
+        self.assertEqual(len(get_country_store()), 3)
+        write_snapshot(COUNTRIES[:1], self.snapshot)
+        # Make sure the new file has a different mtime on coarse filesystems
+        os.utime(self.snapshot, ns=(0, 0))
+        self.assertEqual(len(get_country_store()), 1)
+
+    def test_refresh_command_from_file(self):
+        source = os.path.join(self.tmpdir, 'source.json')
+        with open(source, 'w') as f:
+            json.dump(COUNTRIES[1:], f)
+        call_command('refresh_countries', file=source, stdout=StringIO())
+        with open(self.snapshot) as f:
+            self.assertEqual(json.load(f), COUNTRIES[1:])
+        self.assertEqual(sorted(os.listdir(self.tmpdir)), ['countries.json', 'source.json'])
+
+    def test_refresh_command_from_upstream(self):
+        with StubCountriesUpstream(COUNTRIES) as upstream, \
+                override_settings(COUNTRIES_API_BASE=upstream.url, OUTBOUND_HTTP=NO_BACKOFF):
+            call_command('refresh_countries', stdout=StringIO())
+        with open(self.snapshot) as f:
+            self.assertEqual(json.load(f), COUNTRIES)
+
+    def test_refresh_command_keeps_old_snapshot_on_bad_input(self):
+        source = os.path.join(self.tmpdir, 'source.json')
+        with open(source, 'w') as f:
+            json.dump([], f)
+        with self.assertRaises(CommandError):
+            call_command('refresh_countries', file=source)
+        with open(self.snapshot) as f:
+            self.assertEqual(json.load(f), COUNTRIES)
+
+
+class OutboundClientTests(TestCase):
+    def setUp(self):
+        self.upstream = self.enterContext(StubCountriesUpstream(COUNTRIES))
+        self.url = f"{self.upstream.url}/all"
+        self.clock = FakeClock()
+
+    def make_client(self, **kwargs):
+        options = dict(backoff=0, failure_threshold=2, reset_timeout=30)
+        options.update(kwargs)
+        client = OutboundClient('stub', **options)
+        self.addCleanup(client.close)
+        return client
+
+    def test_connections_are_reused(self):
+        client = self.make_client()
+        for _ in range(3):
+            self.assertEqual(client.get(self.url).json(), COUNTRIES)
+        self.assertEqual(len(self.upstream.client_ports), 1)
+        stats = client.stats.as_dict()
+        self.assertEqual((stats['requests'], stats['errors']), (3, 0))
+
+    def test_retries_transient_failures(self):
+        client = self.make_client(max_retries=2)
+        self.upstream.fail_next = 2
+        self.assertEqual(client.get(self.url).status_code, 200)
+        self.assertEqual(len(self.upstream.hits), 3)
+        stats = client.stats.as_dict()
+        self.assertEqual((stats['retries'], stats['errors']), (2, 2))
+
+    def test_gives_up_after_max_retries(self):
+        client = self.make_client(max_retries=1)
+        self.upstream.failing = True
+        self.assertEqual(client.get(self.url).status_code, 503)
+        self.assertEqual(len(self.upstream.hits), 2)
+
+    def test_deadline_bounds_the_whole_call(self):
+        client = self.make_client(max_retries=5)
+        self.upstream.delay = 0.3
+        started = time.monotonic()
+        with self.assertRaises(requests.exceptions.Timeout):
+            client.get(self.url, deadline=0.1)
+        self.assertLess(time.monotonic() - started, 0.3)
+
+    def test_circuit_opens_and_recovers(self):
+        client = self.make_client(max_retries=0, clock=self.clock)
+        client.breaker = CircuitBreaker(2, 30, clock=self.clock)
+        self.upstream.failing = True
+        client.get(self.url)
+        client.get(self.url)
+        self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            client.get(self.url)
+        self.assertEqual(len(self.upstream.hits), 2)
+        self.assertEqual(client.stats.as_dict()['rejected'], 1)
+
+        self.clock.now = 31
+        self.upstream.failing = False
+        self.assertEqual(client.get(self.url).status_code, 200)
+        self.assertEqual(client.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_failed_trial_reopens_the_circuit(self):
+        breaker = CircuitBreaker(1, 10, clock=self.clock)
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+        self.clock.now = 10
+        self.assertTrue(breaker.allow())
+        # Only one trial call at a time
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+    def test_any_request_error_ends_the_trial(self):
+        client = self.make_client(clock=self.clock)
+        client.breaker = CircuitBreaker(1, 10, clock=self.clock)
+        client.breaker.record_failure()
+        self.clock.now = 10
+        with mock.patch.object(client.session, 'get', side_effect=requests.exceptions.TooManyRedirects):
+            with self.assertRaises(requests.exceptions.TooManyRedirects):
+                client.get(self.url)
+        self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+        self.clock.now = 20
+        self.assertEqual(client.get(self.url).status_code, 200)
+        self.assertEqual(client.breaker.state, CircuitBreaker.CLOSED)
+
+
+class SingleFlightTests(SimpleTestCase):
+    def test_concurrent_calls_share_one_execution(self):
+        flights = SingleFlight()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 'value'
+
+        async def burst():
+            results = await asyncio.gather(*(flights.do('key', load) for _ in range(50)))
+            # Once settled, the next call runs again
+            results.append(await flights.do('key', load))
+            return results
+
+        self.assertEqual(asyncio.run(burst()), ['value'] * 51)
+        self.assertEqual(len(calls), 2)
+
+    def test_errors_reach_every_waiter(self):
+        flights = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0)
+            raise ValueError('boom')
+
+        async def burst():
+            return await asyncio.gather(
+                *(flights.do('key', fail) for _ in range(3)), return_exceptions=True
+            )
+
+        results = asyncio.run(burst())
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+
+
+class AsyncCountryViewTests(SimpleTestCase):
+    def setUp(self):
+        self.upstream = self.enterContext(StubCountriesUpstream(COUNTRIES, delay=0.05))
+        self.enterContext(override_settings(
+            COUNTRIES_API_BASE=self.upstream.url, COUNTRIES_SNAPSHOT_PATH=None
+        ))
+        get_country_cache().clear()
+        country_store.reset()
+        self.addCleanup(get_country_cache().clear)
+        self.addCleanup(country_store.reset)
+
+    def test_burst_is_coalesced_into_one_upstream_fetch(self):
+        factory = RequestFactory()
+        view = AsyncCountryListView.as_view()
+
+        async def burst():
+            return await asyncio.gather(*(
+                view(factory.get('/api/countries/', {'fields': 'cca2'})) for _ in range(20)
+            ))
+
+        responses = asyncio.run(burst())
+        self.assertEqual({r.status_code for r in responses}, {200})
+        self.assertEqual(json.loads(responses[0].content), [{'cca2': 'DE'}, {'cca2': 'FR'}, {'cca2': 'GL'}])
+        self.assertEqual(self.upstream.hits, ['/all'])
+
+    def test_detail_view(self):
+        view = AsyncCountryDetailView.as_view()
+        request = RequestFactory().get('/api/countries/fr/')
+        response = asyncio.run(view(request, country_code='fr'))
+        self.assertEqual(json.loads(response.content)[0]['cca3'], 'FRA')
+        missing = asyncio.run(view(request, country_code='zz'))
+        self.assertEqual(missing.status_code, 404)
+
+
+class SearchTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.tokyo = make_blog(cls.category, cls.author, 1, tags=["Japan"])
+        cls.tokyo.title = "Hidden gems of Tokyo"
+        cls.tokyo.content = "Tokyo has <b>quiet</b> neighbourhoods beyond the tourist traps."
+        cls.tokyo.save()
+        cls.mention = make_blog(cls.category, cls.author, 2)
+        cls.mention.content = "A short stopover in Tokyo on the way to Kyoto."
+        cls.mention.save()
+        cls.other = make_blog(cls.other_category, cls.author, 3, tags=["Ramen"])
+
+    def search(self, **params):
+        response = self.client.get('/api/blogs/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_results_are_ranked_and_highlighted(self):
+        results = self.search(q='tokyo')['results']
+        self.assertEqual([r['id'] for r in results], [self.tokyo.id, self.mention.id])
+        self.assertGreater(results[0]['score'], results[1]['score'])
+        self.assertIn('<mark>Tokyo</mark>', results[1]['snippet'])
+
+    def test_snippets_escape_content(self):
+        results = self.search(q='quiet')['results']
+        self.assertIn('&lt;b&gt;<mark>quiet</mark>&lt;/b&gt;', results[0]['snippet'])
+
+    def test_tags_and_prefixes_match(self):
+        self.assertEqual([r['id'] for r in self.search(q='ramen')['results']], [self.other.id])
+        self.assertEqual([r['id'] for r in self.search(q='hidd')['results']], [self.tokyo.id])
+
+    def test_user_input_cannot_inject_fts_syntax(self):
+        self.assertEqual(build_match_query('tokyo OR "x" NEAR(a'), '"tokyo" "OR" "x" "NEAR" "a"*')
+        # '-' is not negation: both words are required
+        self.assertEqual([r['id'] for r in self.search(q='tokyo -kyoto')['results']], [self.mention.id])
+        self.assertEqual(self.search(q='"* :')['results'], [])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.mention.content = "Nothing about that city any more."
+        self.mention.save()
+        self.assertEqual([r['id'] for r in self.search(q='tokyo')['results']], [self.tokyo.id])
+        self.tokyo.delete()
+        self.assertEqual(self.search(q='tokyo')['results'], [])
+
+    def test_pagination(self):
+        first = self.search(q='tokyo', page_size=1)
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).data
+        self.assertEqual(second['results'][0]['id'], self.mention.id)
+        self.assertIsNone(second['next'])
+        self.assertIsNotNone(second['previous'])
+
+    def test_rebuild_command(self):
+        # Rows written without signals are picked up by a rebuild
+        Blog.objects.filter(pk=self.other.pk).update(title="Street food in Osaka")
+        self.assertEqual(search_blogs('osaka', limit=5), ([], False))
+        call_command('rebuild_search_index', stdout=StringIO())
+        blogs, _ = search_blogs('osaka', limit=5)
+        self.assertEqual([b.id for b in blogs], [self.other.id])
+
+    def test_search_runs_two_queries(self):
+        with self.assertNumQueries(2):
+            self.client.get('/api/blogs/search/', {'q': 'tokyo'})
+
+
+class TagIndexTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.tokyo = make_blog(cls.category, cls.author, 1, tags=["Japan", "Travel", "japan "])
+        cls.kyoto = make_blog(cls.category, cls.author, 2, tags=["Japan", "Temples"])
+        cls.ramen = make_blog(cls.other_category, cls.author, 3, tags=["Food"])
+
+    def counts(self):
+        return dict(Tag.objects.filter(blog_count__gt=0).values_list('slug', 'blog_count'))
+
+    def test_normalize_tags(self):
+        self.assertEqual(normalize_tags(["Hidden Gems", "hidden gems", " ", "AI"]), {
+            'hidden-gems': 'Hidden Gems', 'ai': 'AI',
+        })
+
+    def test_index_follows_saves_and_deletes(self):
+        self.assertEqual(self.counts(), {'japan': 2, 'travel': 1, 'temples': 1, 'food': 1})
+        self.kyoto.tags = ["Temples", "Food"]
+        self.kyoto.save()
+        self.assertEqual(self.counts(), {'japan': 1, 'travel': 1, 'temples': 1, 'food': 2})
+        self.ramen.delete()
+        self.assertEqual(self.counts(), {'japan': 1, 'travel': 1, 'temples': 1, 'food': 1})
+        self.assertEqual(BlogTag.objects.count(), 4)
+
+    def test_rebuild_fixes_drift(self):
+        Blog.objects.filter(pk=self.ramen.pk).update(tags=["Japan"])
+        Tag.objects.update(blog_count=42)
+        rebuild_tag_index()
+        self.assertEqual(self.counts(), {'japan': 3, 'travel': 1, 'temples': 1})
+
+    def test_tag_list_endpoint(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/tags/')
+        self.assertEqual(response.data[0], {
+            'id': Tag.objects.get(slug='japan').id, 'name': 'Japan', 'slug': 'japan', 'count': 2,
+        })
+        self.assertEqual(len(self.client.get('/api/tags/?limit=2').data), 2)
+
+    def test_blog_list_filters_by_tag(self):
+        response = self.client.get('/api/blogs/?tag=Japan')
+        self.assertEqual({b['id'] for b in response.data['results']}, {self.tokyo.id, self.kyoto.id})
+        response = self.client.get('/api/blogs/?tag=japan&category=food')
+        self.assertEqual(response.data['results'], [])
+        self.assertEqual(self.client.get('/api/blogs/?tag=unknown').status_code, 404)
+
+    def test_tag_pages_follow_published_at(self):
+        self.tokyo.published_at = timezone.now() + timedelta(days=1)
+        self.tokyo.save()
+        self.assertEqual(
+            set(BlogTag.objects.filter(blog=self.tokyo).values_list('published_at', flat=True)),
+            {self.tokyo.published_at}
+        )
+        first = self.client.get('/api/blogs/?tag=japan&page_size=1').json()
+        second = self.client.get(first['next']).json()
+        self.assertEqual(
+            [first['results'][0]['id'], second['results'][0]['id']], [self.tokyo.id, self.kyoto.id]
+        )
+        self.assertIsNone(second['next'])
+        self.assertEqual(self.client.get(second['previous']).json()['results'][0]['id'], self.tokyo.id)
+
+
+class RelatedBlogTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+
+        def post(index, category, title, content, tags):
+            return make_blog(
+                category, cls.author, index, title=title, excerpt=title, content=content, tags=tags
+            )
+
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.alps = post(0, cls.category, "Hiking the Swiss Alps",
+                            "Glacier trails and mountain huts above Zermatt", ["Hiking", "Alps"])
+            cls.dolomites = post(1, cls.category, "Hiking the Dolomites",
+                                 "Mountain huts and via ferrata trails", ["Hiking"])
+            cls.zermatt = post(2, cls.category, "A weekend in Zermatt",
+                               "Glacier views from the Alps village", ["Alps"])
+            cls.sushi = post(3, cls.other_category, "Sushi in Tokyo",
+                             "Fish markets and omakase counters", ["Japan"])
+            cls.beach = post(4, cls.category, "Beaches of Portugal",
+                             "Sand, surf and sardines", ["Coast"])
+
+    def neighbours(self, blog):
+        return list(blog.related_links.order_by('rank').values_list('related_id', flat=True))
+
+    def test_index_scores_text_and_tags(self):
+        index = SimilarityIndex([
+            Document(1, "Swiss Alps", tags=["alps"]),
+            Document(2, "Alps glacier", tags=["Alps"]),
+            Document(3, "Tokyo sushi"),
+            Document(4, "Ramen", tags=["japan"]),
+        ])
+        ids, scores = index.score(Document(1, "Swiss Alps", tags=["alps"]))
+        self.assertEqual(ids.tolist(), [2])
+        self.assertTrue(0 < scores[0] <= 1)
+        self.assertEqual(index.neighbours(2, 5), [])
+        self.assertEqual([pair[0] for pair in index.neighbours(0, 5)], [2])
+
+    def test_neighbours_are_ranked_on_save(self):
+        self.assertEqual(self.neighbours(self.alps), [self.dolomites.id, self.zermatt.id])
+        self.assertEqual(self.neighbours(self.sushi), [])
+        scores = list(self.alps.related_links.order_by('rank').values_list('score', flat=True))
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_saving_updates_other_blogs_lists(self):
+        self.sushi.content = "Mountain huts and glacier trails near Zermatt"
+        self.sushi.tags = ["Alps"]
+        # Nothing is scored or written inside the save's transaction
+        with self.captureOnCommitCallbacks() as callbacks, CaptureQueriesContext(connection) as queries:
+            self.sushi.save()
+        self.assertFalse([query for query in queries.captured_queries if 'blog_relatedblog' in query['sql']])
+        self.assertNotIn(self.sushi.id, self.neighbours(self.alps))
+        with CaptureQueriesContext(connection) as queries:
+            for callback in callbacks:
+                callback()
+        self.assertIn(self.sushi.id, self.neighbours(self.alps))
+        self.assertIn(self.alps.id, self.neighbours(self.sushi))
+        thresholds = next(query['sql'] for query in queries.captured_queries if '"rank" =' in query['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {thresholds}")
+            self.assertIn('USING COVERING INDEX relatedblog_rank_idx (rank=? AND blog_id=?)', cursor.fetchall()[0][-1])
+
+        self.sushi.content = "Fish markets"
+        self.sushi.tags = ["Japan"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sushi.save()
+        self.assertNotIn(self.sushi.id, self.neighbours(self.alps))
+        self.assertEqual(self.neighbours(self.sushi), [])
+
+    def test_deleting_drops_neighbour_rows(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dolomites.delete()
+        self.assertEqual(self.neighbours(self.alps), [self.zermatt.id])
+
+    @override_settings(RELATED_BLOGS_TOP_K=1)
+    def test_rebuild_matches_across_worker_processes(self):
+        in_process = rebuild_related(workers=1)
+        rows = set(RelatedBlog.objects.values_list('blog_id', 'related_id', 'rank'))
+        self.assertEqual(in_process, 3)
+        self.assertEqual(rebuild_related(workers=2, chunk_size=2), in_process)
+        self.assertEqual(set(RelatedBlog.objects.values_list('blog_id', 'related_id', 'rank')), rows)
+        self.assertEqual(self.neighbours(self.alps), [self.dolomites.id])
+
+    def test_rebuild_command(self):
+        RelatedBlog.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_related', workers=1, stdout=out)
+        self.assertIn("3 blogs", out.getvalue())
+        self.assertEqual(self.neighbours(self.alps), [self.dolomites.id, self.zermatt.id])
+
+    def test_endpoint_serves_neighbours_then_tops_up_from_category(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/blogs/post-0/related/')
+        self.assertEqual(
+            [blog['id'] for blog in response.data],
+            [self.dolomites.id, self.zermatt.id, self.beach.id]
+        )
+        self.assertEqual(self.client.get('/api/blogs/post-3/related/').data, [])
+        self.assertEqual(self.client.get('/api/blogs/missing/related/').status_code, 404)
+
+
+class ResponseCacheTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.first = make_blog(cls.category, cls.author, 0, is_featured=True)
+        cls.second = make_blog(cls.other_category, Author.objects.create(name="John Doe"), 1)
+
+    def cache_status(self, url, **extra):
+        return self.client.get(url, **extra)['X-Cache']
+
+    def test_repeat_requests_are_served_from_cache(self):
+        for url in ['/api/blogs/', '/api/blogs/featured/', '/api/blogs/post-0/',
+                    '/api/blogs/post-0/related/', '/api/categories/']:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                self.assertEqual(first['X-Cache'], 'MISS')
+                with self.assertNumQueries(0):
+                    second = self.client.get(url)
+                self.assertEqual(second['X-Cache'], 'HIT')
+                self.assertEqual(second.content, first.content)
+
+    def test_writes_drop_only_affected_entries(self):
+        urls = ['/api/blogs/', '/api/blogs/post-0/', '/api/blogs/post-1/', '/api/categories/']
+        for url in urls:
+            self.client.get(url)
+
+        Comment.objects.create(blog=self.first, name="Reader", content="Nice")
+        self.assertEqual([self.cache_status(url) for url in urls], ['MISS', 'MISS', 'HIT', 'HIT'])
+
+        self.second.author.name = "Johnny Doe"
+        self.second.author.save()
+        self.assertEqual([self.cache_status(url) for url in urls], ['MISS', 'HIT', 'MISS', 'HIT'])
+
+        self.first.category.name = "Trips"
+        self.first.category.save()
+        self.assertEqual([self.cache_status(url) for url in urls], ['MISS', 'MISS', 'HIT', 'MISS'])
+
+    def test_moving_a_blog_drops_both_categories(self):
+        urls = ['/api/blogs/post-0/', '/api/blogs/post-1/', '/api/categories/']
+        for url in urls:
+            self.client.get(url)
+        blog = Blog.objects.get(pk=self.second.pk)
+        blog.category = self.category
+        blog.save()
+        self.assertEqual([self.cache_status(url) for url in urls], ['MISS', 'MISS', 'MISS'])
+
+    def test_key_includes_accept_header_and_auth_class(self):
+        self.client.get('/api/categories/')
+        self.assertEqual(self.cache_status('/api/categories/', HTTP_ACCEPT='text/html'), 'MISS')
+        self.client.cookies['sessionid'] = 'unknown'
+        self.assertEqual(self.cache_status('/api/categories/'), 'MISS')
+        self.assertEqual(self.cache_status('/api/categories/'), 'HIT')
+
+    def test_errors_are_not_cached(self):
+        self.assertEqual(self.cache_status('/api/blogs/missing/'), 'MISS')
+        self.assertEqual(self.cache_status('/api/blogs/missing/'), 'MISS')
+
+    def test_concurrent_misses_render_once(self):
+        renders = []
+
+        def render():
+            renders.append(1)
+            time.sleep(0.05)
+            return HttpResponse(b'[]', content_type='application/json'), ['blogs'], None
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: get_or_render('page', render), range(8)))
+        self.assertEqual(len(renders), 1)
+        self.assertEqual(sum(1 for entry, _ in results if entry is not None), 7)
+        self.assertTrue(all(entry['content'] == b'[]' for entry, _ in results if entry))
+
+
+class ConditionalGetTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.blog = make_blog(cls.category, cls.author, 0, is_featured=True)
+        make_blog(cls.category, cls.author, 1)
+        Comment.objects.create(blog=cls.blog, name="Reader", content="Nice")
+
+    urls = [
+        '/api/blogs/', '/api/blogs/post-0/', '/api/blogs/featured/', '/api/blogs/post-0/related/',
+        '/api/blogs/post-0/comments/', '/api/blogs/search/?q=post', '/api/categories/',
+        '/api/categories/travel/', '/api/categories/travel/?include_blogs=true',
+    ]
+
+    def test_saves_bump_version_and_modification_time(self):
+        blog = Blog.objects.get(pk=self.blog.pk)
+        updated_at, version = blog.updated_at, blog.version
+        blog.title = "Renamed"
+        blog.save(update_fields=['title'])
+        blog.refresh_from_db()
+        self.assertEqual(blog.version, version + 1)
+        self.assertGreater(blog.updated_at, updated_at)
+
+    # The detail view counts a view; held in the buffer it leaves the version alone
+    @override_settings(RESPONSE_CACHE_ENABLED=False, COUNTER_FLUSH_INTERVAL=3600)
+    def test_matching_etag_gets_304_without_serializing(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response['ETag'].startswith('W/"'))
+                self.assertIn('Last-Modified', response)
+                with mock.patch('rest_framework.serializers.Serializer.to_representation') as render:
+                    revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(revalidated.status_code, 304)
+                self.assertEqual(revalidated['ETag'], response['ETag'])
+                render.assert_not_called()
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    def test_if_modified_since(self):
+        response = self.client.get('/api/categories/')
+        since = response['Last-Modified']
+        self.assertEqual(self.client.get('/api/categories/', HTTP_IF_MODIFIED_SINCE=since).status_code, 304)
+        Category.objects.filter(pk=self.category.pk).update(updated_at=timezone.now() + timedelta(minutes=1))
+        self.assertEqual(self.client.get('/api/categories/', HTTP_IF_MODIFIED_SINCE=since).status_code, 200)
+
+    def test_writes_change_the_etag(self):
+        etags = lambda: [self.client.get(url)['ETag'] for url in self.urls[:5]]
+        before = etags()
+        self.blog.author.save()
+        Comment.objects.create(blog=self.blog, name="Reader", content="Me too")
+        after = etags()
+        self.assertTrue(all(old != new for old, new in zip(before, after)))
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False, COUNTER_WRITE_BEHIND=False)
+    def test_counter_writes_change_the_etag(self):
+        reader = get_user_model().objects.create_user('reader@example.com', password='secret')
+        for url in ('/api/blogs/', '/api/blogs/featured/'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                likes.toggle_like(reader, self.blog)
+                revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(revalidated.status_code, 200)
+                response = revalidated
+                counter_buffer.increment(Blog, self.blog.pk, 'view_count', 10)
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    def test_pagination_links_are_validated(self):
+        # The only blog after the first page shares neither category nor author with it
+        last = make_blog(self.other_category, Author.objects.create(name="John Doe"), 2,
+                         published_at=timezone.now() - timedelta(days=1))
+        response = self.client.get('/api/blogs/?page_size=2')
+        self.assertIsNotNone(response.json()['next'])
+        last.delete()
+        revalidated = self.client.get('/api/blogs/?page_size=2', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 200)
+        self.assertIsNone(revalidated.json()['next'])
+
+    def test_cached_responses_revalidate_without_queries(self):
+        etag = self.client.get('/api/blogs/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/blogs/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+
+class CounterCacheTests(BlogTestCase):
+    def counts(self):
+        return dict(Category.objects.values_list('slug', 'count'))
+
+    def test_blog_saves_and_deletes_keep_category_counts(self):
+        blog = make_blog(self.category, self.author, 0)
+        make_blog(self.category, self.author, 1)
+        self.assertEqual(self.counts(), {'travel': 2, 'food': 0})
+
+        blog = Blog.objects.get(pk=blog.pk)
+        blog.category = self.other_category
+        blog.save()
+        self.assertEqual(self.counts(), {'travel': 1, 'food': 1})
+        blog.title = "Renamed"
+        blog.save()
+        self.assertEqual(self.counts(), {'travel': 1, 'food': 1})
+
+        blog.delete()
+        self.assertEqual(self.counts(), {'travel': 1, 'food': 0})
+
+    def test_serializer_create_counts_once(self):
+        serializer = BlogCreateUpdateSerializer(data={
+            'title': "New", 'excerpt': "New", 'content': "New", 'cover_image': "https://example.com/c.jpg",
+            'category': self.category.pk, 'author': self.author.pk, 'read_time': 3,
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save(slug='new')
+        self.assertEqual(self.counts()['travel'], 1)
+
+    def test_bulk_create_and_update_keep_category_counts(self):
+        Blog.objects.bulk_create([
+            Blog(category=category, author=self.author, title=slug, slug=slug, excerpt="", content="",
+                 cover_image="https://example.com/cover.jpg")
+            for category, slug in [(self.category, 'a'), (self.category, 'b'), (self.other_category, 'c')]
+        ])
+        self.assertEqual(self.counts(), {'travel': 2, 'food': 1})
+
+        self.assertEqual(Blog.objects.filter(slug__in=['a', 'b']).update(category=self.other_category), 2)
+        self.assertEqual(self.counts(), {'travel': 0, 'food': 3})
+        Blog.objects.filter(slug='c').update(category_id=self.category.pk)
+        self.assertEqual(self.counts(), {'travel': 1, 'food': 2})
+
+        Blog.objects.filter(slug__in=['a', 'c']).delete()
+        self.assertEqual(self.counts(), {'travel': 0, 'food': 1})
+
+    def test_comment_writes_keep_comment_counts(self):
+        blog = make_blog(self.category, self.author, 0)
+        other = make_blog(self.category, self.author, 1)
+        comment = Comment.objects.create(blog=blog, name="A", content="First")
+        Comment.objects.create(blog=blog, name="B", content="Reply", parent=comment)
+        Comment.objects.bulk_create([Comment(blog=other, name="C", content="Bulk")])
+        counts = lambda: list(Blog.objects.order_by('slug').values_list('comment_count', flat=True))
+        self.assertEqual(counts(), [2, 1])
+
+        # Deleting a comment takes its replies along
+        comment.delete()
+        self.assertEqual(counts(), [0, 1])
+        self.client.force_login(get_user_model().objects.create_user('reader@example.com'))
+        response = self.client.post('/api/blogs/post-0/comments/create/', {'name': "D", 'content': "Hi"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(counts(), [1, 1])
+
+        Comment.objects.filter(blog=other).update(blog=blog)
+        self.assertEqual(counts(), [2, 0])
+
+    def test_cascades_skip_counters_of_deleted_parents(self):
+        blog = make_blog(self.other_category, self.author, 0)
+        Comment.objects.bulk_create([Comment(blog=blog, name="A", content="Hi") for _ in range(5)])
+        with mock.patch('blog.counter_cache.adjust') as adjust:
+            self.other_category.delete()
+        adjust.assert_not_called()
+        self.assertFalse(Comment.objects.exists())
+
+    def test_reconcile_fixes_drift(self):
+        blog = make_blog(self.category, self.author, 0)
+        Comment.objects.create(blog=blog, name="A", content="First")
+        Category.objects.filter(pk=self.category.pk).update(count=7)
+        Category.objects.filter(pk=self.other_category.pk).update(count=-1)
+        Blog.objects.filter(pk=blog.pk).update(comment_count=0)
+
+        out = StringIO()
+        call_command('reconcile_counters', '--chunk-size', '1', stdout=out)
+        self.assertIn("blog.Category.count: fixed 2 rows", out.getvalue())
+        self.assertIn("blog.Blog.comment_count: fixed 1 rows", out.getvalue())
+        self.assertEqual(self.counts(), {'travel': 1, 'food': 0})
+        self.assertEqual(Blog.objects.get(pk=blog.pk).comment_count, 1)
+
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn("blog.Category.count: fixed 0 rows", out.getvalue())
+
+
+class LikeTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.blogs = [make_blog(cls.category, cls.author, i) for i in range(3)]
+        cls.comment = Comment.objects.create(blog=cls.blogs[0], name="A", content="First")
+        cls.reply = Comment.objects.create(blog=cls.blogs[0], name="B", content="Reply", parent=cls.comment)
+        cls.user = get_user_model().objects.create_user('reader@example.com')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def like(self, url, method='post'):
+        response = getattr(self.client, method)(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def like_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(url).json()
+        return data, [q['sql'] for q in queries.captured_queries if 'like"' in q['sql']]
+
+    def test_likes_are_idempotent_and_counted_once(self):
+        url = '/api/blogs/post-0/like/'
+        self.assertEqual(self.like(url), {"status": "liked", "liked": True, "like_count": 1})
+        self.assertEqual(self.like(url)['like_count'], 1)
+        self.assertEqual(BlogLike.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(self.like(url, 'delete'), {"status": "unliked", "liked": False, "like_count": 0})
+        self.assertEqual(self.like(url, 'delete')['like_count'], 0)
+
+        other = get_user_model().objects.create_user('other@example.com')
+        likes.toggle_like(other, self.blogs[0])
+        likes.toggle_like(self.user, self.blogs[0])
+        counter_buffer.flush()
+        self.assertEqual(Blog.objects.get(pk=self.blogs[0].pk).like_count, 2)
+        self.assertFalse(likes.toggle_like(other, self.blogs[0]))
+        self.assertEqual(likes.like_count(self.blogs[0]), 1)
+
+    def test_comment_likes(self):
+        url = f'/api/blogs/comments/{self.reply.pk}/like/'
+        self.assertEqual(self.like(url)['like_count'], 1)
+        self.assertEqual(self.like(url)['like_count'], 1)
+        self.assertTrue(CommentLike.objects.filter(user=self.user, comment=self.reply).exists())
+        self.client.logout()
+        self.assertEqual(self.client.post(url).status_code, 403)
+
+    def test_liked_by_me_in_one_query_per_page(self):
+        BlogLike.objects.create(user=self.user, blog=self.blogs[1])
+        CommentLike.objects.create(user=self.user, comment=self.reply)
+
+        data, queries = self.like_queries('/api/blogs/')
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(
+            {blog['slug']: blog['liked_by_me'] for blog in data['results']},
+            {'post-0': False, 'post-1': True, 'post-2': False}
+        )
+        data, queries = self.like_queries('/api/blogs/post-0/comments/')
+        self.assertEqual(len(queries), 1)
+        self.assertFalse(data[0]['liked_by_me'])
+        self.assertTrue(data[0]['replies'][0]['liked_by_me'])
+        data, queries = self.like_queries('/api/blogs/post-1/')
+        self.assertTrue(data['liked_by_me'])
+
+        self.client.logout()
+        data, queries = self.like_queries('/api/blogs/')
+        self.assertEqual(queries, [])
+        self.assertFalse(any(blog['liked_by_me'] for blog in data['results']))
+
+    def test_signed_in_responses_skip_the_cache_and_revalidate_per_user(self):
+        self.assertNotIn('X-Cache', self.client.get('/api/blogs/'))
+        etag = self.client.get('/api/blogs/post-0/')['ETag']
+        self.assertEqual(self.client.get('/api/blogs/post-0/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.like('/api/blogs/post-0/like/')
+        response = self.client.get('/api/blogs/post-0/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['liked_by_me'])
+
+        self.client.logout()
+        self.client.get('/api/blogs/')
+        self.assertEqual(self.client.get('/api/blogs/')['X-Cache'], 'HIT')
+
+
+@override_settings(HOME_LATEST_COUNT=2, HOME_TRENDING_COUNT=2, HOME_TRENDING_DAYS=7)
+class HomeTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        now = timezone.now()
+        cls.old_featured = make_blog(cls.category, cls.author, 0, is_featured=True,
+                                     published_at=now - timedelta(days=30), view_count=500)
+        cls.featured = make_blog(cls.category, cls.author, 1, is_featured=True,
+                                 published_at=now - timedelta(days=3), view_count=5)
+        cls.popular = make_blog(cls.other_category, cls.author, 2,
+                                published_at=now - timedelta(days=2), view_count=50)
+        cls.latest = make_blog(cls.other_category, cls.author, 3, published_at=now - timedelta(days=1))
+
+    def slugs(self, blogs):
+        return [blog['slug'] for blog in blogs]
+
+    def test_bundle(self):
+        data = self.client.get('/api/home/').json()
+        self.assertEqual(data['featured']['slug'], 'post-1')
+        self.assertEqual(self.slugs(data['latest']), ['post-3', 'post-2'])
+        # Only recent posts trend, however many views the old ones have
+        self.assertEqual(self.slugs(data['trending']), ['post-2', 'post-1'])
+        self.assertEqual([category['slug'] for category in data['categories']], ['travel', 'food'])
+        self.assertEqual(self.client.get('/api/blogs/featured/').json()['slug'], 'post-1')
+
+    def test_served_from_the_snapshot_and_refreshed_on_writes(self):
+        etag = self.client.get('/api/home/')['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/home/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_blog(self.category, self.author, 4)
+        # Rebuilt when the write committed, not by the next reader
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/home/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['latest'][0]['slug'], 'post-4')
+
+        Category.objects.get(pk=self.other_category.pk).delete()
+        data = self.client.get('/api/home/').json()
+        self.assertEqual([category['slug'] for category in data['categories']], ['travel'])
+        self.assertEqual(self.slugs(data['latest']), ['post-4', 'post-1'])
+
+    def test_liked_by_me(self):
+        user = get_user_model().objects.create_user('reader@example.com')
+        BlogLike.objects.create(user=user, blog=self.popular)
+        anonymous_etag = self.client.get('/api/home/')['ETag']
+        self.client.force_login(user)
+        response = self.client.get('/api/home/')
+        self.assertNotEqual(response['ETag'], anonymous_etag)
+        data = response.json()
+        self.assertEqual([blog['liked_by_me'] for blog in data['latest']], [False, True])
+        self.assertFalse(data['featured']['liked_by_me'])
+
+
+class DatabaseProfileTests(SimpleTestCase):
+    """Production profile and replica routing, run in a separate process against two SQLite files"""
+
+    def run_django(self, script, **env):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        env = {
+            **os.environ,
+            'DJANGO_DB_PROFILE': 'production',
+            'DJANGO_DB_PATH': os.path.join(directory.name, 'primary.sqlite3'),
+            **{name: os.path.join(directory.name, path) for name, path in env.items()},
+        }
+        result = subprocess.run(
+            [sys.executable, 'manage.py', 'shell', '-c', textwrap.dedent(script)],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, timeout=120,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def test_production_pragmas(self):
+        pragmas = self.run_django("""
+            import json
+            from django.db import connection
+            with connection.cursor() as cursor:
+                values = {}
+                for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'mmap_size'):
+                    values[name] = cursor.execute(f'PRAGMA {name}').fetchone()[0]
+            values['conn_max_age'] = connection.settings_dict['CONN_MAX_AGE']
+            print(json.dumps(values))
+        """)
+        self.assertEqual(pragmas, {
+            'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000,
+            'cache_size': -65536, 'mmap_size': 256 * 1024 * 1024, 'conn_max_age': 600,
+        })
+
+    def test_workers_share_the_response_cache(self):
+        shared = self.run_django("""
+            import json
+            from django.conf import settings
+            from django.core.cache.backends.filebased import FileBasedCache
+            from blog.response_cache import get_cache
+            get_cache().set('key', 'value')
+            # What another worker process opens on the same directory
+            other = FileBasedCache(settings.SHARED_CACHE_DIR, {})
+            print(json.dumps({'backend': type(get_cache()).__name__, 'value': other.get('key')}))
+        """, DJANGO_SHARED_CACHE_DIR='cache')
+        self.assertEqual(shared, {'backend': 'FileBasedCache', 'value': 'value'})
+
+    def test_reads_go_to_the_replica(self):
+        counts = self.run_django("""
+            import json, sqlite3
+            from django.conf import settings
+            from django.core.management import call_command
+            from django.core.signals import request_started
+            from django.db import DatabaseError, connections, router, transaction
+            from blog.models import Author, Blog, Category
+
+            def blog(category, author, slug):
+                Blog.objects.create(category=category, author=author, title=slug, slug=slug,
+                                    excerpt='', content='', cover_image='https://example.com/c.jpg')
+
+            call_command('migrate', verbosity=0)
+            category = Category.objects.create(name='Travel', slug='travel')
+            author = Author.objects.create(name='Jane', role='Writer')
+            blog(category, author, 'replicated')
+            # "Replicate": copy the primary into the replica file, then write more
+            primary = sqlite3.connect(settings.DATABASES['default']['NAME'])
+            primary.backup(sqlite3.connect(settings.DATABASES['replica']['NAME']))
+            blog(category, author, 'primary-only')
+
+            counts = {}
+            request_started.send(sender=None)
+            counts['replica'] = Blog.objects.count()
+            counts['primary'] = Blog.objects.using('default').count()
+            with transaction.atomic():
+                counts['in_transaction'] = Blog.objects.count()
+            # Looking up the write alias, or a transaction that wrote nothing, is no write
+            router.db_for_write(Blog)
+            with transaction.atomic():
+                Blog.objects.using('default').exists()
+            counts['after_routing'] = Blog.objects.count()
+            Category.objects.filter(pk=category.pk).update(count=2)
+            counts['after_write'] = Blog.objects.count()
+            request_started.send(sender=None)
+            counts['next_request'] = Blog.objects.count()
+            try:
+                Blog.objects.using('replica').update(view_count=1)
+            except DatabaseError:
+                counts['replica_writable'] = False
+            print(json.dumps(counts))
+        """, DJANGO_DB_REPLICA_PATH='replica.sqlite3')
+        self.assertEqual(counts, {
+            'replica': 1, 'primary': 2, 'in_transaction': 2, 'after_routing': 1, 'after_write': 2,
+            'next_request': 1, 'replica_writable': False,
+        })
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class QueryPlanTests(BlogTestCase):
+    """Every query behind the read endpoints is answered from an index, in index order"""
+    urls = [
+        '/api/blogs/', '/api/blogs/?category=travel', '/api/blogs/?tag=alps', '/api/blogs/?page_size=2',
+        '/api/blogs/featured/', '/api/blogs/post-0/', '/api/blogs/post-0/related/',
+        '/api/blogs/post-0/comments/', '/api/blogs/search/?q=post', '/api/categories/',
+        '/api/categories/travel/?include_blogs=true', '/api/tags/', '/api/home/',
+    ]
+
+    # Whole-table reads by design: the category list returns every row
+    full_scans = {'blog_category'}
+    # Orders no index can hold. Search ranks the matches by bm25 relevance.
+    # Trending ranks the recent window by live counters; an index on those
+    # would be rewritten on every counter flush, and it runs in the home
+    # snapshot build, off the request path; its .values() rows order by
+    # column position.
+    sorted_queries = ('ORDER BY score, rowid', f"ORDER BY {fast_serializers.COLUMNS.index('view_count') + 1} DESC")
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for index in range(4):
+            make_blog(cls.category if index % 2 else cls.other_category, cls.author, index,
+                      tags=["Alps"], is_featured=index == 1)
+        blog = Blog.objects.get(slug='post-0')
+        comment = Comment.objects.create(blog=blog, name="A", content="First")
+        Comment.objects.create(blog=blog, name="B", content="Reply", parent=comment)
+        cls.user = get_user_model().objects.create_user('reader@example.com')
+        BlogLike.objects.create(user=cls.user, blog=blog)
+        CommentLike.objects.create(user=cls.user, comment=comment)
+
+    def plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return [row[-1] for row in cursor.fetchall()]
+
+    def problems(self, sql):
+        if any(order in sql for order in self.sorted_queries):
+            return []
+        problems = []
+        for step in self.plan(sql):
+            if 'TEMP B-TREE' in step:
+                problems.append(step)
+            elif step.startswith('SCAN ') and ' USING ' not in step and 'VIRTUAL TABLE' not in step:
+                if step.split()[1] not in self.full_scans:
+                    problems.append(step)
+        return problems
+
+    def assert_indexed(self):
+        for url in self.urls:
+            get_response_cache().clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(url).status_code, 200, url)
+            for query in queries.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                with self.subTest(url=url, sql=sql):
+                    self.assertEqual(self.problems(sql), [])
+
+    def test_anonymous_reads_use_indexes(self):
+        self.assert_indexed()
+        # Keyset pages after the first
+        self.urls = [
+            self.client.get(f'/api/blogs/?page_size=1{query}').json()['next']
+            for query in ('', '&category=travel', '&tag=alps')
+        ]
+        self.assert_indexed()
+
+    def test_detects_scans_and_sorts(self):
+        self.assertEqual(self.problems('SELECT * FROM blog_comment ORDER BY content'), [
+            'SCAN blog_comment', 'USE TEMP B-TREE FOR ORDER BY'
+        ])
+
+    def test_signed_in_reads_use_indexes(self):
+        self.client.force_login(self.user)
+        self.assert_indexed()
+
+
+class BenchmarkTests(TestCase):
+    def test_percentile(self):
+        self.assertEqual(benchmark.percentile([3, 1, 2], 50), 2)
+        self.assertEqual(benchmark.percentile([10, 20], 95), 19.5)
+        self.assertEqual(benchmark.percentile([7], 99), 7)
+
+    def test_compare(self):
+        baseline = {'routes': {
+            'blog-list': {'p95_ms': 10.0, 'queries': 2, 'peak_kib': 100.0},
+            'blog-detail': {'p95_ms': 0.5, 'queries': 3, 'peak_kib': 100.0},
+        }}
+        results = {
+            'blog-list': {'p95_ms': 13.0, 'queries': 3, 'peak_kib': 110.0},
+            # Doubled, but by less than the noise floor
+            'blog-detail': {'p95_ms': 1.0, 'queries': 3, 'peak_kib': 100.0},
+            'tag-list': {'p95_ms': 50.0, 'queries': 9, 'peak_kib': 900.0},
+        }
+        self.assertEqual(benchmark.compare(baseline, results, threshold=0.2), [
+            'blog-list: p95_ms 10.0 -> 13.0 (+30%)', 'blog-list: queries 2 -> 3',
+        ])
+        self.assertEqual(benchmark.compare(baseline, results, threshold=0.5), ['blog-list: queries 2 -> 3'])
+
+    def seed_rows(self):
+        return {
+            'blogs': list(Blog.objects.order_by('pk').values_list(
+                'pk', 'title', 'category_id', 'tags', 'like_count', 'comment_count'
+            )),
+            'comments': list(Comment.objects.order_by('pk').values_list('pk', 'blog_id', 'parent_id', 'content')),
+            'likes': list(CommentLike.objects.order_by('pk').values_list('user_id', 'comment_id')),
+        }
+
+    def test_seed_synthetic(self):
+        options = dict(blogs=20, comments=150, users=6, blog_likes=40, comment_likes=90, categories=3,
+                       authors=4, tags=30, seed=7, batch_size=8)
+        call_command('seed_synthetic', stdout=StringIO(), **options)
+        self.assertEqual(Blog.objects.count(), 20)
+        self.assertEqual(get_user_model().objects.count(), 6)
+        self.assertEqual(sum(Category.objects.values_list('count', flat=True)), 20)
+        self.assertEqual(sum(Blog.objects.values_list('comment_count', flat=True)), 150)
+        self.assertEqual(sum(Blog.objects.values_list('like_count', flat=True)), 40)
+        self.assertEqual(sum(Comment.objects.values_list('like_count', flat=True)), 90)
+        self.assertFalse(Comment.objects.exclude(parent=None).exclude(parent__blog=F('blog')).exists())
+        self.assertTrue(Comment.objects.exclude(parent=None).exists())
+        tags = Blog.objects.values_list('tags', flat=True)
+        self.assertEqual(BlogTag.objects.count(), sum(len(blog_tags) for blog_tags in tags))
+        self.assertTrue(self.client.login(email='user1@example.com', password=synthetic.SYNTHETIC_PASSWORD))
+
+        # The same seed inserts the same rows (dates aside, being relative to now)
+        rows = self.seed_rows()
+        Category.objects.all().delete()
+        get_user_model().objects.all().delete()
+        call_command('seed_synthetic', stdout=StringIO(), **options)
+        self.assertEqual(self.seed_rows(), rows)
+
+        with self.assertRaises(CommandError):
+            call_command('seed_synthetic', stdout=StringIO(), **{**options, 'users': 0})
+
+    def test_runs_every_route(self):
+        synthetic.seed(blogs=12, comments=60, categories=2, authors=2)
+        context = benchmark.build_context(run='test')
+        user = benchmark.benchmark_user()
+        results = benchmark.run(
+            benchmark.select_routes(), context, user, iterations=2, warmup=0, memory_iterations=1
+        )
+        self.assertEqual(list(results), [route.name for route in benchmark.ROUTES])
+        for result in results.values():
+            self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+            self.assertLessEqual(result['p95_ms'], result['p99_ms'])
+            self.assertGreater(result['peak_kib'], 0)
+        self.assertGreater(results['blog-detail-signed-in']['queries'], 0)
+        self.assertEqual(get_user_model().objects.filter(email__startswith='bench-test-').count(), 3)
+
+        with self.assertRaises(benchmark.BenchmarkError):
+            benchmark.select_routes(['blog-list', 'nope'])
+
+
+class StartupTests(TestCase):
+    def test_migrate_only_when_pending(self):
+        self.assertEqual(pending_migrations(), [])
+        with mock.patch('blog_project.startup.call_command') as migrate:
+            self.assertEqual(migrate_if_needed(), [])
+        migrate.assert_not_called()
+
+        with mock.patch('blog_project.startup.pending_migrations', return_value=[('blog', '0099_next')]), \
+                mock.patch('blog_project.startup.call_command') as migrate:
+            self.assertEqual(migrate_if_needed(), [('blog', '0099_next')])
+        migrate.assert_called_once()
+
+    def test_ready(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/_ready/')
+        self.assertEqual(response.json(), {'status': 'ready'})
+
+    def test_process_memory(self):
+        memory = process_memory()
+        if not memory:
+            self.skipTest("/proc/self/smaps_rollup is not available")
+        self.assertGreater(memory['rss'], 0)
+        self.assertEqual(memory['private'] + memory['shared'], memory['rss'])
+
+
+class RequestMetricsTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for i in range(3):
+            make_blog(cls.category, cls.author, i)
+
+    def setUp(self):
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+    def server_timing(self, response):
+        entries = {}
+        for entry in response['Server-Timing'].split(', '):
+            name, *params = entry.split(';')
+            entries[name] = dict(param.split('=', 1) for param in params)
+        return entries
+
+    def test_server_timing(self):
+        with override_settings(RESPONSE_CACHE_ENABLED=False), CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/blogs/')
+        timing = self.server_timing(response)
+        self.assertEqual(timing['db']['desc'], f'"{len(queries)} queries"')
+        self.assertGreater(float(timing['serializer']['dur']), 0)
+        self.assertGreater(float(timing['render']['dur']), 0)
+        phases = sum(float(timing[phase]['dur']) for phase in ('db', 'serializer', 'render'))
+        self.assertLessEqual(phases, float(timing['total']['dur']))
+        self.assertNotIn('outbound', timing)
+
+        # Outside a request nothing is recorded
+        with metrics.timed('serializer'):
+            pass
+        self.assertIsNone(metrics.current())
+
+    def test_outbound_time(self):
+        upstream = self.enterContext(StubCountriesUpstream(COUNTRIES))
+        self.enterContext(override_settings(
+            COUNTRIES_API_BASE=upstream.url, OUTBOUND_HTTP=NO_BACKOFF, COUNTRIES_SNAPSHOT_PATH=None
+        ))
+        get_country_cache().clear()
+        self.addCleanup(get_country_cache().clear)
+        timing = self.server_timing(self.client.get('/api/countries/?fields=cca2'))
+        self.assertGreater(float(timing['outbound']['dur']), 0)
+
+    def test_metrics_endpoint(self):
+        self.assertEqual(self.client.get('/api/_metrics').status_code, 404)
+        with override_settings(METRICS_ENABLED=True, METRICS_BUCKETS=(0.5, 60)):
+            for _ in range(2):
+                self.client.get('/api/blogs/')
+            self.client.get('/api/blogs/post-0/')
+            self.client.get('/api/blogs/missing/')
+            response = self.client.get('/api/_metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        labels = f'pid="{os.getpid()}",method="GET",route="api/blogs/"'
+        self.assertIn(f'http_request_duration_seconds_bucket{{{labels},le="60"}} 2', text)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2', text)
+        self.assertIn(f'http_request_duration_seconds_count{{{labels}}} 2', text)
+        self.assertIn(f'http_requests_total{{{labels},status="200"}} 2', text)
+        detail = f'pid="{os.getpid()}",method="GET",route="api/blogs/<str:slug>/"'
+        self.assertIn(f'http_requests_total{{{detail},status="200"}} 1', text)
+        self.assertIn(f'http_requests_total{{{detail},status="404"}} 1', text)
+        self.assertIn(f'http_request_phase_seconds_total{{{labels},phase="db"}}', text)
+
+    async def test_async_stack(self):
+        # No middleware makes an ASGI request hop to a thread and back
+        # (reported with DEBUG on)
+        with override_settings(DEBUG=True), self.assertNoLogs('django.request', 'DEBUG'):
+            ASGIHandler()
+        response = await self.async_client.get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('db', self.server_timing(response))
+
+    @override_settings(SERVER_TIMING_ENABLED=False)
+    def test_disabled(self):
+        response = self.client.get('/api/blogs/')
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(registry.exposition().count('http_requests_total{'), 0)
+
+
+class ProfilingTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for i in range(3):
+            make_blog(cls.category, cls.author, i)
+        User = get_user_model()
+        cls.staff = User.objects.create_user('staff@example.com', password='staff-Passw0rd', is_staff=True)
+        cls.reader = User.objects.create_user('reader@example.com', password='reader-Passw0rd')
+
+    def setUp(self):
+        self.directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(override_settings(PROFILE_DIR=self.directory))
+        self.url = f'/api/categories/{self.category.slug}/?include_blogs=true'
+
+    def basic_auth(self, email, password):
+        return 'Basic ' + base64.b64encode(f'{email}:{password}'.encode()).decode()
+
+    def test_staff_profile(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(self.url, HTTP_X_PROFILE='cprofile')
+        self.assertEqual(response.status_code, 200)
+        profile_id = response['X-Profile-Id']
+
+        profile = self.client.get(f'/api/_profiles/{profile_id}/').json()
+        self.assertEqual(profile['route'], 'api/categories/<str:slug>/')
+        self.assertEqual(profile['path'], self.url)
+        self.assertEqual((profile['status'], profile['profiler'], profile['trigger']), (200, 'cprofile', 'request'))
+        self.assertGreater(profile['queries'], 0)
+        self.assertIn('serializer', profile['phases_ms'])
+
+        response = self.client.get(f'/api/_profiles/{profile_id}/pstats/')
+        stats_file = self.directory / 'download.prof'
+        stats_file.write_bytes(b''.join(response.streaming_content))
+        functions = {function for _, _, function in pstats.Stats(str(stats_file)).stats}
+        self.assertIn('to_representation', functions)
+
+        # Sampling, asked for with the query parameter
+        response = self.client.get(self.url + '&_profile=1')
+        profile = self.client.get(f"/api/_profiles/{response['X-Profile-Id']}/").json()
+        self.assertEqual(profile['profiler'], 'sample')
+        self.assertEqual(self.client.get(f"/api/_profiles/{profile['id']}/pstats/").status_code, 404)
+
+        # Basic auth credentials are checked before profiling starts
+        self.client.logout()
+        response = self.client.get(
+            self.url, HTTP_X_PROFILE='1', HTTP_AUTHORIZATION=self.basic_auth('staff@example.com', 'staff-Passw0rd')
+        )
+        self.assertTrue(response.has_header('X-Profile-Id'))
+
+    def test_not_staff(self):
+        # Nobody but staff gets a profiler started, whatever credentials they send
+        make_profiler = self.enterContext(mock.patch.object(profiling, 'make_profiler'))
+        self.assertFalse(self.client.get(self.url, HTTP_X_PROFILE='1').has_header('X-Profile-Id'))
+        for email, password in (('reader@example.com', 'reader-Passw0rd'), ('staff@example.com', 'wrong')):
+            response = self.client.get(
+                self.url, HTTP_X_PROFILE='cprofile', HTTP_AUTHORIZATION=self.basic_auth(email, password)
+            )
+            self.assertFalse(response.has_header('X-Profile-Id'))
+        self.client.force_login(self.reader)
+        self.assertFalse(self.client.get(self.url + '&_profile=1').has_header('X-Profile-Id'))
+        make_profiler.assert_not_called()
+        self.assertEqual(list(self.directory.iterdir()), [])
+        self.assertEqual(self.client.get('/api/_profiles/').status_code, 403)
+
+    async def test_async_requests(self):
+        response = await self.async_client.get(self.url, headers={'X-Profile': 'cprofile'})
+        self.assertFalse(response.has_header('X-Profile-Id'))
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get(self.url, headers={'X-Profile': 'cprofile'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue((self.directory / f"{response['X-Profile-Id']}.json").exists())
+
+    @override_settings(PROFILE_MAX_STORED=3)
+    def test_sampled_requests(self):
+        with override_settings(PROFILE_SAMPLE_EVERY=2):
+            for _ in range(4):
+                self.client.get(self.url)
+            self.client.get('/api/tags/')
+            self.client.get('/api/tags/')
+
+        self.client.force_login(self.staff)
+        profiles = self.client.get('/api/_profiles/').json()
+        # Pruned to the newest three
+        self.assertEqual(len(profiles), 3)
+        self.assertEqual({profile['trigger'] for profile in profiles}, {'sampled'})
+        self.assertNotIn('stacks', profiles[0])
+        profiles = self.client.get('/api/_profiles/', {'route': 'api/categories/<str:slug>/'}).json()
+        self.assertEqual(len(profiles), 2)
+
+        response = self.client.get('/api/_profiles/collapsed/', {'route': 'api/tags/'})
+        self.assertEqual(response['X-Profile-Count'], '1')
+        self.assertEqual(self.client.get('/api/_profiles/20240101T000000000000-0000000a/').status_code, 404)
+        self.assertEqual(self.client.get('/api/_profiles/..%2Fsecret/').status_code, 404)
+
+    def test_collapsed_stacks(self):
+        def busy():
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+
+        with profiling.StackSampler(0.001) as sampler:
+            busy()
+        self.assertGreater(sampler.samples, 0)
+        stack = max(sampler.stacks, key=sampler.stacks.get)
+        self.assertEqual(
+            stack.split(';')[-1], 'blog.tests.ProfilingTests.test_collapsed_stacks.<locals>.busy'
+        )
+
+        profiles = [{'stacks': {'a;b': 2, 'a': 1}}, {'stacks': {'a;b': 1, 'c': 5}}]
+        self.assertEqual(profiling.collapsed_text(profiling.aggregate(profiles)), "c 5\na;b 3\na 1\n")
+
+
+class FastSerializerTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        poet = Author.objects.create(name="Zoë", bio="Line\u2028break", avatar="https://example.com/a.png")
+        make_blog(cls.category, cls.author, 0, tags=["Alps", "Hiking"])
+        make_blog(cls.other_category, poet, 1, title="Crème brûlée \u2028\u2029 «quoted»", tags=[], is_featured=True)
+        make_blog(cls.category, poet, 2, published_at=timezone.now() - timedelta(days=3, microseconds=7))
+        cls.user = get_user_model().objects.create_user('reader@example.com')
+        BlogLike.objects.create(user=cls.user, blog=Blog.objects.get(slug='post-1'))
+
+    def test_parity(self):
+        counter_buffer.increment(Blog, Blog.objects.get(slug='post-2').id, 'view_count', 4)
+        blogs = list(Blog.objects.for_listing().order_by('-published_at', '-id'))
+        rows = list(fast_serializers.listing_rows(Blog.objects.order_by('-published_at', '-id')))
+        liked = likes.liked_by(self.user, blogs=rows)
+        self.assertEqual(liked, likes.liked_by(self.user, blogs=blogs))
+        self.assertEqual(sum(map(len, liked.values())), 1)
+
+        expected = BlogListSerializer(blogs, many=True, context=liked).data
+        data = fast_serializers.serialize_blogs(rows, liked)
+        # Same values, keys in the same order
+        self.assertEqual(json.dumps(data), json.dumps(expected))
+        self.assertEqual(compute_validators(rows, ['x']), compute_validators(blogs, ['x']))
+
+        with timezone.override(zoneinfo.ZoneInfo('Europe/Paris')):
+            self.assertEqual(
+                fast_serializers.serialize_blogs(rows[:1]), BlogListSerializer(blogs[:1], many=True).data
+            )
+
+    def test_renderer_parity(self):
+        self.client.force_login(self.user)
+        data = self.client.get('/api/blogs/').json()
+        data['extra'] = {
+            'when': timezone.now(), 'price': Decimal('1.50'), 'label': gettext_lazy("Home"), 1: None,
+        }
+        for payload in (data, [], {'detail': ErrorDetail("Not found.", code='not_found')}, "a\u2028b"):
+            with self.subTest(payload=payload):
+                self.assertEqual(FastJSONRenderer().render(payload), JSONRenderer().render(payload))
+        self.assertEqual(
+            FastJSONRenderer().render(data, 'application/json; indent=2'),
+            JSONRenderer().render(data, 'application/json; indent=2'),
+        )
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_views(self):
+        # Pagination, validators and likes work on the rows
+        self.client.force_login(self.user)
+        first = self.client.get('/api/blogs/?page_size=2')
+        self.assertEqual([blog['slug'] for blog in first.json()['results']], ['post-1', 'post-0'])
+        self.assertTrue(first.json()['results'][0]['liked_by_me'])
+        second = self.client.get(first.json()['next']).json()
+        self.assertEqual([blog['slug'] for blog in second['results']], ['post-2'])
+        self.assertEqual(self.client.get('/api/blogs/?page_size=2', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        detail = self.client.get('/api/blogs/post-1/').json()
+        self.assertEqual(detail, first.json()['results'][0] | {'view_count': 1})
+        self.assertEqual(self.client.get('/api/blogs/featured/').json()['slug'], 'post-1')
+        self.assertEqual(self.client.get('/api/blogs/missing/').status_code, 404)
+        category = self.client.get('/api/categories/travel/?include_blogs=true').json()
+        self.assertEqual([blog['slug'] for blog in category['blogs']], ['post-0', 'post-2'])
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ExportTests(BlogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.blogs = [make_blog(cls.category, cls.author, i, tags=["Alps"]) for i in range(5)]
+        first = Comment.objects.create(blog=cls.blogs[0], name="A", content="First")
+        Comment.objects.create(blog=cls.blogs[0], name="B", content="Reply", parent=first)
+        Comment.objects.create(blog=cls.blogs[1], name="C", content="Elsewhere")
+        cls.staff = get_user_model().objects.create_user('staff@example.com', is_staff=True)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.staff)
+
+    def export(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_blogs(self):
+        records = self.export('/api/blogs/export/')
+        self.assertEqual([record['id'] for record in records], [blog.id for blog in self.blogs])
+        listed = {blog['id']: blog for blog in self.client.get('/api/blogs/').json()['results']}
+        record = records[0]
+        self.assertEqual(record['content'], "Content 0")
+        updated_at = Blog.objects.values_list('updated_at', flat=True).get(id=record['id'])
+        self.assertEqual(record['updated_at'], updated_at.isoformat().replace('+00:00', 'Z'))
+        expected = {**listed[record['id']], 'content': "Content 0", 'updated_at': record['updated_at']}
+        del expected['liked_by_me']
+        self.assertEqual(record, expected)
+
+        # Resume after the last id received; only rows changed since a time
+        self.assertEqual(
+            [record['id'] for record in self.export('/api/blogs/export/', after=self.blogs[2].id)],
+            [blog.id for blog in self.blogs[3:]],
+        )
+        since = timezone.now()
+        self.blogs[1].save()
+        records = self.export('/api/blogs/export/', updated_since=since.isoformat())
+        self.assertEqual([record['id'] for record in records], [self.blogs[1].id])
+        self.assertEqual(self.export('/api/blogs/export/', updated_since='2999-01-01'), [])
+
+    def test_chunks(self):
+        response = self.client.get('/api/blogs/export/')
+        stream = iter(response.streaming_content)
+        # One keyset query per chunk, run as the stream is read
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(len(next(stream).splitlines()), 2)
+        self.assertEqual(len(queries), 1)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(sum(len(chunk.splitlines()) for chunk in stream), 3)
+        self.assertEqual(len(queries), 2)
+        self.assertIn(f'"blog_blog"."id" > {self.blogs[1].id}', queries[0]['sql'])
+
+    def test_comments(self):
+        counter_buffer.increment(Comment, Comment.objects.get(name="A").id, 'like_count', 2)
+        records = self.export(f'/api/blogs/{self.blogs[0].slug}/comments/export/')
+        self.assertEqual([(record['name'], record['like_count']) for record in records], [("A", 2), ("B", 0)])
+        self.assertEqual(records[1]['parent'], records[0]['id'])
+        self.assertEqual(
+            self.export(f'/api/blogs/{self.blogs[0].slug}/comments/export/', after=records[0]['id']), records[1:]
+        )
+        self.assertEqual(self.client.get('/api/blogs/missing/comments/export/').status_code, 404)
+
+    def test_errors(self):
+        for params in ({'after': 'x'}, {'after': -1}, {'updated_since': 'yesterday'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/blogs/export/', params).status_code, 400)
+        self.client.logout()
+        self.assertEqual(self.client.get('/api/blogs/export/').status_code, 403)
+        self.assertEqual(self.client.get(f'/api/blogs/{self.blogs[0].slug}/comments/export/').status_code, 403)
@@ -1,20 +1,28 @@
 from django.urls import path
 from .views import (
     BlogListView,
+    BlogSearchView,
     BlogDetailView,
     FeaturedBlogView,
     CommentListView,
     CommentCreateView,
     RelatedBlogsView,
-    BlogLikeView
+    BlogLikeView,
+    BlogExportView,
+    CommentLikeView,
+    CommentExportView
 )
 
 urlpatterns = [
     path('', BlogListView.as_view(), name='blog-list'),
     path('featured/', FeaturedBlogView.as_view(), name='featured-blog'),
+    path('search/', BlogSearchView.as_view(), name='blog-search'),
+    path('export/', BlogExportView.as_view(), name='blog-export'),
+    path('comments/<int:comment_id>/like/', CommentLikeView.as_view(), name='comment-like'),
     path('<str:slug>/', BlogDetailView.as_view(), name='blog-detail'),
     path('<str:slug>/like/', BlogLikeView.as_view(), name='blog-like'),
     path('<str:slug>/related/', RelatedBlogsView.as_view(), name='related-blogs'),
     path('<str:slug>/comments/', CommentListView.as_view(), name='comment-list'),
     path('<str:slug>/comments/create/', CommentCreateView.as_view(), name='comment-create'),
+    path('<str:slug>/comments/export/', CommentExportView.as_view(), name='comment-export'),
 ]
\ No newline at end of file
@@ -3,6 +3,9 @@ from rest_framework import generics, status, viewsets, permissions
 from rest_framework.decorators import api_view, action
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from . import counters, likes
+from .comment_tree import build_comment_tree
+from .country_store import get_country_store
 from .models import Category, Author, Blog, Comment
 from .serializers import (
     CategorySerializer, AuthorSerializer, 
@@ -25,10 +28,15 @@ class AuthorViewSet(viewsets.ModelViewSet):
 
 
 class BlogViewSet(viewsets.ModelViewSet):
-    queryset = Blog.objects.all().order_by('-published_at')
+    queryset = Blog.objects.for_detail().order_by('-published_at')
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     lookup_field = 'slug'
     
+    def get_queryset(self):
+        if self.action == 'list':
+            return Blog.objects.for_listing().order_by('-published_at')
+        return super().get_queryset()
+    
     def get_serializer_class(self):
         if self.action == 'list':
             return BlogListSerializer
@@ -38,7 +46,7 @@ class BlogViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def featured(self, request):
-        featured_blog = Blog.objects.filter(is_featured=True).first()
+        featured_blog = Blog.objects.for_detail().filter(is_featured=True).order_by('-published_at', '-id').first()
         if featured_blog:
             serializer = BlogDetailSerializer(featured_blog)
             return Response(serializer.data)
@@ -47,29 +55,29 @@ class BlogViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def increment_view(self, request, slug=None):
         blog = self.get_object()
-        blog.view_count += 1
-        blog.save()
+        counters.increment(Blog, blog.id, 'view_count')
         return Response({"status": "view count incremented"})
     
-    @action(detail=True, methods=['post'])
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def toggle_like(self, request, slug=None):
         blog = self.get_object()
-        # In a real app, you would check if the user has already liked the blog
-        # and toggle accordingly
-        increase = request.data.get('increase', True)
-        if increase:
-            blog.like_count += 1
-        else:
-            if blog.like_count > 0:
-                blog.like_count -= 1
-        blog.save()
-        return Response({"status": "like toggled", "like_count": blog.like_count})
+        liked = likes.toggle_like(request.user, blog)
+        return Response({"status": "like toggled", "liked": liked, "like_count": likes.like_count(blog)})
     
     @action(detail=True, methods=['get'])
     def related(self, request, slug=None):
         blog = self.get_object()
-        # Get blogs with the same category, excluding the current one
-        related_blogs = Blog.objects.filter(category=blog.category).exclude(id=blog.id)[:3]
+        # Precomputed neighbours first, topped up from the same category
+        related_blogs = list(
+            Blog.objects.for_listing()
+            .filter(related_by__blog=blog).order_by('related_by__rank')[:3]
+        )
+        if len(related_blogs) < 3:
+            related_blogs += Blog.objects.for_listing().filter(
+                category_id=blog.category_id
+            ).exclude(id=blog.id).exclude(
+                id__in=[related.id for related in related_blogs]
+            ).order_by('-published_at', '-id')[:3 - len(related_blogs)]
         serializer = BlogListSerializer(related_blogs, many=True)
         return Response(serializer.data)
 
@@ -83,64 +91,45 @@ class CommentViewSet(viewsets.ModelViewSet):
             return CommentCreateSerializer
         return CommentSerializer
     
-    @action(detail=True, methods=['post'])
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def toggle_like(self, request, pk=None):
         comment = self.get_object()
-        increase = request.data.get('increase', True)
-        if increase:
-            comment.like_count += 1
-        else:
-            if comment.like_count > 0:
-                comment.like_count -= 1
-        comment.save()
-        return Response({"status": "like toggled", "like_count": comment.like_count})
+        liked = likes.toggle_like(request.user, comment)
+        return Response({"status": "like toggled", "liked": liked, "like_count": likes.like_count(comment)})
 
 
 @api_view(['GET'])
 def get_blog_comments(request, blog_id):
     """Get all comments for a specific blog"""
-    comments = Comment.objects.filter(blog_id=blog_id, parent=None)
+    comments, _ = build_comment_tree(blog_id)
     serializer = CommentSerializer(comments, many=True)
     return Response(serializer.data)
 
 
 class CountryDataView(APIView):
-    """Proxy for the REST Countries API"""
+    """Countries from the local REST Countries snapshot"""
     def get(self, request, country_name=None):
-        import requests
-        
-        if country_name:
-            # Get data for a specific country
-            url = f'https://restcountries.com/v3.1/name/{country_name}?fullText=true'
-        else:
-            # Get data for all countries
-            url = 'https://restcountries.com/v3.1/all'
-            
         try:
-            response = requests.get(url)
-            if response.status_code == 200:
-                return Response(response.json())
-            return Response({"detail": "Country not found"}, status=status.HTTP_404_NOT_FOUND)
+            store = get_country_store()
         except Exception as e:
             return Response({"detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        if country_name:
+            # Get data for a specific country
+            countries = store.by_name(country_name)
+            if not countries:
+                return Response({"detail": "Country not found"}, status=status.HTTP_404_NOT_FOUND)
+            return Response(countries)
+        # Get data for all countries
+        return Response(store.all())
             
     
 class IndependentCountriesView(APIView):
     """Get all independent or non-independent countries"""
     def get(self, request):
-        import requests
-        
         is_independent = request.query_params.get('independent', 'true').lower() == 'true'
         
         try:
-            response = requests.get('https://restcountries.com/v3.1/all')
-            if response.status_code == 200:
-                all_countries = response.json()
-                filtered_countries = [
-                    country for country in all_countries 
-                    if country.get('independent') == is_independent
-                ]
-                return Response(filtered_countries)
-            return Response({"detail": "Failed to fetch countries"}, status=response.status_code)
+            return Response(get_country_store().by_independence(is_independent))
         except Exception as e:
             return Response({"detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -1,16 +1,19 @@
 # Import views from their respective modules
 from .blog_views import (
     BlogListView, 
+    BlogSearchView,
     BlogDetailView, 
     FeaturedBlogView, 
     RelatedBlogsView,
-    BlogLikeView
+    BlogLikeView,
+    BlogExportView
 )
 
 from .comment_views import (
     CommentListView,
     CommentCreateView,
-    CommentLikeView
+    CommentLikeView,
+    CommentExportView
 )
 
 from .category_views import (
@@ -18,25 +21,56 @@ from .category_views import (
     CategoryDetailView
 )
 
+from .tag_views import TagListView
+
+from .home_views import HomeView
+
 from .country_views import (
     CountryListView,
     CountryDetailView,
     CountryIndependentListView
 )
 
+from .async_country_views import (
+    AsyncCountryListView,
+    AsyncCountryDetailView,
+    AsyncCountryIndependentListView
+)
+
+from .profile_views import (
+    ProfileListView,
+    ProfileDetailView,
+    ProfileCollapsedView,
+    ProfileStatsView,
+    RouteCollapsedView
+)
+
 # Export all views
 __all__ = [
     'BlogListView', 
+    'BlogSearchView',
     'BlogDetailView', 
     'FeaturedBlogView',
     'RelatedBlogsView',
     'BlogLikeView',
+    'BlogExportView',
     'CommentListView',
     'CommentCreateView',
     'CommentLikeView',
+    'CommentExportView',
     'CategoryListView',
     'CategoryDetailView',
+    'TagListView',
+    'HomeView',
     'CountryListView',
     'CountryDetailView',
-    'CountryIndependentListView'
+    'CountryIndependentListView',
+    'AsyncCountryListView',
+    'AsyncCountryDetailView',
+    'AsyncCountryIndependentListView',
+    'ProfileListView',
+    'ProfileDetailView',
+    'ProfileCollapsedView',
+    'ProfileStatsView',
+    'RouteCollapsedView'
 ]
\ No newline at end of file
@@ -0,0 +1,67 @@
+import asyncio
+
+import requests
+from django.http import JsonResponse
+from django.views import View
+
+from ..country_store import country_store
+from ..singleflight import SingleFlight
+
+_flights = SingleFlight()
+
+
+async def aget_country_store():
+    """
+    Synced country store without blocking the event loop.
+
+    Loading a snapshot or fetching the upstream dataset happens on a worker
+    thread, and concurrent requests on the same loop share that one load.
+    """
+    return await _flights.do('country-store', lambda: asyncio.to_thread(country_store.sync))
+
+
+def error_response(e):
+    return JsonResponse({"error": str(e)}, status=500)
+
+
+class AsyncCountryListView(View):
+    """
+    Retrieve a list of all countries
+    """
+    async def get(self, request):
+        try:
+            store = await aget_country_store()
+        except requests.exceptions.RequestException as e:
+            return error_response(e)
+        return JsonResponse(store.all(fields=request.GET.get('fields')), safe=False)
+
+
+class AsyncCountryDetailView(View):
+    """
+    Retrieve details for a specific country by code
+    """
+    async def get(self, request, country_code):
+        try:
+            store = await aget_country_store()
+        except requests.exceptions.RequestException as e:
+            return error_response(e)
+        country = store.by_code(country_code, fields=request.GET.get('fields'))
+        if country is None:
+            return JsonResponse({"error": "Country not found"}, status=404)
+        return JsonResponse([country], safe=False)
+
+
+class AsyncCountryIndependentListView(View):
+    """
+    Retrieve a list of countries filtered by independence status
+    """
+    async def get(self, request, independent="true"):
+        try:
+            store = await aget_country_store()
+        except requests.exceptions.RequestException as e:
+            return error_response(e)
+        is_independent = independent.lower() == "true"
+        return JsonResponse(
+            store.by_independence(is_independent, fields=request.GET.get('fields')),
+            safe=False
+        )
@@ -1,16 +1,32 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from django.shortcuts import get_object_or_404
+from rest_framework.utils.urls import replace_query_param
 from django.db.models import F
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.text import slugify
 
-from ..models import Blog, Category
-from ..serializers import BlogListSerializer as BlogSerializer, CommentSerializer
+from .. import counters, export, likes
+from ..conditional import ConditionalGetMixin
+from ..fast_serializers import listing_rows, serialize_blogs
+from ..models import Blog, Category, Tag
+from ..pagination import BlogKeysetPagination
+from ..response_cache import CachedResponseMixin, blog_tags
+from ..search import search_blogs
+from ..serializers import BlogSearchResultSerializer
 
-class BlogListView(APIView):
+class BlogListView(CachedResponseMixin, ConditionalGetMixin, APIView):
     """
     List all blogs or create a new blog
     """
+    pagination_class = BlogKeysetPagination
+    cache_tags = ('blogs',)
+    per_user = True
+    
+    def get_cache_tags(self, data):
+        return blog_tags(data['results'])
+    
     def get(self, request):
         # Filter by category slug if provided
         category_slug = request.query_params.get('category', None)
@@ -19,60 +35,187 @@ class BlogListView(APIView):
             blogs = Blog.objects.filter(category=category)
         else:
             blogs = Blog.objects.all()
-            
-        serializer = BlogSerializer(blogs, many=True)
-        return Response(serializer.data)
+        
+        paginator = self.pagination_class()
+        
+        # Filter by tag (name or slug) through the tag index, paging on its
+        # copy of published_at so the tag's posts come in index order
+        tag_name = request.query_params.get('tag', None)
+        if tag_name:
+            tag = get_object_or_404(Tag, slug=slugify(tag_name))
+            # Aliases keep the cursor and ordering on the filter's own join
+            blogs = blogs.filter(tag_links__tag=tag).alias(
+                tag_published_at=F('tag_links__published_at'), tag_blog_id=F('tag_links__blog_id')
+            )
+            paginator.ordering_fields = ('tag_published_at', 'tag_blog_id')
+        
+        page = paginator.paginate_queryset(listing_rows(blogs), request, view=self)
+        liked = likes.liked_by(request.user, blogs=page)
+        # The links depend on rows outside the page, so they are part of the ETag
+        not_modified = self.not_modified(
+            request, page, paginator.has_next, paginator.has_previous, *likes.validators(liked)
+        )
+        if not_modified:
+            return not_modified
+        return paginator.get_paginated_response(serialize_blogs(page, liked))
+
+class BlogSearchView(ConditionalGetMixin, APIView):
+    """
+    Full-text search over blogs, best match first.
+    
+    Takes ``q`` plus optional ``page`` and ``page_size``. Each result has a
+    relevance ``score`` and an HTML ``snippet`` with matches in ``<mark>``.
+    """
+    page_size = 10
+    max_page_size = 50
+    
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        try:
+            page = max(1, int(request.query_params.get('page', 1)))
+            page_size = int(request.query_params.get('page_size', self.page_size))
+        except ValueError:
+            return Response(
+                {"detail": "page and page_size must be integers"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        page_size = max(1, min(page_size, self.max_page_size))
+        
+        blogs, has_more = search_blogs(query, limit=page_size, offset=(page - 1) * page_size)
+        liked = likes.liked_by(request.user, blogs=blogs)
+        # Scores move with the rest of the corpus, so they are part of the ETag
+        not_modified = self.not_modified(
+            request, blogs, has_more, *(blog.search_score for blog in blogs), *likes.validators(liked)
+        )
+        if not_modified:
+            return not_modified
+        url = request.build_absolute_uri()
+        return Response({
+            "next": replace_query_param(url, 'page', page + 1) if has_more else None,
+            "previous": replace_query_param(url, 'page', page - 1) if page > 1 else None,
+            "results": BlogSearchResultSerializer(blogs, many=True, context=liked).data,
+        })
 
-class BlogDetailView(APIView):
+class BlogDetailView(CachedResponseMixin, ConditionalGetMixin, APIView):
     """
     Retrieve, update or delete a blog
     """
+    per_user = True
+    
+    def get_cache_tags(self, data):
+        return blog_tags([data])
+    
+    def get_cache_meta(self, data):
+        return {'blog_id': data['id']}
+    
+    def cache_hit(self, request, meta, slug):
+        # A page served from the cache still counts as a view
+        counters.increment(Blog, meta['blog_id'], 'view_count')
+    
     def get(self, request, slug):
-        blog = get_object_or_404(Blog, slug=slug)
-        # Increment view count
-        Blog.objects.filter(id=blog.id).update(view_count=F('view_count') + 1)
-        serializer = BlogSerializer(blog)
-        return Response(serializer.data)
+        blog = get_object_or_404(listing_rows(Blog.objects.all()), slug=slug)
+        # Increment view count (buffered, see blog.counters)
+        counters.increment(Blog, blog.id, 'view_count')
+        liked = likes.liked_by(request.user, blogs=[blog])
+        not_modified = self.not_modified(request, [blog], *likes.validators(liked))
+        if not_modified:
+            return not_modified
+        return Response(serialize_blogs([blog], liked)[0])
 
-class FeaturedBlogView(APIView):
+class FeaturedBlogView(CachedResponseMixin, ConditionalGetMixin, APIView):
     """
     Retrieve the featured blog
     """
+    cache_tags = ('blogs',)
+    per_user = True
+    
+    def get_cache_tags(self, data):
+        return blog_tags([data])
+    
     def get(self, request):
         try:
-            blog = Blog.objects.filter(is_featured=True).first()
+            blog = listing_rows(Blog.objects.filter(is_featured=True)).order_by('-published_at', '-id').first()
             if blog:
-                serializer = BlogSerializer(blog)
-                return Response(serializer.data)
+                liked = likes.liked_by(request.user, blogs=[blog])
+                not_modified = self.not_modified(request, [blog], *likes.validators(liked))
+                if not_modified:
+                    return not_modified
+                return Response(serialize_blogs([blog], liked)[0])
             return Response({"detail": "No featured blog found"}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class RelatedBlogsView(APIView):
+class RelatedBlogsView(CachedResponseMixin, ConditionalGetMixin, APIView):
     """
     Retrieve related blogs for a specific blog
     """
+    # Any blog write can reorder the precomputed neighbours
+    cache_tags = ('blogs',)
+    per_user = True
+    
+    def get_cache_tags(self, data):
+        return blog_tags(data)
+    
     def get(self, request, slug):
-        blog = get_object_or_404(Blog, slug=slug)
-        # Get related blogs (same category, excluding current blog)
-        related_blogs = Blog.objects.filter(category=blog.category).exclude(id=blog.id)[:3]
-        serializer = BlogSerializer(related_blogs, many=True)
-        return Response(serializer.data)
+        # Precomputed neighbours, best first, in one indexed lookup
+        related_blogs = list(
+            listing_rows(Blog.objects.filter(related_by__blog__slug=slug)).order_by('related_by__rank')[:3]
+        )
+        if len(related_blogs) < 3:
+            # Not scored yet or too few similar posts: top up from the category
+            blog = get_object_or_404(Blog, slug=slug)
+            related_blogs += listing_rows(Blog.objects.filter(
+                category_id=blog.category_id
+            ).exclude(id=blog.id).exclude(
+                id__in=[related.id for related in related_blogs]
+            )).order_by('-published_at', '-id')[:3 - len(related_blogs)]
+        liked = likes.liked_by(request.user, blogs=related_blogs)
+        not_modified = self.not_modified(request, related_blogs, *likes.validators(liked))
+        if not_modified:
+            return not_modified
+        return Response(serialize_blogs(related_blogs, liked))
 
 class BlogLikeView(APIView):
     """
-    Like or unlike a blog
+    Like (POST) or unlike (DELETE) a blog as the current user.
+    
+    Both are idempotent: repeating one leaves the like count alone.
     """
     permission_classes = [permissions.IsAuthenticated]
     
     def post(self, request, slug):
-        blog = get_object_or_404(Blog, slug=slug)
-        # Toggle like (in a real app, you'd track which users liked which blogs)
-        Blog.objects.filter(id=blog.id).update(like_count=F('like_count') + 1)
-        return Response({"status": "liked"})
+        return self.set_liked(request, slug, True)
         
     def delete(self, request, slug):
-        blog = get_object_or_404(Blog, slug=slug)
-        # Decrement like count (don't go below 0)
-        Blog.objects.filter(id=blog.id).update(like_count=F('like_count') - 1)
-        return Response({"status": "unliked"})
\ No newline at end of file
+        return self.set_liked(request, slug, False)
+    
+    def set_liked(self, request, slug, liked):
+        blog = get_object_or_404(Blog.objects.only('id'), slug=slug)
+        likes.set_liked(request.user, blog, liked)
+        return Response({
+            "status": "liked" if liked else "unliked",
+            "liked": liked,
+            "like_count": likes.like_count(blog),
+        })
+
+class BlogExportView(APIView):
+    """
+    Stream every blog as NDJSON, in id order (see blog.export).
+    
+    Takes ``after`` (resume after this id) and ``updated_since`` (only
+    blogs changed since this ISO 8601 time).
+    """
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request):
+        try:
+            after, updated_since = export.parse_cursor(request.query_params)
+        except ValueError:
+            return Response(
+                {"detail": "after must be a non-negative integer and updated_since an ISO 8601 time"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        blogs = Blog.objects.all()
+        if updated_since:
+            blogs = blogs.filter(updated_at__gte=updated_since)
+        return StreamingHttpResponse(export.export_blogs(blogs, after), content_type=export.CONTENT_TYPE)
@@ -3,22 +3,34 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
 
+from .. import likes
+from ..conditional import ConditionalGetMixin
+from ..fast_serializers import listing_rows, serialize_blogs
 from ..models import Category
-from ..serializers import CategorySerializer, BlogListSerializer as BlogSerializer
+from ..pagination import BlogKeysetPagination
+from ..response_cache import CachedResponseMixin
+from ..serializers import CategorySerializer
 
-class CategoryListView(APIView):
+class CategoryListView(CachedResponseMixin, ConditionalGetMixin, APIView):
     """
     List all categories
     """
+    cache_tags = ('categories',)
+    
     def get(self, request):
-        categories = Category.objects.all()
+        categories = list(Category.objects.all())
+        not_modified = self.not_modified(request, categories)
+        if not_modified:
+            return not_modified
         serializer = CategorySerializer(categories, many=True)
         return Response(serializer.data)
 
-class CategoryDetailView(APIView):
+class CategoryDetailView(ConditionalGetMixin, APIView):
     """
     Retrieve a category and its blogs
     """
+    pagination_class = BlogKeysetPagination
+    
     def get(self, request, slug):
         category = get_object_or_404(Category, slug=slug)
         
@@ -26,13 +38,25 @@ class CategoryDetailView(APIView):
         include_blogs = request.query_params.get('include_blogs', 'false').lower() == 'true'
         
         if include_blogs:
-            # Return category with blogs
+            # Return category with one page of its blogs
+            paginator = self.pagination_class()
+            blogs = paginator.paginate_queryset(listing_rows(category.blogs.all()), request, view=self)
+            liked = likes.liked_by(request.user, blogs=blogs)
+            # The links depend on rows outside the page, so they are part of the ETag
+            not_modified = self.not_modified(
+                request, [category, *blogs], paginator.has_next, paginator.has_previous,
+                *likes.validators(liked)
+            )
+            if not_modified:
+                return not_modified
             category_data = CategorySerializer(category).data
-            blogs = category.blogs.all()
-            blog_serializer = BlogSerializer(blogs, many=True)
-            category_data['blogs'] = blog_serializer.data
+            category_data['blogs'] = serialize_blogs(blogs, liked)
+            category_data.update(paginator.get_links())
             return Response(category_data)
         else:
             # Return just the category
+            not_modified = self.not_modified(request, [category])
+            if not_modified:
+                return not_modified
             serializer = CategorySerializer(category)
             return Response(serializer.data)
\ No newline at end of file
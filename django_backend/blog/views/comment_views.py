@@ -1,22 +1,65 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from django.db.models import F
 
+from .. import export, likes
+from ..comment_tree import build_comment_tree
+from ..conditional import ConditionalGetMixin
 from ..models import Blog, Comment
 from ..serializers import CommentSerializer
 
-class CommentListView(APIView):
+class CommentListView(ConditionalGetMixin, APIView):
     """
-    List all comments for a blog
+    List all comments for a blog as a thread.
+    
+    Optional ``depth`` and ``replies`` query parameters narrow the reply depth
+    and replies per comment below the configured limits.
     """
     def get(self, request, slug):
-        blog = get_object_or_404(Blog, slug=slug)
-        # Get parent comments (no parent)
-        comments = Comment.objects.filter(blog=blog, parent=None)
-        serializer = CommentSerializer(comments, many=True)
-        return Response(serializer.data)
+        blog = get_object_or_404(Blog.objects.only('id'), slug=slug)
+        try:
+            comments, has_more = build_comment_tree(
+                blog.id,
+                max_depth=request.query_params.get('depth'),
+                max_replies=request.query_params.get('replies'),
+            )
+        except ValueError:
+            return Response(
+                {"detail": "depth and replies must be integers"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        liked = likes.liked_by(request.user, comments=comments)
+        not_modified = self.not_modified(request, comments, has_more, *likes.validators(liked))
+        if not_modified:
+            return not_modified
+        serializer = CommentSerializer(comments, many=True, context=liked)
+        response = Response(serializer.data)
+        # Top-level comments left out by the limits
+        response['X-Has-More-Comments'] = 'true' if has_more else 'false'
+        return response
+
+class CommentExportView(APIView):
+    """
+    Stream every comment of a blog as NDJSON, replies included, in id order
+    (see blog.export). Takes ``after`` and ``updated_since`` like the blog export.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request, slug):
+        blog = get_object_or_404(Blog.objects.only('id'), slug=slug)
+        try:
+            after, updated_since = export.parse_cursor(request.query_params)
+        except ValueError:
+            return Response(
+                {"detail": "after must be a non-negative integer and updated_since an ISO 8601 time"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        comments = Comment.objects.filter(blog_id=blog.id)
+        if updated_since:
+            comments = comments.filter(updated_at__gte=updated_since)
+        return StreamingHttpResponse(export.export_comments(comments, after), content_type=export.CONTENT_TYPE)
 
 class CommentCreateView(APIView):
     """
@@ -38,28 +81,32 @@ class CommentCreateView(APIView):
         
         serializer = CommentSerializer(data=data)
         if serializer.is_valid():
-            serializer.save()
-            
-            # Update comment count on the blog
-            Blog.objects.filter(id=blog.id).update(comment_count=F('comment_count') + 1)
+            # Blog.comment_count follows through the counter cache signals;
+            # the serializer leaves the blog out of its fields
+            serializer.save(blog=blog)
             
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class CommentLikeView(APIView):
     """
-    Like or unlike a comment
+    Like (POST) or unlike (DELETE) a comment as the current user.
+    
+    Both are idempotent: repeating one leaves the like count alone.
     """
     permission_classes = [permissions.IsAuthenticated]
     
     def post(self, request, comment_id):
-        comment = get_object_or_404(Comment, id=comment_id)
-        # Toggle like (in a real app, you'd track which users liked which comments)
-        Comment.objects.filter(id=comment.id).update(like_count=F('like_count') + 1)
-        return Response({"status": "liked"})
+        return self.set_liked(request, comment_id, True)
         
     def delete(self, request, comment_id):
-        comment = get_object_or_404(Comment, id=comment_id)
-        # Decrement like count (don't go below 0)
-        Comment.objects.filter(id=comment.id).update(like_count=F('like_count') - 1)
-        return Response({"status": "unliked"})
\ No newline at end of file
+        return self.set_liked(request, comment_id, False)
+    
+    def set_liked(self, request, comment_id, liked):
+        comment = get_object_or_404(Comment.objects.only('id'), id=comment_id)
+        likes.set_liked(request.user, comment, liked)
+        return Response({
+            "status": "liked" if liked else "unliked",
+            "liked": liked,
+            "like_count": likes.like_count(comment),
+        })
\ No newline at end of file
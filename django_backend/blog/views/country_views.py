@@ -2,9 +2,8 @@ import requests
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.conf import settings
 
-COUNTRIES_API_BASE = "https://restcountries.com/v3.1"
+from ..country_store import get_country_store
 
 class CountryListView(APIView):
     """
@@ -14,14 +13,9 @@ class CountryListView(APIView):
         # Get optional fields parameter
         fields = request.query_params.get('fields', None)
         
-        url = f"{COUNTRIES_API_BASE}/all"
-        if fields:
-            url += f"?fields={fields}"
-            
         try:
-            response = requests.get(url)
-            response.raise_for_status()
-            return Response(response.json())
+            data = get_country_store().all(fields=fields)
+            return Response(data)
         except requests.exceptions.RequestException as e:
             return Response(
                 {"error": str(e)},
@@ -36,14 +30,12 @@ class CountryDetailView(APIView):
         # Get optional fields parameter
         fields = request.query_params.get('fields', None)
         
-        url = f"{COUNTRIES_API_BASE}/alpha/{country_code}"
-        if fields:
-            url += f"?fields={fields}"
-            
         try:
-            response = requests.get(url)
-            response.raise_for_status()
-            return Response(response.json())
+            country = get_country_store().by_code(country_code, fields=fields)
+            if country is None:
+                return Response({"error": "Country not found"}, status=status.HTTP_404_NOT_FOUND)
+            # Same shape as the upstream /alpha endpoint
+            return Response([country])
         except requests.exceptions.RequestException as e:
             return Response(
                 {"error": str(e)},
@@ -61,14 +53,9 @@ class CountryIndependentListView(APIView):
         # Get optional fields parameter
         fields = request.query_params.get('fields', None)
         
-        url = f"{COUNTRIES_API_BASE}/independent?status={str(is_independent).lower()}"
-        if fields:
-            url += f"&fields={fields}"
-            
         try:
-            response = requests.get(url)
-            response.raise_for_status()
-            return Response(response.json())
+            data = get_country_store().by_independence(is_independent, fields=fields)
+            return Response(data)
         except requests.exceptions.RequestException as e:
             return Response(
                 {"error": str(e)},
@@ -0,0 +1,27 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from django.utils.cache import get_conditional_response
+
+from .. import home, likes
+from ..conditional import ConditionalGetMixin, extend_etag
+
+class HomeView(ConditionalGetMixin, APIView):
+    """
+    Everything the home page shows in one response: the featured post, the
+    latest and trending posts and the categories, from the precomputed
+    snapshot in ``blog.home``
+    """
+    def get(self, request):
+        snapshot = home.get_snapshot()
+        data = snapshot['data']
+        liked = likes.liked_ids(request.user, blog_ids=home.blog_ids(data))
+        self.validators = (
+            extend_etag(snapshot['etag'], likes.validators(liked)), snapshot['last_modified']
+        )
+        etag, last_modified = self.validators
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified:
+            return not_modified
+        if liked['liked_blogs']:
+            data = home.mark_liked(data, liked['liked_blogs'])
+        return Response(data)
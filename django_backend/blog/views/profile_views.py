@@ -0,0 +1,78 @@
+from django.http import FileResponse, Http404, HttpResponse
+from rest_framework import permissions
+from rest_framework.views import APIView
+from rest_framework.response import Response
+
+from .. import profiling
+
+def collapsed_response(stacks, filename):
+    response = HttpResponse(profiling.collapsed_text(stacks), content_type='text/plain; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+class ProfileListView(APIView):
+    """
+    List stored profiles, newest first; ?route= keeps one route pattern
+    """
+    permission_classes = [permissions.IsAdminUser]
+    default_limit = 50
+    max_limit = 500
+    
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            limit = self.default_limit
+        limit = max(1, min(limit, self.max_limit))
+        
+        profiles = profiling.stored(request.query_params.get('route'))
+        return Response([profiling.summary(profile) for profile, _ in zip(profiles, range(limit))])
+
+class ProfileDetailView(APIView):
+    """
+    Retrieve a stored profile with its sampled stacks
+    """
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request, profile_id):
+        profile = profiling.load(profile_id)
+        if profile is None:
+            raise Http404("No such profile")
+        return Response(profile)
+
+class ProfileCollapsedView(APIView):
+    """
+    Download a profile's sampled stacks in the collapsed format
+    """
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request, profile_id):
+        profile = profiling.load(profile_id)
+        if profile is None:
+            raise Http404("No such profile")
+        return collapsed_response(profile['stacks'], f"{profile_id}.collapsed")
+
+class ProfileStatsView(APIView):
+    """
+    Download a cProfile profile's stats for pstats or snakeviz
+    """
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request, profile_id):
+        path = profiling.pstats_path(profile_id)
+        if path is None:
+            raise Http404("No cProfile stats for this profile")
+        return FileResponse(path.open('rb'), as_attachment=True, filename=path.name)
+
+class RouteCollapsedView(APIView):
+    """
+    Download the sampled stacks of every stored profile of a route
+    (?route=, all routes without it) summed in the collapsed format
+    """
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request):
+        profiles = list(profiling.stored(request.query_params.get('route')))
+        response = collapsed_response(profiling.aggregate(profiles), 'aggregate.collapsed')
+        response['X-Profile-Count'] = len(profiles)
+        return response
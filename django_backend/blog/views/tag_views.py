@@ -0,0 +1,23 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+
+from ..models import Tag
+from ..serializers import TagSerializer
+
+class TagListView(APIView):
+    """
+    List tags in use, most used first
+    """
+    default_limit = 100
+    max_limit = 1000
+    
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            limit = self.default_limit
+        limit = max(1, min(limit, self.max_limit))
+        
+        tags = Tag.objects.filter(blog_count__gt=0).order_by('-blog_count', 'name')[:limit]
+        serializer = TagSerializer(tags, many=True)
+        return Response(serializer.data)
@@ -12,5 +12,12 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog_project.settings')
+# Serve the country endpoints with the non-blocking views
+os.environ.setdefault('DJANGO_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
+
+# Write buffered view and like counts on idle workers too
+from blog.counters import counter_buffer  # noqa: E402
+
+counter_buffer.flush_in_background()
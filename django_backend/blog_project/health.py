@@ -0,0 +1,18 @@
+"""
+Readiness probe for process managers and the dev proxy.
+
+``GET /api/_ready/`` answers 200 once a worker is serving requests and can
+reach the database, and 503 while the database is unavailable. It never
+touches the caches or the session, so it is cheap to poll.
+"""
+from django.db import DatabaseError, connection
+from django.http import JsonResponse
+
+
+def ready(request):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except DatabaseError:
+        return JsonResponse({'status': 'unavailable'}, status=503)
+    return JsonResponse({'status': 'ready'})
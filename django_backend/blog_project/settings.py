@@ -49,12 +49,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'blog.middleware.RequestMetricsMiddleware',  # First, so its timings cover the rest
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # CORS middleware (before CommonMiddleware)
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'blog.middleware.ProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -89,10 +91,58 @@ WSGI_APPLICATION = 'blog_project.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('DJANGO_DB_PATH', BASE_DIR / 'db.sqlite3'),
     }
 }
 
+# Production SQLite profile (DJANGO_DB_PROFILE=production): WAL so readers
+# keep going while a writer commits, a busy timeout instead of instant
+# "database is locked" errors, write transactions that take the lock up
+# front, larger page cache and memory-mapped reads, and connections kept
+# open across requests.
+DATABASE_PROFILE = os.environ.get('DJANGO_DB_PROFILE', 'development')
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # durable at checkpoints; safe with WAL
+    'busy_timeout': 5000,  # milliseconds
+    'cache_size': -64 * 1024,  # negative: KiB, so 64 MiB per connection
+    'mmap_size': 256 * 1024 * 1024,  # bytes
+    'temp_store': 'MEMORY',
+}
+# Connections to the replica only read; journal_mode is the primary's
+SQLITE_REPLICA_PRAGMAS = {
+    **{name: value for name, value in SQLITE_PRAGMAS.items() if name != 'journal_mode'},
+    'query_only': 1,
+}
+SQLITE_CONN_MAX_AGE = 600  # seconds
+
+if DATABASE_PROFILE == 'production':
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': SQLITE_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(f"PRAGMA {name}={value}" for name, value in SQLITE_PRAGMAS.items()),
+            'transaction_mode': 'IMMEDIATE',
+        },
+    })
+
+# Optional read replica: a copy of the primary file (kept current outside
+# Django) that serves the reads of REPLICA_READ_APPS, see blog.routers
+DATABASE_REPLICA_PATH = os.environ.get('DJANGO_DB_REPLICA_PATH')
+DATABASE_REPLICA_ALIAS = 'replica'
+REPLICA_READ_APPS = {'blog'}
+if DATABASE_REPLICA_PATH:
+    DATABASES[DATABASE_REPLICA_ALIAS] = {
+        **DATABASES['default'],
+        'NAME': DATABASE_REPLICA_PATH,
+        'OPTIONS': {
+            'init_command': ';'.join(f"PRAGMA {name}={value}" for name, value in SQLITE_REPLICA_PRAGMAS.items()),
+        },
+        # Tests read what they wrote through the primary
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['blog.routers.ReadReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -149,6 +199,10 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # REST Framework settings
 REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'blog.renderers.FastJSONRenderer',  # orjson; same output as JSONRenderer
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
@@ -160,5 +214,103 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10
 }
 
+# Comment threads: limits for the reply tree returned with a blog's comments
+COMMENT_TREE_MAX_DEPTH = 5
+COMMENT_TREE_MAX_REPLIES = 50
+COMMENT_TREE_MAX_NODES = 500
+
+# View/like counters: buffer increments in memory and write them in batches.
+# Set COUNTER_WRITE_BEHIND = False to update the database on every hit.
+COUNTER_WRITE_BEHIND = True
+COUNTER_FLUSH_INTERVAL = 5  # seconds
+COUNTER_FLUSH_THRESHOLD = 500  # distinct counters pending
+
+# Caches. The local-memory cache is per process. Several workers (gunicorn,
+# which sets DJANGO_SHARED_CACHE_DIR) share a file-based cache in that
+# directory instead, so invalidations and render locks reach all of them.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+SHARED_CACHE_DIR = os.environ.get('DJANGO_SHARED_CACHE_DIR')
+if SHARED_CACHE_DIR:
+    CACHES['shared'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': SHARED_CACHE_DIR,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+
+# Rendered responses of the public read endpoints (blog.response_cache),
+# also home to the home page snapshot (blog.home)
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_ALIAS = 'shared' if SHARED_CACHE_DIR else 'default'
+RESPONSE_CACHE_TTL = 60  # seconds; bounds staleness of buffered view/like counts
+RESPONSE_CACHE_LOCK_TIMEOUT = 5  # seconds other requests wait for one render
+
+# Related posts (blog.related): neighbours stored per blog, the share of the
+# score given to tag overlap, and how long a worker reuses its similarity index
+RELATED_BLOGS_TOP_K = 10
+RELATED_BLOGS_TAG_WEIGHT = 0.3
+RELATED_BLOGS_INDEX_TTL = 10 * 60  # seconds
+
+# Home page bundle (blog.home): posts per section, the window trending posts
+# are picked from, and how long a snapshot lives without a write refreshing it
+HOME_LATEST_COUNT = 6
+HOME_TRENDING_COUNT = 5
+HOME_TRENDING_DAYS = 14
+HOME_SNAPSHOT_TTL = 5 * 60  # seconds; bounds staleness of buffered view/like counts
+
+# Outbound HTTP clients (blog.outbound), per upstream name. Times in seconds;
+# "deadline" bounds a whole call including retries.
+OUTBOUND_HTTP = {
+    'default': {
+        'deadline': 5.0,
+        'connect_timeout': 2.0,
+        'max_retries': 2,
+        'backoff': 0.1,
+        'pool_size': 10,
+        'failure_threshold': 5,
+        'reset_timeout': 30.0,
+    },
+    'countries': {
+        'deadline': 5.0,
+    },
+}
+
+# REST Countries proxy: upstream and response cache
+COUNTRIES_API_BASE = "https://restcountries.com/v3.1"
+COUNTRIES_CACHE_TTL = 60 * 60  # serve without revalidating for an hour
+COUNTRIES_CACHE_STALE_TTL = 24 * 60 * 60  # then serve stale while refreshing
+COUNTRIES_CACHE_STALE_IF_ERROR = 7 * 24 * 60 * 60  # stale fallback when upstream fails
+COUNTRIES_CACHE_MAX_ENTRIES = 256
+# Local dataset written by `manage.py refresh_countries`; the country views
+# answer from it and only fall back to the upstream when it is missing
+COUNTRIES_SNAPSHOT_PATH = BASE_DIR / 'data' / 'countries.json'
+# Route /api/countries/ to the async views; asgi.py turns this on
+COUNTRIES_ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS') == '1'
+
+# Request instrumentation (blog.metrics): a Server-Timing header with db,
+# serializer, render and outbound time on every response, and per-route
+# latency histograms served at /api/_metrics for Prometheus. Recording the
+# histograms is off unless DJANGO_METRICS=1.
+SERVER_TIMING_ENABLED = True
+METRICS_ENABLED = os.environ.get('DJANGO_METRICS') == '1'
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+
+# On-demand profiles (blog.profiling): staff send "X-Profile: sample" (or
+# cprofile) or ?_profile=1, and every PROFILE_SAMPLE_EVERY-th request is
+# sampled too (0 = never). Stored in PROFILE_DIR, newest PROFILE_MAX_STORED
+# kept, served at /api/_profiles/.
+PROFILING_ENABLED = True
+PROFILE_SAMPLE_EVERY = int(os.environ.get('DJANGO_PROFILE_SAMPLE_EVERY', 0))
+PROFILE_SAMPLE_INTERVAL = 0.002  # seconds between stack samples
+PROFILE_DIR = Path(os.environ.get('DJANGO_PROFILE_DIR', BASE_DIR / 'profiles'))
+PROFILE_MAX_STORED = 200
+
+# NDJSON exports (blog.export): rows read per keyset query while streaming
+EXPORT_CHUNK_SIZE = 1000
+
 # Custom user model
 AUTH_USER_MODEL = 'accounts.User'
@@ -0,0 +1,57 @@
+"""
+Process startup helpers shared by ``run_django.py`` and ``gunicorn.conf.py``.
+
+``migrate_if_needed`` compares the migration graph on disk with the
+``django_migrations`` table and runs ``migrate`` only when something is
+unapplied, so a boot on a current schema costs one query instead of a full
+``migrate`` (system checks, a transaction per app, post-migrate signals).
+"""
+import os
+import time
+
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+# When this process (or the launcher that exec'd it) started, for boot timings
+BOOT_STARTED_ENV = 'DJANGO_BOOT_STARTED'
+
+
+def boot_started():
+    """Wall clock time the boot started, as set by the launcher, else now"""
+    return float(os.environ.setdefault(BOOT_STARTED_ENV, str(time.time())))
+
+
+def pending_migrations(database=DEFAULT_DB_ALIAS):
+    """``(app_label, name)`` of every migration not yet applied to ``database``"""
+    connection = connections[database]
+    executor = MigrationExecutor(connection)
+    targets = executor.loader.graph.leaf_nodes()
+    return [(migration.app_label, migration.name) for migration, _ in executor.migration_plan(targets)]
+
+
+def migrate_if_needed(database=DEFAULT_DB_ALIAS, stdout=None):
+    """Apply pending migrations, if any; returns the ones that were pending"""
+    pending = pending_migrations(database)
+    if pending:
+        call_command('migrate', database=database, interactive=False, stdout=stdout, verbosity=1)
+    return pending
+
+
+def process_memory(pid='self'):
+    """
+    ``{'rss', 'private', 'shared'}`` of a process in KiB, from
+    ``/proc/<pid>/smaps_rollup``; pages still shared with the parent after a
+    fork count as shared. Empty where /proc is not available.
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as rollup:
+            for line in rollup:
+                name, _, value = line.partition(':')
+                if value.strip().endswith('kB'):
+                    fields[name] = int(value.split()[0])
+    except OSError:
+        return {}
+    private = fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    return {'rss': fields.get('Rss', 0), 'private': private, 'shared': fields.get('Rss', 0) - private}
@@ -4,6 +4,10 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import TemplateView
 
+from blog.metrics import metrics_view
+
+from .health import ready
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     # API endpoints
@@ -12,6 +16,11 @@ urlpatterns = [
         path('auth/', include('accounts.urls')),  # Authentication API endpoints
         path('countries/', include('blog.country_urls')),
         path('categories/', include('blog.category_urls')),
+        path('tags/', include('blog.tag_urls')),
+        path('home/', include('blog.home_urls')),  # Home page bundle
+        path('_ready/', ready, name='ready'),  # Readiness probe
+        path('_metrics', metrics_view, name='metrics'),  # Prometheus scrape target
+        path('_profiles/', include('blog.profile_urls')),  # Stored request profiles (staff)
     ])),
     # Serve the React frontend
     path('', TemplateView.as_view(template_name='index.html')),
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog_project.settings')
 
 application = get_wsgi_application()
+
+# Write buffered view and like counts on idle workers too
+from blog.counters import counter_buffer  # noqa: E402
+
+counter_buffer.flush_in_background()
@@ -0,0 +1,105 @@
+"""
+Gunicorn settings for the production server (``run_django.py --production``,
+or ``gunicorn blog_project.wsgi`` from this directory).
+
+The master imports Django and the whole app once (``preload_app``), then
+forks the workers. Collection is paused only while the app loads: before
+each fork everything loaded is moved to the permanent generation with
+``gc.freeze()`` and collection resumes, so neither the master nor the
+workers ever write to those objects' headers and the workers keep sharing
+their pages copy-on-write, while both still collect what they make later.
+Each worker logs its boot time and memory, and the first one ready touches
+``DJANGO_READY_FILE``.
+
+Environment:
+
+- ``DJANGO_BIND``: address to listen on (default ``0.0.0.0:8000``)
+- ``WEB_CONCURRENCY``: worker processes (default 2 per CPU + 1, at most 8)
+- ``GUNICORN_THREADS``: threads per worker (default 1, a sync worker)
+- ``DJANGO_READY_FILE``: file created once a worker serves requests
+- ``DJANGO_SHARED_CACHE_DIR``: the response cache the workers share
+  (default ``cache/`` here), emptied when the master starts
+"""
+import gc
+import os
+import time
+
+# Read by the settings, which the master loads after this file
+os.environ.setdefault(
+    'DJANGO_SHARED_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache')
+)
+
+bind = os.environ.get('DJANGO_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', min(2 * (os.cpu_count() or 1) + 1, 8)))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+wsgi_app = 'blog_project.wsgi:application'
+preload_app = True
+# Workers are recycled now and then to bound slow leaks; the jitter keeps
+# them from restarting together
+max_requests = 10000
+max_requests_jitter = 1000
+timeout = 30
+graceful_timeout = 30
+accesslog = '-'
+
+# Paused while the app is preloaded, which happens before any hook runs;
+# see pre_fork
+gc.disable()
+
+
+def when_ready(server):
+    # The master is about to fork the first workers. No connection may cross
+    # the fork: a SQLite handle shared by two processes corrupts its locks
+    from django.db import connections
+
+    connections.close_all()
+    # Import every view, serializer and URL pattern now rather than in each
+    # worker's first request, so they are shared too
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
+    # Entries a previous run rendered may come from other code
+    from blog.response_cache import get_cache
+
+    get_cache().clear()
+
+    from blog_project.startup import boot_started, process_memory
+
+    memory = process_memory()
+    server.log.info(
+        "App preloaded in %.2fs, master RSS %s KiB", time.time() - boot_started(), memory.get('rss', '?')
+    )
+
+
+def pre_fork(server, worker):
+    # Runs in the master before every fork, including replacement workers,
+    # so whatever it has made since the last one is shared as well
+    gc.freeze()
+    gc.enable()
+
+
+def post_worker_init(worker):
+    from blog_project.startup import boot_started, process_memory
+
+    memory = process_memory()
+    worker.log.info(
+        "Worker %s ready %.2fs after boot: RSS %s KiB, private %s KiB, shared %s KiB",
+        worker.pid, time.time() - boot_started(),
+        memory.get('rss', '?'), memory.get('private', '?'), memory.get('shared', '?'),
+    )
+    ready_file = os.environ.get('DJANGO_READY_FILE')
+    if ready_file:
+        with open(ready_file, 'a'):
+            pass
+
+
+def worker_exit(server, worker):
+    from blog.counters import counter_buffer
+
+    counter_buffer.flush()
+
+
+def on_exit(server):
+    ready_file = os.environ.get('DJANGO_READY_FILE')
+    if ready_file and os.path.exists(ready_file):
+        os.remove(ready_file)
@@ -9,17 +9,33 @@ const app = express();
 const PORT = process.env.PORT || 3000;
 const DJANGO_URL = 'http://localhost:8000';
 const VITE_DEV_SERVER = 'http://localhost:5000';
+const DJANGO_READY_URL = `${DJANGO_URL}/api/_ready/`;
+const DJANGO_READY_TIMEOUT = 60000; // ms
 
 // Start Django server
 console.log('Starting Django server...');
-const djangoProcess = spawn('python', ['run_django.py'], {
+const djangoArgs = process.env.NODE_ENV === 'production' ? ['run_django.py', '--production'] : ['run_django.py'];
+const djangoProcess = spawn('python', djangoArgs, {
   detached: true,
   stdio: 'inherit'
 });
 
-// Wait for Django server to start
-setTimeout(() => {
-  console.log('Django server should be running now');
+// Poll Django's readiness probe until it answers, instead of guessing its boot time
+function waitForDjango(started = Date.now()) {
+  return fetch(DJANGO_READY_URL)
+    .then((response) => {
+      if (!response.ok) throw new Error(`readiness probe returned ${response.status}`);
+    })
+    .catch((error) => {
+      if (Date.now() - started > DJANGO_READY_TIMEOUT) {
+        throw new Error(`Django not ready after ${DJANGO_READY_TIMEOUT / 1000}s: ${error.message}`);
+      }
+      return new Promise((resolve) => setTimeout(resolve, 250)).then(() => waitForDjango(started));
+    });
+}
+
+waitForDjango().then(() => {
+  console.log('Django server is ready');
 
   // Proxy API requests to Django
   app.use('/api', createProxyMiddleware({
@@ -62,4 +78,10 @@ setTimeout(() => {
     process.exit(0);
   });
 
-}, 5000); // Give Django 5 seconds to start up
\ No newline at end of file
+}).catch((error) => {
+  console.error(error.message);
+  if (djangoProcess && !djangoProcess.killed) {
+    process.kill(-djangoProcess.pid);
+  }
+  process.exit(1);
+});
\ No newline at end of file
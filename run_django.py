@@ -1,12 +1,29 @@
 #!/usr/bin/env python
+"""
+Start the Django backend.
+
+    python run_django.py               # development server (runserver)
+    python run_django.py --production  # pre-forked gunicorn workers, see gunicorn.conf.py
+
+Both apply migrations only when some are pending and seed the sample data
+only on a database that was just migrated, so a restart on a current
+schema costs one query. Readiness is served at /api/_ready/.
+"""
+import gc
 import os
 import sys
 import signal
-import django
 import time
 
+# Boot timings in the server logs count from here
+os.environ.setdefault('DJANGO_BOOT_STARTED', str(time.time()))
+
+import django
+
 # Add the django_backend directory to the Python path
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# setup() changes directory, after which runserver's autoreloader must still find this script
+sys.argv[0] = os.path.abspath(sys.argv[0])
 sys.path.append(os.path.join(BASE_DIR, 'django_backend'))
 
 def signal_handler(sig, frame):
@@ -102,19 +119,41 @@ def seed_data():
         return False
 
 def apply_migrations():
-    """Apply database migrations"""
+    """Apply pending database migrations; returns whether any were pending, or None on error"""
     try:
-        from django.core.management import execute_from_command_line
-        print("Applying migrations...")
-        execute_from_command_line(['manage.py', 'migrate'])
-        return True
+        from blog_project.startup import migrate_if_needed
+        started = time.perf_counter()
+        pending = migrate_if_needed()
+        if pending:
+            print(f"Applied {len(pending)} migrations in {time.perf_counter() - started:.2f}s")
+        else:
+            print(f"Schema is current (checked in {time.perf_counter() - started:.3f}s)")
+        return bool(pending)
     except Exception as e:
         print(f"Error applying migrations: {e}")
-        return False
+        return None
+
+def run_production_server():
+    """Run gunicorn in this process, so the app loaded here is the one its workers fork from"""
+    from django.db import connections
+    from gunicorn.app.wsgiapp import WSGIApplication
+
+    # No connection may be inherited by the workers
+    connections.close_all()
+    sys.argv = ['gunicorn', '--config', 'gunicorn.conf.py']
+    WSGIApplication("%(prog)s [OPTIONS]").run()
 
 def main():
     """Run Django server with correct settings."""
-    signal.signal(signal.SIGINT, signal_handler)
+    production = '--production' in sys.argv[1:]
+    if production:
+        # Nothing loaded before the fork needs collecting; gunicorn.conf.py
+        # freezes it all and re-enables collection before each fork
+        gc.disable()
+        # The workers share one response cache; the settings read this on setup
+        os.environ.setdefault('DJANGO_SHARED_CACHE_DIR', os.path.join(BASE_DIR, 'django_backend', 'cache'))
+    else:
+        signal.signal(signal.SIGINT, signal_handler)
     
     # Set up the Django settings module
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog_project.settings')
@@ -123,14 +162,21 @@ def main():
     if not setup():
         print("Failed to set up Django environment. Exiting.")
         return
-        
-    if not apply_migrations():
+    
+    migrated = apply_migrations()
+    if migrated is None:
         print("Failed to apply migrations. Exiting.")
         return
     
-    if not seed_data():
+    # Only a database that was just migrated can be missing the sample data
+    if migrated and not seed_data():
         print("Warning: Failed to seed initial data, but continuing...")
     
+    if production:
+        print("\nStarting production server...")
+        run_production_server()
+        return
+    
     print("\nStarting Django server...")
     # Set the server to run on 0.0.0.0 to be accessible externally
     from django.core.management import execute_from_command_line